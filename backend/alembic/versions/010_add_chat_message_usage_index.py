@@ -0,0 +1,39 @@
+"""Add partial covering index for assistant usage aggregation.
+
+Revision ID: 010
+Revises: 009
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build without blocking chat writes; CONCURRENTLY cannot run in a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_chat_messages_assistant_usage",
+            "chat_messages",
+            ["llm_provider", "llm_model", "created_at"],
+            unique=False,
+            postgresql_where=sa.text("role = 'assistant'"),
+            postgresql_include=["input_tokens", "output_tokens", "estimated_cost_usd"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_chat_messages_assistant_usage",
+            table_name="chat_messages",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,143 @@
+"""Key daily token usage by provider and model.
+
+Revision ID: 011
+Revises: 010
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "daily_token_usage",
+        sa.Column("llm_provider", sa.String(length=32), nullable=False, server_default=""),
+    )
+    op.add_column(
+        "daily_token_usage",
+        sa.Column("llm_model", sa.String(length=100), nullable=False, server_default=""),
+    )
+    op.drop_index("ix_daily_token_usage_user_date", table_name="daily_token_usage")
+    op.create_index(
+        "ix_daily_token_usage_user_date_model",
+        "daily_token_usage",
+        ["user_id", "date", "llm_provider", "llm_model"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_daily_token_usage_model_date",
+        "daily_token_usage",
+        ["llm_provider", "llm_model", "date"],
+        unique=False,
+    )
+
+    # Attribute existing totals to models from the assistant messages, and
+    # keep only the unexplained remainder on the unattributed row. A day is
+    # only split when its message sums fit inside the recorded daily totals
+    # (message dates and the daily row's date can disagree around midnight,
+    # and older messages may predate usage recording); any other day stays
+    # on its unattributed row. Either way each user's per-day input and
+    # output totals, and so the weekly quota sums, are exactly preserved.
+    op.execute(
+        """
+        WITH attributed AS (
+            SELECT
+                s.user_id,
+                CAST(m.created_at AS DATE) AS date,
+                m.llm_provider,
+                m.llm_model,
+                COALESCE(SUM(m.input_tokens), 0) AS input_tokens,
+                COALESCE(SUM(m.output_tokens), 0) AS output_tokens
+            FROM chat_messages AS m
+            JOIN chat_sessions AS s ON s.id = m.session_id
+            WHERE m.role = 'assistant'
+              AND COALESCE(m.llm_provider, '') <> ''
+              AND COALESCE(m.llm_model, '') <> ''
+            GROUP BY s.user_id, CAST(m.created_at AS DATE), m.llm_provider, m.llm_model
+        ),
+        attributed_days AS (
+            SELECT user_id, date,
+                   SUM(input_tokens) AS input_tokens,
+                   SUM(output_tokens) AS output_tokens
+            FROM attributed
+            GROUP BY user_id, date
+        ),
+        splittable_days AS (
+            SELECT t.user_id, t.date
+            FROM attributed_days AS t
+            JOIN daily_token_usage AS d
+              ON d.user_id = t.user_id AND d.date = t.date
+             AND d.llm_provider = '' AND d.llm_model = ''
+            WHERE t.input_tokens <= d.input_tokens_used
+              AND t.output_tokens <= d.output_tokens_used
+        )
+        INSERT INTO daily_token_usage
+            (id, user_id, date, llm_provider, llm_model, input_tokens_used, output_tokens_used)
+        SELECT gen_random_uuid(), a.user_id, a.date, a.llm_provider, a.llm_model,
+               a.input_tokens, a.output_tokens
+        FROM attributed AS a
+        JOIN splittable_days AS k ON k.user_id = a.user_id AND k.date = a.date
+        """
+    )
+    op.execute(
+        """
+        UPDATE daily_token_usage AS d
+        SET input_tokens_used = d.input_tokens_used - a.input_tokens_used,
+            output_tokens_used = d.output_tokens_used - a.output_tokens_used
+        FROM (
+            SELECT user_id, date,
+                   SUM(input_tokens_used) AS input_tokens_used,
+                   SUM(output_tokens_used) AS output_tokens_used
+            FROM daily_token_usage
+            WHERE llm_provider <> ''
+            GROUP BY user_id, date
+        ) AS a
+        WHERE d.llm_provider = '' AND d.llm_model = ''
+          AND d.user_id = a.user_id AND d.date = a.date
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM daily_token_usage
+        WHERE llm_provider = '' AND llm_model = ''
+          AND input_tokens_used = 0 AND output_tokens_used = 0
+        """
+    )
+
+
+def downgrade() -> None:
+    # Fold per-model rows back into one row per user and day.
+    op.execute(
+        """
+        INSERT INTO daily_token_usage
+            (id, user_id, date, llm_provider, llm_model, input_tokens_used, output_tokens_used)
+        SELECT gen_random_uuid(), user_id, date, '', '',
+               SUM(input_tokens_used), SUM(output_tokens_used)
+        FROM daily_token_usage
+        WHERE llm_provider <> '' OR llm_model <> ''
+        GROUP BY user_id, date
+        ON CONFLICT (user_id, date, llm_provider, llm_model) DO UPDATE
+        SET input_tokens_used = daily_token_usage.input_tokens_used + EXCLUDED.input_tokens_used,
+            output_tokens_used = daily_token_usage.output_tokens_used + EXCLUDED.output_tokens_used
+        """
+    )
+    op.execute("DELETE FROM daily_token_usage WHERE llm_provider <> '' OR llm_model <> ''")
+
+    op.drop_index("ix_daily_token_usage_model_date", table_name="daily_token_usage")
+    op.drop_index("ix_daily_token_usage_user_date_model", table_name="daily_token_usage")
+    op.create_index(
+        "ix_daily_token_usage_user_date",
+        "daily_token_usage",
+        ["user_id", "date"],
+        unique=True,
+    )
+    op.drop_column("daily_token_usage", "llm_model")
+    op.drop_column("daily_token_usage", "llm_provider")
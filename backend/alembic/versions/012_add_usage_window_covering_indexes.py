@@ -0,0 +1,52 @@
+"""Add covering indexes for admin usage window aggregates.
+
+Revision ID: 012
+Revises: 011
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build without blocking usage writes; CONCURRENTLY cannot run in a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_daily_token_usage_date_covering",
+            "daily_token_usage",
+            ["date"],
+            unique=False,
+            postgresql_include=["input_tokens_used", "output_tokens_used"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_chat_messages_assistant_created",
+            "chat_messages",
+            ["created_at"],
+            unique=False,
+            postgresql_where=sa.text("role = 'assistant'"),
+            postgresql_include=["estimated_cost_usd"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_chat_messages_assistant_created",
+            table_name="chat_messages",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_daily_token_usage_date_covering",
+            table_name="daily_token_usage",
+            postgresql_concurrently=True,
+        )
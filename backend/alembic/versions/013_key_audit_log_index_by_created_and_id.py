@@ -0,0 +1,49 @@
+"""Key the audit log index by created_at and id for keyset paging.
+
+Revision ID: 013
+Revises: 012
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "013"
+down_revision: Union[str, None] = "012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The composite index also serves created_at-only scans, so it replaces
+    # the old one. CONCURRENTLY cannot run in a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_admin_audit_log_created_id",
+            "admin_audit_log",
+            ["created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_admin_audit_log_created",
+            table_name="admin_audit_log",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_admin_audit_log_created",
+            "admin_audit_log",
+            ["created_at"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_admin_audit_log_created_id",
+            table_name="admin_audit_log",
+            postgresql_concurrently=True,
+        )
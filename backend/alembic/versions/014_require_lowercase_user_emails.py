@@ -0,0 +1,52 @@
+"""Require lowercase user emails.
+
+Revision ID: 014
+Revises: 013
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "014"
+down_revision: Union[str, None] = "013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _case_colliding_emails() -> list[str]:
+    rows = op.get_bind().execute(
+        sa.text(
+            "SELECT lower(email) AS email, string_agg(email, ', ' ORDER BY email) AS variants "
+            "FROM users GROUP BY lower(email) HAVING count(*) > 1 ORDER BY lower(email)"
+        )
+    )
+    return [f"{row.email} ({row.variants})" for row in rows]
+
+
+def upgrade() -> None:
+    # Accounts that differ only by case were legal before this revision, and
+    # lowercasing them would trip the unique email index. Which account wins
+    # is a decision for an operator, so stop with the list instead.
+    collisions = _case_colliding_emails()
+    if collisions:
+        raise RuntimeError(
+            "Cannot require lowercase emails: these addresses belong to more than "
+            "one account once lowercased. Merge or rename the duplicate accounts, "
+            "then rerun the migration: " + "; ".join(collisions)
+        )
+    # Lookups compare against the lowercased input, so any mixed-case legacy
+    # row could never match; normalise it before enforcing the rule.
+    op.execute("UPDATE users SET email = lower(email) WHERE email <> lower(email)")
+    # Add unvalidated first so the full-table check runs without blocking writes.
+    op.execute(
+        "ALTER TABLE users ADD CONSTRAINT ck_users_email_lowercase "
+        "CHECK (email = lower(email)) NOT VALID"
+    )
+    op.execute("ALTER TABLE users VALIDATE CONSTRAINT ck_users_email_lowercase")
+
+
+def downgrade() -> None:
+    op.drop_constraint("ck_users_email_lowercase", "users", type_="check")
@@ -0,0 +1,29 @@
+"""Add a commit-ordered version row for the admin audit log.
+
+Revision ID: 015
+Revises: 014
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "015"
+down_revision: Union[str, None] = "014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "admin_audit_log_version",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.execute("INSERT INTO admin_audit_log_version (id, version) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    op.drop_table("admin_audit_log_version")
@@ -1,4 +1,5 @@
 import logging
+from functools import lru_cache
 
 from app.ai.llm_base import LLMProvider
 from app.ai.prompts import (
@@ -43,15 +44,9 @@ def build_system_prompt(
     return "\n".join(parts)
 
 
-def build_single_pass_system_prompt(
-    programming_level: int,
-    maths_level: int,
-    *,
-    pedagogy_context: str,
-    notebook_context: str | None = None,
-) -> str:
-    """Assemble the single-pass prompt that emits hidden metadata then the answer."""
-
+@lru_cache(maxsize=32)
+def _single_pass_prompt_prefix(programming_level: int, maths_level: int) -> str:
+    """Return the static part of the single-pass prompt for one pair of levels."""
     prog_hint_lines: list[str] = ["Programming hint level rules (choose the level computed by the formula):"]
     for level in sorted(PROGRAMMING_HINT_INSTRUCTIONS):
         prog_hint_lines.append(f"- Level {level}: {PROGRAMMING_HINT_INSTRUCTIONS[level]}")
@@ -72,6 +67,20 @@ def build_single_pass_system_prompt(
         PROGRAMMING_LEVEL_INSTRUCTIONS.get(programming_level, PROGRAMMING_LEVEL_INSTRUCTIONS[3]),
         "",
         MATHS_LEVEL_INSTRUCTIONS.get(maths_level, MATHS_LEVEL_INSTRUCTIONS[3]),
+    ]
+    return "\n".join(parts)
+
+
+def build_single_pass_system_prompt(
+    programming_level: int,
+    maths_level: int,
+    *,
+    pedagogy_context: str,
+    notebook_context: str | None = None,
+) -> str:
+    """Assemble the single-pass prompt that emits hidden metadata then the answer."""
+    parts = [
+        _single_pass_prompt_prefix(programming_level, maths_level),
         "",
         pedagogy_context,
     ]
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
 from typing import Any
 
 
@@ -47,6 +48,17 @@ def get_model_pricing(provider_id: str, model_id: str) -> dict[str, float]:
     return LLM_PRICING.get(provider, {"input_per_mtok": 0.0, "output_per_mtok": 0.0})
 
 
+@lru_cache(maxsize=None)
+def _decimal_rates_per_token(provider_id: str, model_id: str) -> tuple[Decimal, Decimal]:
+    """Resolve a model's per-token input/output rates once; the tables are static."""
+    pricing = get_model_pricing(provider_id, model_id)
+    per_mtok = Decimal(1_000_000)
+    return (
+        Decimal(str(pricing.get("input_per_mtok", 0.0))) / per_mtok,
+        Decimal(str(pricing.get("output_per_mtok", 0.0))) / per_mtok,
+    )
+
+
 def _sum_modality_counts(details: Any) -> int | None:
     """Sum token counts from Vertex modality details if available."""
     if not isinstance(details, list):
@@ -87,11 +99,7 @@ def estimate_llm_cost_usd(
         if detailed_completion is not None:
             completion_tokens = detailed_completion
 
-    pricing = get_model_pricing(provider_id, model_id)
-    input_cost = (Decimal(prompt_tokens) / Decimal(1_000_000)) * Decimal(
-        str(pricing.get("input_per_mtok", 0.0))
-    )
-    output_cost = (Decimal(completion_tokens) / Decimal(1_000_000)) * Decimal(
-        str(pricing.get("output_per_mtok", 0.0))
+    input_rate, output_rate = _decimal_rates_per_token(provider_id, model_id)
+    return _round_usd(
+        Decimal(prompt_tokens) * input_rate + Decimal(completion_tokens) * output_rate
     )
-    return _round_usd(input_cost + output_cost)
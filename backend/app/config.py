@@ -1,5 +1,6 @@
 """Application settings loaded from environment variables via .env file."""
 
+from functools import lru_cache
 from pathlib import Path
 import json
 import re
@@ -17,11 +18,15 @@ from app.ai.pricing import LLM_MODEL_PRICING, LLM_PRICING
 REPO_ROOT = Path(__file__).resolve().parents[2]
 BACKEND_DIR = Path(__file__).resolve().parents[1]
 
-def _parse_admin_email_set(raw: str) -> set[str]:
-    """Parse a flexible admin email string into a normalised set."""
+@lru_cache(maxsize=8)
+def _parse_admin_email_set(raw: str) -> frozenset[str]:
+    """Parse a flexible admin email string into a normalised set.
+
+    Cached per raw value, so per-request membership checks skip re-parsing.
+    """
     value = raw.strip()
     if not value:
-        return set()
+        return frozenset()
 
     if value.startswith("["):
         try:
@@ -40,7 +45,7 @@ def _parse_admin_email_set(raw: str) -> set[str]:
         email = candidate.strip().strip("'\"").lower()
         if email:
             normalised.add(email)
-    return normalised
+    return frozenset(normalised)
 
 
 def _normalise_website_domain(raw: str) -> str:
@@ -59,11 +64,15 @@ class Settings(BaseSettings):
     # Database
     database_url: str
     sqlalchemy_echo: bool
+    # Optional read replica for admin analytics; empty uses DATABASE_URL.
+    database_readonly_url: str = ""
 
     # JWT
     jwt_secret_key: str
     jwt_access_token_expire_minutes: int
     jwt_refresh_token_expire_days: int
+    # bcrypt work factor; stored hashes below it are upgraded on next login.
+    password_bcrypt_rounds: int = 12
     auth_cookie_secure: bool
     auth_cookie_samesite: Literal["lax", "strict", "none"]
 
@@ -148,7 +157,7 @@ class Settings(BaseSettings):
     admin_email: str
 
     @property
-    def admin_email_set(self) -> set[str]:
+    def admin_email_set(self) -> frozenset[str]:
         return _parse_admin_email_set(self.admin_email)
 
     @field_validator("llm_provider", mode="before")
@@ -1,10 +1,88 @@
 """Async SQLAlchemy engine and session factory."""
 
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from app.config import settings
 
-engine = create_async_engine(settings.database_url, echo=settings.sqlalchemy_echo)
+# Usage aggregates repeat the same SQL shapes with different binds, so keep
+# enough prepared statements per connection to avoid re-parsing them.
+ASYNCPG_PREPARED_STATEMENT_CACHE_SIZE = 256
+ASYNCPG_STATEMENT_CACHE_SIZE = 1024
+# SQLAlchemy's compiled-SQL cache is shared by every statement shape in the
+# app (chat, zones, admin analytics); the default 500 entries can churn.
+QUERY_CACHE_SIZE = 1200
+POOL_WARM_CONNECTIONS = 5
+# Sized for concurrent admin dashboard polling on a single worker.
+POOL_SIZE = 20
+POOL_MAX_OVERFLOW = 40
+POOL_RECYCLE_SECONDS = 1800
+# Admin analytics scans get their own small pool so they cannot starve the
+# connections used by student traffic.
+ANALYTICS_POOL_SIZE = 2
+ANALYTICS_POOL_MAX_OVERFLOW = 4
+
+
+def _engine_connect_args(database_url: str) -> dict[str, int]:
+    if make_url(database_url).get_driver_name() != "asyncpg":
+        return {}
+    return {
+        "prepared_statement_cache_size": ASYNCPG_PREPARED_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": ASYNCPG_STATEMENT_CACHE_SIZE,
+    }
+
+
+def _engine_pool_options(
+    database_url: str,
+    pool_size: int = POOL_SIZE,
+    max_overflow: int = POOL_MAX_OVERFLOW,
+) -> dict[str, int | bool]:
+    if make_url(database_url).get_backend_name() != "postgresql":
+        return {}
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_pre_ping": True,
+        "pool_recycle": POOL_RECYCLE_SECONDS,
+    }
+
+
+engine = create_async_engine(
+    settings.database_url,
+    echo=settings.sqlalchemy_echo,
+    query_cache_size=QUERY_CACHE_SIZE,
+    connect_args=_engine_connect_args(settings.database_url),
+    **_engine_pool_options(settings.database_url),
+)
 AsyncSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+
+_analytics_database_url = settings.database_readonly_url or settings.database_url
+analytics_engine = create_async_engine(
+    _analytics_database_url,
+    echo=settings.sqlalchemy_echo,
+    query_cache_size=QUERY_CACHE_SIZE,
+    connect_args=_engine_connect_args(_analytics_database_url),
+    **_engine_pool_options(
+        _analytics_database_url,
+        pool_size=ANALYTICS_POOL_SIZE,
+        max_overflow=ANALYTICS_POOL_MAX_OVERFLOW,
+    ),
+)
+AnalyticsSessionLocal = async_sessionmaker(
+    analytics_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+async def _ping_connection() -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def warm_up_pool(connections: int = POOL_WARM_CONNECTIONS) -> None:
+    """Open pooled connections at startup so early requests skip connection setup."""
+    await asyncio.gather(*(_ping_connection() for _ in range(connections)))
@@ -1,18 +1,50 @@
 """FastAPI dependency injection for database sessions and authentication."""
 
 import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import bindparam, lambda_stmt, select
 
-from app.db.session import AsyncSessionLocal
+from app.db.session import AnalyticsSessionLocal, AsyncSessionLocal
 from app.services.auth_service import decode_token
 from app.models.user import User
+from app.schemas.user import UserProfile
 
 security = HTTPBearer()
+# Every authenticated request runs this lookup; as a lambda statement it is
+# built and cache-keyed once instead of per call.
+_USER_BY_ID = lambda_stmt(lambda: select(User).where(User.id == bindparam("user_id")))
+# `/api/auth/me` is polled on every page load; serve it from memory briefly.
+USER_PROFILE_CACHE_TTL = timedelta(seconds=30)
+USER_PROFILE_CACHE_MAX_ENTRIES = 4096
+_user_profile_cache: dict[uuid.UUID, tuple[datetime, UserProfile]] = {}
+
+
+def _utc_now_naive() -> datetime:
+    """Return a naive UTC datetime without deprecated utcnow()."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def build_user_profile(user: User) -> UserProfile:
+    """Build a profile from a loaded user without re-validating its columns."""
+    return UserProfile.model_construct(
+        id=user.id,
+        email=user.email,
+        username=user.username,
+        programming_level=user.programming_level,
+        maths_level=user.maths_level,
+        is_admin=user.is_admin,
+        created_at=user.created_at,
+    )
+
+
+def invalidate_user_profile_cache(user_id: uuid.UUID) -> None:
+    """Drop a cached profile after the user's details change."""
+    _user_profile_cache.pop(user_id, None)
 
 
 async def get_db():
@@ -21,11 +53,18 @@ async def get_db():
         yield session
 
 
-async def get_current_user(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
-    """Extract and validate JWT, then load and return the user."""
+async def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Return the session factory for handlers that run concurrent reads."""
+    return AsyncSessionLocal
+
+
+async def get_analytics_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Return the session factory for admin analytics reads on their own pool."""
+    return AnalyticsSessionLocal
+
+
+def _access_token_user_id(credentials: HTTPAuthorizationCredentials) -> uuid.UUID:
+    """Validate a bearer access token and return its user id."""
     token = credentials.credentials
     try:
         payload = decode_token(token)
@@ -52,9 +91,21 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
+    return user_uuid
 
-    result = await db.execute(select(User).where(User.id == user_uuid))
+
+async def get_current_user(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> User:
+    """Extract and validate JWT, then load and return the user."""
+    user_uuid = _access_token_user_id(credentials)
+    result = await db.execute(_USER_BY_ID, {"user_id": user_uuid})
     user = result.scalar_one_or_none()
+    # End the read transaction so the pooled connection is not held through
+    # the handler's non-database work; later queries acquire one on demand.
+    # Sessions do not expire on commit, so `user` stays loaded and tracked.
+    await db.commit()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,6 +114,35 @@ async def get_current_user(
     return user
 
 
+async def get_current_user_profile(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
+    sessions: Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)],
+) -> UserProfile:
+    """Return the signed-in user's profile, cached briefly per user id."""
+    user_uuid = _access_token_user_id(credentials)
+    now = _utc_now_naive()
+    cached = _user_profile_cache.get(user_uuid)
+    if cached is not None and (now - cached[0]) <= USER_PROFILE_CACHE_TTL:
+        return cached[1]
+
+    async with sessions() as db:
+        user = await db.get(User, user_uuid)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    profile = build_user_profile(user)
+    if (
+        user_uuid not in _user_profile_cache
+        and len(_user_profile_cache) >= USER_PROFILE_CACHE_MAX_ENTRIES
+    ):
+        # Evict the oldest insertion to keep the cache bounded.
+        _user_profile_cache.pop(next(iter(_user_profile_cache)))
+    _user_profile_cache[user_uuid] = (now, profile)
+    return profile
+
+
 async def get_admin_user(
     user: Annotated[User, Depends(get_current_user)],
 ) -> User:
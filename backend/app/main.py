@@ -1,5 +1,6 @@
 """FastAPI application entry point with startup initialisation and logging."""
 
+import asyncio
 import logging
 import sys
 from contextlib import asynccontextmanager
@@ -8,7 +9,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.db.session import engine
+from app.db.session import analytics_engine, engine, warm_up_pool
 from app.db.init_db import init_db
 from app.routers.auth import router as auth_router
 from app.routers.chat import router as chat_router
@@ -17,6 +18,7 @@ from app.routers.upload import router as upload_router
 from app.routers.notebooks import router as notebooks_router
 from app.routers.zones import router as zones_router
 from app.routers.admin import router as admin_router
+from app.services.auth_service import dummy_password_hash
 
 
 def _configure_logging() -> None:
@@ -45,8 +47,12 @@ _configure_logging()
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events."""
     await init_db()
+    await warm_up_pool()
+    # Build the login dummy hash now so the first unknown email is not slower.
+    await asyncio.to_thread(dummy_password_hash)
     yield
     await engine.dispose()
+    await analytics_engine.dispose()
 
 
 app = FastAPI(title="AI Coding Tutor", lifespan=lifespan)
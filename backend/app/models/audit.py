@@ -3,7 +3,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Index, Integer, String, Text, func
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -27,5 +27,19 @@ class AdminAuditLog(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
     __table_args__ = (
-        Index("ix_admin_audit_log_created", "created_at"),
+        # Matches the newest-first `(created_at, id)` keyset used for paging.
+        Index("ix_admin_audit_log_created_id", "created_at", "id"),
     )
+
+
+class AdminAuditLogVersion(Base):
+    """Single-row counter bumped in every transaction that writes an audit entry.
+
+    Entry timestamps come from the transaction start, so they do not order
+    commits; the counter row's lock does.
+    """
+
+    __tablename__ = "admin_audit_log_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
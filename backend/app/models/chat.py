@@ -18,7 +18,7 @@ from sqlalchemy import (
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
-from app.models.user import Base
+from app.models.user import Base, uuid7
 
 
 class ChatSession(Base):
@@ -64,7 +64,7 @@ class ChatMessage(Base):
     __tablename__ = "chat_messages"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     session_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -88,6 +88,22 @@ class ChatMessage(Base):
 
     __table_args__ = (
         Index("ix_chat_messages_session_created", "session_id", "created_at"),
+        # Lets admin usage aggregation run as an index-only scan.
+        Index(
+            "ix_chat_messages_assistant_usage",
+            "llm_provider",
+            "llm_model",
+            "created_at",
+            postgresql_where=text("role = 'assistant'"),
+            postgresql_include=["input_tokens", "output_tokens", "estimated_cost_usd"],
+        ),
+        # Serves the all-model cost windows, which filter on time only.
+        Index(
+            "ix_chat_messages_assistant_created",
+            "created_at",
+            postgresql_where=text("role = 'assistant'"),
+            postgresql_include=["estimated_cost_usd"],
+        ),
     )
 
 
@@ -101,11 +117,31 @@ class DailyTokenUsage(Base):
         UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     date: Mapped[date] = mapped_column(Date, nullable=False)
+    # Empty strings mark usage recorded before per-model attribution.
+    llm_provider: Mapped[str] = mapped_column(
+        String(32), nullable=False, default="", server_default=""
+    )
+    llm_model: Mapped[str] = mapped_column(
+        String(100), nullable=False, default="", server_default=""
+    )
     input_tokens_used: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     output_tokens_used: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
     __table_args__ = (
-        Index("ix_daily_token_usage_user_date", "user_id", "date", unique=True),
+        Index(
+            "ix_daily_token_usage_user_date_model",
+            "user_id",
+            "date",
+            "llm_provider",
+            "llm_model",
+            unique=True,
+        ),
+        Index("ix_daily_token_usage_model_date", "llm_provider", "llm_model", "date"),
+        Index(
+            "ix_daily_token_usage_date_covering",
+            "date",
+            postgresql_include=["input_tokens_used", "output_tokens_used"],
+        ),
     )
 
 
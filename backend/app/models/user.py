@@ -1,9 +1,11 @@
 """User model and SQLAlchemy declarative base."""
 
+import os
+import time
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Integer, Float, Boolean, DateTime, func
+from sqlalchemy import String, Integer, Float, Boolean, CheckConstraint, DateTime, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -12,11 +14,31 @@ class Base(DeclarativeBase):
     pass
 
 
+def uuid7() -> uuid.UUID:
+    """Return a time-ordered UUID (RFC 9562 version 7).
+
+    The millisecond timestamp leads, so new rows land on the right-most
+    B-tree page instead of a random one.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    random_bits = int.from_bytes(os.urandom(10), "big")
+    rand_a = random_bits >> 68
+    rand_b = random_bits & ((1 << 62) - 1)
+    value = (
+        (timestamp_ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | rand_a << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
+
 class User(Base):
     __tablename__ = "users"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     email: Mapped[str] = mapped_column(
         String(255), unique=True, index=True, nullable=False
@@ -35,3 +57,8 @@ class User(Base):
     )
     is_admin: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    # Emails are stored lowercased so lookups hit the plain unique index.
+    __table_args__ = (
+        CheckConstraint("email = lower(email)", name="ck_users_email_lowercase"),
+    )
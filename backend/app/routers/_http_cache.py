@@ -0,0 +1,13 @@
+"""Shared conditional-GET helper for routers."""
+
+from fastapi import Request, Response, status
+
+
+def not_modified_response(request: Request, response: Response, etag: str) -> Response | None:
+    """Tag the response, or return a bare 304 when the client already has it."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    response.headers.update(headers)
+    client_tags = {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag in client_tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
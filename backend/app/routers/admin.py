@@ -1,23 +1,53 @@
 """Admin router: zone management, usage visibility, and audit log."""
 
+import asyncio
 import uuid
-from datetime import date, datetime, time, timedelta
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from operator import itemgetter
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import func, or_, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic_core import to_json
+from sqlalchemy import exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.ai.llm_factory import get_llm_provider
 from app.ai.model_registry import normalise_llm_provider, validate_supported_llm_model
 from app.ai.pricing import estimate_llm_cost_usd
 from app.ai.pricing import get_model_pricing
 from app.config import LLM_PRICING, settings
-from app.dependencies import get_admin_user, get_db
+from app.dependencies import (
+    get_admin_user,
+    get_analytics_session_factory,
+    get_db,
+    get_session_factory,
+)
 from app.models.chat import ChatMessage, DailyTokenUsage
 from app.models.user import User
-from app.routers.health import ai_model_catalog_health_check, invalidate_ai_model_catalog_cache
+from app.models.zone import LearningZone
+from app.routers._http_cache import not_modified_response
+from app.routers.health import (
+    AVAILABLE_MODEL_INDEX_KEY,
+    ai_model_catalog_health_check,
+    build_available_model_index,
+    invalidate_ai_model_catalog_cache,
+)
 from app.schemas.zone import (
     ZoneCreate,
     ZoneImportResult,
@@ -33,6 +63,7 @@ from app.services.auth_service import verify_password
 from app.services.zone_service import (
     ZoneValidationError,
     add_notebook,
+    count_zone_notebooks,
     create_zone,
     delete_zone,
     delete_zone_notebook,
@@ -52,6 +83,34 @@ from app.services.zone_service import (
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 GOOGLE_AI_STUDIO_PROVIDER = "google-aistudio"
 GOOGLE_VERTEX_PROVIDER = "google-vertex"
+GOOGLE_ADMIN_PROVIDERS = frozenset({GOOGLE_AI_STUDIO_PROVIDER, GOOGLE_VERTEX_PROVIDER})
+_PROVIDER_LABELS = {
+    "anthropic": "Anthropic",
+    "openai": "OpenAI",
+    GOOGLE_AI_STUDIO_PROVIDER: "Google AI Studio",
+    GOOGLE_VERTEX_PROVIDER: "Google Cloud Vertex AI",
+}
+LLM_CATALOG_RESPONSE_CACHE_TTL = timedelta(seconds=30)
+ADMIN_USAGE_CACHE_TTL = timedelta(seconds=30)
+_last_admin_usage_day: date | None = None
+_last_admin_usage: dict | None = None
+_last_admin_usage_at: datetime | None = None
+# Flips once any usage exists; until then `/usage` skips the aggregates.
+_usage_recorded = False
+_last_llm_catalog_key: tuple | None = None
+_last_llm_catalog_response: dict | None = None
+_last_llm_catalog_at: datetime | None = None
+# Runtime settings that together select the active LLM.
+_LLM_SELECTION_SETTINGS = (
+    "llm_provider",
+    "llm_model_anthropic",
+    "llm_model_openai",
+    "llm_model_google",
+    "google_gemini_transport",
+)
+ADMIN_PASSWORD_FAILURE_LIMIT = 5
+ADMIN_PASSWORD_FAILURE_WINDOW = timedelta(minutes=5)
+_admin_password_failures: dict[uuid.UUID, list[datetime]] = {}
 
 
 class LLMModelOptionOut(BaseModel):
@@ -75,6 +134,45 @@ class LLMModelCatalogOut(BaseModel):
     cached: bool
 
 
+class UsageWindowOut(BaseModel):
+    input_tokens: int
+    output_tokens: int
+    estimated_cost_usd: float
+    estimated_cost_coverage: float
+
+
+class UsageOut(BaseModel):
+    today: UsageWindowOut
+    this_week: UsageWindowOut
+    this_month: UsageWindowOut
+
+
+class ModelUsageOut(UsageOut):
+    provider: str
+    model: str
+
+
+class AuditLogEntryOut(BaseModel):
+    id: str
+    admin_email: str
+    action: str
+    resource_type: str
+    resource_id: str | None
+    resource_title: str | None
+    details: str | None
+    created_at: str | None
+
+
+class AuditLogPageOut(BaseModel):
+    entries: list[AuditLogEntryOut]
+    per_page: int
+    next_cursor: str | None = None
+    # Offset pages only; keyset pages skip the full-table count.
+    total: int | None = None
+    page: int | None = None
+    total_pages: int | None = None
+
+
 class LLMModelSwitchIn(BaseModel):
     provider: str = Field(min_length=1, max_length=32)
     model: str = Field(min_length=1, max_length=100)
@@ -95,14 +193,15 @@ def _active_admin_provider() -> str:
     return normalise_llm_provider(settings.llm_provider)
 
 
-def _normalise_admin_provider(value: str) -> str:
-    provider = str(value or "").strip().lower().replace("_", "-")
+@lru_cache(maxsize=64)
+def _admin_provider_alias(provider: str) -> str:
+    """Map a provider alias to an admin provider id, leaving generic Google as `google`."""
     if provider in {"anthropic", "claude"}:
         return "anthropic"
     if provider in {"openai"}:
         return "openai"
     if provider in {"google", "gemini"}:
-        return _active_google_admin_provider()
+        return "google"
     if provider in {
         "google-aistudio",
         "google-ai-studio",
@@ -122,8 +221,16 @@ def _normalise_admin_provider(value: str) -> str:
     return normalise_llm_provider(provider)
 
 
+def _normalise_admin_provider(value: str) -> str:
+    provider = _admin_provider_alias(str(value or "").strip().lower().replace("_", "-"))
+    if provider == "google":
+        # Generic Google follows the runtime transport, so it is resolved per call.
+        return _active_google_admin_provider()
+    return provider
+
+
 def _canonical_provider(provider_id: str) -> str:
-    if provider_id in {GOOGLE_AI_STUDIO_PROVIDER, GOOGLE_VERTEX_PROVIDER}:
+    if provider_id in GOOGLE_ADMIN_PROVIDERS:
         return "google"
     return normalise_llm_provider(provider_id)
 
@@ -137,27 +244,69 @@ def _google_transport_for_provider(provider_id: str) -> str | None:
 
 
 def _provider_label(provider_id: str) -> str:
-    labels = {
-        "anthropic": "Anthropic",
-        "openai": "OpenAI",
-        GOOGLE_AI_STUDIO_PROVIDER: "Google AI Studio",
-        GOOGLE_VERTEX_PROVIDER: "Google Cloud Vertex AI",
+    return _PROVIDER_LABELS.get(provider_id, provider_id)
+
+
+def _utc_now_naive() -> datetime:
+    """Return a naive UTC datetime without deprecated utcnow()."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def invalidate_llm_catalog_response_cache() -> None:
+    """Clear the cached `/llm/models` response after runtime model changes."""
+    global _last_llm_catalog_key, _last_llm_catalog_response, _last_llm_catalog_at
+    _last_llm_catalog_key = None
+    _last_llm_catalog_response = None
+    _last_llm_catalog_at = None
+
+
+def invalidate_admin_usage_cache() -> None:
+    """Clear the cached `/usage` totals and the recorded-usage flag."""
+    global _last_admin_usage_day, _last_admin_usage, _last_admin_usage_at, _usage_recorded
+    _last_admin_usage_day = None
+    _last_admin_usage = None
+    _last_admin_usage_at = None
+    _usage_recorded = False
+
+
+def _llm_selection_key() -> tuple:
+    return tuple(getattr(settings, name) for name in _LLM_SELECTION_SETTINGS)
+
+
+def _llm_catalog_response_key(catalog: dict) -> tuple:
+    """Key the assembled catalog response on everything it is derived from."""
+    return (str(catalog.get("checked_at", "")), *_llm_selection_key())
+
+
+def _current_llm() -> dict[str, str | None]:
+    """Return the active provider/model block from the runtime settings."""
+    provider = _active_admin_provider()
+    return {
+        "provider": provider,
+        "model": _configured_llm_model(provider),
+        "google_gemini_transport": (
+            settings.google_gemini_transport if provider in GOOGLE_ADMIN_PROVIDERS else None
+        ),
     }
-    return labels.get(provider_id, provider_id)
 
 
 # ── Usage visibility ────────────────────────────────────────────────
 
 
+# Settings can change at runtime through the admin model switch, so only the
+# attribute names are fixed here; values are read per call.
+_DEFAULT_MODEL_SETTING_BY_PROVIDER = {
+    "anthropic": "llm_model_anthropic",
+    "openai": "llm_model_openai",
+    "google": "llm_model_google",
+}
+
+
 def _estimate_cost(input_tokens: int, output_tokens: int) -> float:
     """Estimate cost in USD using the active provider's pricing."""
     provider = settings.llm_provider.lower()
-    default_model_by_provider = {
-        "anthropic": settings.llm_model_anthropic,
-        "openai": settings.llm_model_openai,
-        "google": settings.llm_model_google,
-    }
-    model_id = default_model_by_provider.get(provider, "")
+    model_setting = _DEFAULT_MODEL_SETTING_BY_PROVIDER.get(provider)
+    model_id = getattr(settings, model_setting) if model_setting else ""
     if model_id:
         return estimate_llm_cost_usd(provider, model_id, input_tokens, output_tokens)
 
@@ -167,54 +316,179 @@ def _estimate_cost(input_tokens: int, output_tokens: int) -> float:
     return round(input_cost + output_cost, 4)
 
 
-async def _aggregate_usage(db: AsyncSession, start_date: date) -> dict:
-    """Sum token usage from start_date to today."""
-    result = await db.execute(
-        select(
-            func.coalesce(func.sum(DailyTokenUsage.input_tokens_used), 0),
-            func.coalesce(func.sum(DailyTokenUsage.output_tokens_used), 0),
-        ).where(DailyTokenUsage.date >= start_date)
-    )
-    row = result.one()
-    input_tokens = int(row[0])
-    output_tokens = int(row[1])
-
-    start_dt = datetime.combine(start_date, time.min)
-    cost_result = await db.execute(
-        select(
-            func.coalesce(func.sum(ChatMessage.estimated_cost_usd), 0.0),
-            func.count(ChatMessage.id),
-            func.count(ChatMessage.estimated_cost_usd),
-        ).where(
-            ChatMessage.role == "assistant",
-            ChatMessage.created_at >= start_dt,
-        )
-    )
-    cost_row = cost_result.one()
-    estimated_cost_usd = round(float(cost_row[0] or 0.0), 4)
-    assistant_count = int(cost_row[1] or 0)
-    cost_count = int(cost_row[2] or 0)
-    coverage = 1.0 if assistant_count == 0 else round(cost_count / assistant_count, 4)
+@dataclass(frozen=True)
+class UsageWindowStart:
+    """First day of a usage window, plus its midnight for timestamp filters."""
+
+    start_date: date
+    start_dt: datetime
 
+
+def _usage_window_starts(today: date) -> dict[str, UsageWindowStart]:
+    """Return the start of each reported usage window, computed once per request."""
+    start_dates = {
+        "today": today,
+        "this_week": today - timedelta(days=today.weekday()),
+        "this_month": today.replace(day=1),
+    }
     return {
-        "input_tokens": input_tokens,
-        "output_tokens": output_tokens,
-        "estimated_cost_usd": estimated_cost_usd,
-        "estimated_cost_coverage": coverage,
+        window: UsageWindowStart(start_date, datetime.combine(start_date, time.min))
+        for window, start_date in start_dates.items()
     }
 
 
-def _configured_llm_models_by_provider() -> dict[str, str]:
+# Window aggregates use FILTER so one scan feeds every window without a
+# per-row CASE expression.
+def _windowed_sum(column, in_window, default: int | float = 0):
+    """Sum `column` over rows matching `in_window`, defaulting to zero."""
+    return func.coalesce(func.sum(column).filter(in_window), default)
+
+
+def _windowed_count(column, in_window):
+    """Count non-null `column` values over rows matching `in_window`."""
+    return func.count(column).filter(in_window)
+
+
+def _windowed_row_count(in_window):
+    """Count rows matching `in_window` without reading any column."""
+    return func.count().filter(in_window)
+
+
+def _usage_summary(
+    input_tokens,
+    output_tokens,
+    estimated_cost_usd,
+    assistant_count,
+    cost_count,
+) -> dict:
+    assistant_count = int(assistant_count or 0)
+    cost_count = int(cost_count or 0)
+    coverage = 1.0 if assistant_count == 0 else round(cost_count / assistant_count, 4)
     return {
-        "anthropic": settings.llm_model_anthropic,
-        "openai": settings.llm_model_openai,
-        GOOGLE_AI_STUDIO_PROVIDER: settings.llm_model_google,
-        GOOGLE_VERTEX_PROVIDER: settings.llm_model_google,
+        "input_tokens": int(input_tokens or 0),
+        "output_tokens": int(output_tokens or 0),
+        "estimated_cost_usd": round(float(estimated_cost_usd or 0.0), 4),
+        "estimated_cost_coverage": coverage,
     }
 
 
+def _token_usage_windows_statement(starts: dict[str, UsageWindowStart], *filters):
+    start_dates = [start.start_date for start in starts.values()]
+    columns = []
+    for start_date in start_dates:
+        in_window = DailyTokenUsage.date >= start_date
+        columns.append(_windowed_sum(DailyTokenUsage.input_tokens_used, in_window))
+        columns.append(_windowed_sum(DailyTokenUsage.output_tokens_used, in_window))
+    return select(*columns).where(DailyTokenUsage.date >= min(start_dates), *filters)
+
+
+def _cost_usage_windows_statement(starts: dict[str, UsageWindowStart], *filters):
+    start_dts = [start.start_dt for start in starts.values()]
+    columns = []
+    for start_dt in start_dts:
+        in_window = ChatMessage.created_at >= start_dt
+        columns.append(_windowed_sum(ChatMessage.estimated_cost_usd, in_window, 0.0))
+        columns.append(_windowed_row_count(in_window))
+        columns.append(_windowed_count(ChatMessage.estimated_cost_usd, in_window))
+    return select(*columns).where(
+        ChatMessage.role == "assistant",
+        ChatMessage.created_at >= min(start_dts),
+        *filters,
+    )
+
+
+async def _fetch_read_only_row(
+    sessions: async_sessionmaker[AsyncSession], statement
+):
+    """Run one read-only aggregate on its own pooled session.
+
+    `AsyncSession` is not safe for concurrent use, so aggregates gathered
+    together must not share the request-scoped session.
+    """
+    async with sessions() as session:
+        result = await session.execute(statement)
+        return result.one()
+
+
+async def _run_in_own_session(
+    sessions: async_sessionmaker[AsyncSession], query, *args
+):
+    """Run a read-only service query on its own pooled session so it can be gathered."""
+    async with sessions() as session:
+        return await query(session, *args)
+
+
+async def _has_recorded_usage(sessions: async_sessionmaker[AsyncSession]) -> bool:
+    """Return whether any usage has been recorded, re-checking only while none has."""
+    global _usage_recorded
+    if not _usage_recorded:
+        row = await _fetch_read_only_row(
+            sessions,
+            select(
+                exists().select_from(DailyTokenUsage),
+                exists().where(ChatMessage.role == "assistant"),
+            ),
+        )
+        _usage_recorded = any(row)
+    return _usage_recorded
+
+
+def _empty_usage_windows(starts: dict[str, UsageWindowStart]) -> dict:
+    return {window: _usage_summary(0, 0, 0.0, 0, 0) for window in starts}
+
+
+async def _aggregate_usage_windows(
+    sessions: async_sessionmaker[AsyncSession],
+    starts: dict[str, UsageWindowStart],
+    token_filters: tuple = (),
+    cost_filters: tuple = (),
+) -> dict:
+    """Sum token usage and estimated cost for every window.
+
+    Tokens come from the pre-aggregated daily totals; cost and its coverage
+    come from assistant messages. The two reads are independent, so they
+    run concurrently on separate connections.
+    """
+    token_row, cost_row = await asyncio.gather(
+        _fetch_read_only_row(
+            sessions, _token_usage_windows_statement(starts, *token_filters)
+        ),
+        _fetch_read_only_row(
+            sessions, _cost_usage_windows_statement(starts, *cost_filters)
+        ),
+    )
+
+    usage: dict[str, dict] = {}
+    for index, window in enumerate(starts):
+        input_tokens, output_tokens = token_row[index * 2 : index * 2 + 2]
+        usage[window] = _usage_summary(
+            input_tokens,
+            output_tokens,
+            *cost_row[index * 3 : index * 3 + 3],
+        )
+    return usage
+
+
+@contextmanager
+def _llm_settings_transaction():
+    """Restore the runtime LLM selection if the wrapped block raises."""
+    snapshot = _llm_selection_key()
+    try:
+        yield
+    except BaseException:
+        for name, value in zip(_LLM_SELECTION_SETTINGS, snapshot):
+            setattr(settings, name, value)
+        raise
+
+
 def _configured_llm_model(provider_id: str) -> str:
-    return _configured_llm_models_by_provider().get(provider_id, "")
+    if provider_id == "anthropic":
+        return settings.llm_model_anthropic
+    if provider_id == "openai":
+        return settings.llm_model_openai
+    if provider_id in GOOGLE_ADMIN_PROVIDERS:
+        return settings.llm_model_google
+    return ""
 
 
 def _build_model_option(provider_id: str, model_id: str) -> dict[str, str | float]:
@@ -244,83 +518,92 @@ def _set_active_llm(provider_id: str, model_id: str) -> None:
 
 
 def _model_available_in_catalog(catalog: dict, provider_id: str, model_id: str) -> bool:
-    llm_groups = catalog.get("smoke_tested_models", {}).get("llm", {})
-    provider_entry = llm_groups.get(provider_id, {})
-    if not provider_entry and _canonical_provider(provider_id) == "google":
-        provider_entry = llm_groups.get("google", {})
-    available = provider_entry.get("available_models", [])
-    if not isinstance(available, list):
-        return False
-    return model_id in {str(item) for item in available}
-
-
-async def _aggregate_usage_for_model(
-    db: AsyncSession,
-    start_date: date,
+    index = catalog.get(AVAILABLE_MODEL_INDEX_KEY)
+    if index is None:
+        index = build_available_model_index(catalog.get("smoke_tested_models", {}))
+    available = index.get(provider_id)
+    if not available and _canonical_provider(provider_id) == "google":
+        available = index.get("google")
+    return model_id in (available or ())
+
+
+def _provider_model_filters(
+    provider_column,
+    model_column,
     selected_provider_id: str,
     canonical_provider_id: str,
     model_id: str,
-) -> dict:
-    """Aggregate usage scoped to a specific provider/model pair."""
-    provider_filter = ChatMessage.llm_provider == canonical_provider_id
-    if selected_provider_id in {GOOGLE_AI_STUDIO_PROVIDER, GOOGLE_VERTEX_PROVIDER}:
+) -> tuple:
+    provider_filter = provider_column == canonical_provider_id
+    if selected_provider_id in GOOGLE_ADMIN_PROVIDERS:
         # Include legacy rows stored as plain `google` before provider split.
         provider_filter = or_(
-            ChatMessage.llm_provider == selected_provider_id,
-            ChatMessage.llm_provider == canonical_provider_id,
+            provider_column == selected_provider_id,
+            provider_column == canonical_provider_id,
         )
+    return provider_filter, model_column == model_id
 
-    start_dt = datetime.combine(start_date, time.min)
-    result = await db.execute(
-        select(
-            func.coalesce(func.sum(ChatMessage.input_tokens), 0),
-            func.coalesce(func.sum(ChatMessage.output_tokens), 0),
-            func.coalesce(func.sum(ChatMessage.estimated_cost_usd), 0.0),
-            func.count(ChatMessage.id),
-            func.count(ChatMessage.estimated_cost_usd),
-        ).where(
-            ChatMessage.role == "assistant",
-            ChatMessage.created_at >= start_dt,
-            provider_filter,
-            ChatMessage.llm_model == model_id,
-        )
+
+async def _aggregate_usage_for_model_windows(
+    sessions: async_sessionmaker[AsyncSession],
+    starts: dict[str, UsageWindowStart],
+    selected_provider_id: str,
+    canonical_provider_id: str,
+    model_id: str,
+) -> dict:
+    """Aggregate usage for every window, scoped to a specific provider/model pair."""
+    scope = (selected_provider_id, canonical_provider_id, model_id)
+    return await _aggregate_usage_windows(
+        sessions,
+        starts,
+        token_filters=_provider_model_filters(
+            DailyTokenUsage.llm_provider, DailyTokenUsage.llm_model, *scope
+        ),
+        cost_filters=_provider_model_filters(
+            ChatMessage.llm_provider, ChatMessage.llm_model, *scope
+        ),
     )
-    row = result.one()
-    input_tokens = int(row[0] or 0)
-    output_tokens = int(row[1] or 0)
-    estimated_cost_usd = round(float(row[2] or 0.0), 4)
-    assistant_count = int(row[3] or 0)
-    cost_count = int(row[4] or 0)
-    coverage = 1.0 if assistant_count == 0 else round(cost_count / assistant_count, 4)
-    return {
-        "input_tokens": input_tokens,
-        "output_tokens": output_tokens,
-        "estimated_cost_usd": estimated_cost_usd,
-        "estimated_cost_coverage": coverage,
-    }
 
 
-@router.get("/usage")
+@router.get("/usage", response_model=UsageOut)
 async def get_admin_usage(
     _: Annotated[User, Depends(get_admin_user)],
-    db: Annotated[AsyncSession, Depends(get_db)],
+    sessions: Annotated[
+        async_sessionmaker[AsyncSession], Depends(get_analytics_session_factory)
+    ],
 ):
     """Return aggregated token usage and estimated cost for today, this week, and this month."""
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
-    month_start = today.replace(day=1)
-
-    return {
-        "today": await _aggregate_usage(db, today),
-        "this_week": await _aggregate_usage(db, week_start),
-        "this_month": await _aggregate_usage(db, month_start),
-    }
-
+    global _last_admin_usage_day, _last_admin_usage, _last_admin_usage_at
 
-@router.get("/usage/by-model")
+    # Usage is admin-wide and moves in minute-scale steps, so dashboard
+    # polls within the TTL share one result.
+    today = date.today()
+    now = _utc_now_naive()
+    if (
+        _last_admin_usage is not None
+        and _last_admin_usage_at is not None
+        and _last_admin_usage_day == today
+        and (now - _last_admin_usage_at) <= ADMIN_USAGE_CACHE_TTL
+    ):
+        return _last_admin_usage
+
+    starts = _usage_window_starts(today)
+    if await _has_recorded_usage(sessions):
+        usage = await _aggregate_usage_windows(sessions, starts)
+    else:
+        usage = _empty_usage_windows(starts)
+    _last_admin_usage_day = today
+    _last_admin_usage = usage
+    _last_admin_usage_at = now
+    return usage
+
+
+@router.get("/usage/by-model", response_model=ModelUsageOut)
 async def get_admin_usage_by_model(
     _: Annotated[User, Depends(get_admin_user)],
-    db: Annotated[AsyncSession, Depends(get_db)],
+    sessions: Annotated[
+        async_sessionmaker[AsyncSession], Depends(get_analytics_session_factory)
+    ],
     provider: str = Query(..., min_length=1),
     model: str = Query(..., min_length=1),
 ):
@@ -332,33 +615,17 @@ async def get_admin_usage_by_model(
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
-    month_start = today.replace(day=1)
+    usage = await _aggregate_usage_for_model_windows(
+        sessions,
+        _usage_window_starts(date.today()),
+        selected_provider,
+        canonical_provider,
+        canonical_model,
+    )
     return {
         "provider": selected_provider,
         "model": canonical_model,
-        "today": await _aggregate_usage_for_model(
-            db,
-            today,
-            selected_provider,
-            canonical_provider,
-            canonical_model,
-        ),
-        "this_week": await _aggregate_usage_for_model(
-            db,
-            week_start,
-            selected_provider,
-            canonical_provider,
-            canonical_model,
-        ),
-        "this_month": await _aggregate_usage_for_model(
-            db,
-            month_start,
-            selected_provider,
-            canonical_provider,
-            canonical_model,
-        ),
+        **usage,
     }
 
 
@@ -367,10 +634,22 @@ async def get_admin_llm_models(
     _: Annotated[User, Depends(get_admin_user)],
 ):
     """Return current active LLM and all smoke-tested available switch options."""
+    global _last_llm_catalog_key, _last_llm_catalog_response, _last_llm_catalog_at
+
     catalog = await ai_model_catalog_health_check(force=False)
+    cache_key = _llm_catalog_response_key(catalog)
+    now = _utc_now_naive()
+    if (
+        _last_llm_catalog_response is not None
+        and _last_llm_catalog_at is not None
+        and _last_llm_catalog_key == cache_key
+        and (now - _last_llm_catalog_at) <= LLM_CATALOG_RESPONSE_CACHE_TTL
+    ):
+        return {**_last_llm_catalog_response, "cached": True}
+
     llm_groups = catalog.get("smoke_tested_models", {}).get("llm", {})
-    options: list[dict[str, str | float]] = []
-    seen: set[tuple[str, str]] = set()
+    # Dict keys dedupe (admin provider, model) options in a single pass.
+    pairs: dict[tuple[str, str], None] = {}
 
     for provider_id, details in llm_groups.items():
         admin_provider = _normalise_admin_provider(str(provider_id))
@@ -385,35 +664,54 @@ async def get_admin_llm_models(
                 )
             except ValueError:
                 continue
-            key = (admin_provider, canonical_model)
-            if key in seen:
-                continue
-            seen.add(key)
-            options.append(_build_model_option(admin_provider, canonical_model))
-
-    current_provider = _active_admin_provider()
-    current_model = _configured_llm_model(current_provider)
-    if current_model:
-        key = (current_provider, current_model)
-        if key not in seen:
-            options.append(_build_model_option(current_provider, current_model))
-
-    options.sort(key=lambda item: (str(item["provider_label"]), str(item["model"])))
-    current = {
-        "provider": current_provider,
-        "model": current_model,
-        "google_gemini_transport": (
-            settings.google_gemini_transport
-            if current_provider in {GOOGLE_AI_STUDIO_PROVIDER, GOOGLE_VERTEX_PROVIDER}
-            else None
-        ),
-    }
-    return {
+            pairs.setdefault((admin_provider, canonical_model))
+
+    current = _current_llm()
+    if current["model"]:
+        pairs.setdefault((current["provider"], current["model"]))
+
+    options = [_build_model_option(provider_id, model_id) for provider_id, model_id in pairs]
+    options.sort(key=itemgetter("provider_label", "model"))
+    response = {
         "current": current,
         "available_models": options,
         "checked_at": str(catalog.get("checked_at", "")),
         "cached": bool(catalog.get("cached", False)),
     }
+    _last_llm_catalog_key = cache_key
+    _last_llm_catalog_response = response
+    _last_llm_catalog_at = now
+    return response
+
+
+def _recent_admin_password_failures(admin_id: uuid.UUID, now: datetime) -> list[datetime]:
+    cutoff = now - ADMIN_PASSWORD_FAILURE_WINDOW
+    failures = [at for at in _admin_password_failures.get(admin_id, []) if at > cutoff]
+    if failures:
+        _admin_password_failures[admin_id] = failures
+    else:
+        _admin_password_failures.pop(admin_id, None)
+    return failures
+
+
+async def _confirm_admin_password(admin: User, password: str) -> None:
+    """Check the admin password off the event loop, refusing early after repeated failures."""
+    now = _utc_now_naive()
+    failures = _recent_admin_password_failures(admin.id, now)
+    if len(failures) >= ADMIN_PASSWORD_FAILURE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many incorrect password attempts. Try again later.",
+        )
+
+    # bcrypt is CPU-bound; keep it off the event loop.
+    if not await asyncio.to_thread(verify_password, password, admin.password_hash):
+        _admin_password_failures[admin.id] = [*failures, now]
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Admin password is incorrect.",
+        )
+    _admin_password_failures.pop(admin.id, None)
 
 
 @router.post("/llm/switch")
@@ -423,11 +721,7 @@ async def switch_admin_llm_model(
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     """Switch the runtime LLM immediately after admin password confirmation."""
-    if not verify_password(payload.admin_password, admin.password_hash):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Admin password is incorrect.",
-        )
+    await _confirm_admin_password(admin, payload.admin_password)
 
     target_provider = _normalise_admin_provider(payload.provider)
     canonical_target_provider = _canonical_provider(target_provider)
@@ -445,33 +739,30 @@ async def switch_admin_llm_model(
                 detail="Selected model is not currently available for switching.",
             )
 
-    previous_provider = _active_admin_provider()
-    previous_models = _configured_llm_models_by_provider()
-    previous_transport = settings.google_gemini_transport
-    previous_model = previous_models.get(previous_provider, "")
-    _set_active_llm(target_provider, target_model)
+    previous = _current_llm()
 
     try:
-        resolved = get_llm_provider(settings)
-        if resolved.provider_id != canonical_target_provider or resolved.model_id != target_model:
-            raise RuntimeError(
-                "The selected model could not be activated because the runtime fell back."
-            )
-        target_transport = _google_transport_for_provider(target_provider)
-        if target_transport and settings.google_gemini_transport != target_transport:
-            raise RuntimeError("The selected Google transport could not be activated.")
+        with _llm_settings_transaction():
+            _set_active_llm(target_provider, target_model)
+            resolved = get_llm_provider(settings)
+            if (
+                resolved.provider_id != canonical_target_provider
+                or resolved.model_id != target_model
+            ):
+                raise RuntimeError(
+                    "The selected model could not be activated because the runtime fell back."
+                )
+            target_transport = _google_transport_for_provider(target_provider)
+            if target_transport and settings.google_gemini_transport != target_transport:
+                raise RuntimeError("The selected Google transport could not be activated.")
     except Exception as exc:
-        settings.llm_provider = _canonical_provider(previous_provider)
-        settings.llm_model_anthropic = previous_models["anthropic"]
-        settings.llm_model_openai = previous_models["openai"]
-        settings.llm_model_google = previous_models[GOOGLE_VERTEX_PROVIDER]
-        settings.google_gemini_transport = previous_transport
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to switch LLM model: {exc}",
         )
 
     invalidate_ai_model_catalog_cache()
+    invalidate_llm_catalog_response_cache()
 
     await audit_service.log_action(
         db,
@@ -480,7 +771,7 @@ async def switch_admin_llm_model(
         "llm_model",
         details=(
             "switched active LLM "
-            f"from {previous_provider}/{previous_model} to {target_provider}/{target_model}"
+            f"from {previous['provider']}/{previous['model']} to {target_provider}/{target_model}"
         ),
     )
     await db.commit()
@@ -493,7 +784,7 @@ async def switch_admin_llm_model(
             "model": target_model,
             "google_gemini_transport": (
                 settings.google_gemini_transport
-                if target_provider in {GOOGLE_AI_STUDIO_PROVIDER, GOOGLE_VERTEX_PROVIDER}
+                if target_provider in GOOGLE_ADMIN_PROVIDERS
                 else None
             ),
         },
@@ -507,37 +798,93 @@ async def switch_admin_llm_model(
 # ── Audit log ───────────────────────────────────────────────────────
 
 
-@router.get("/audit-log")
+async def _audit_versioned_etag(db: AsyncSession) -> str:
+    """Weak ETag for admin listings; every admin mutation adds an audit entry."""
+    return f'W/"{await audit_service.get_audit_log_version(db)}"'
+
+
+async def _ndjson_audit_entries(
+    sessions: async_sessionmaker[AsyncSession],
+    cursor: tuple[datetime, uuid.UUID] | None,
+    limit: int,
+):
+    # The stream outlives the request dependencies, so it owns its session.
+    async with sessions() as session:
+        async for entry in audit_service.iter_audit_log_after(session, cursor, limit):
+            yield to_json(entry) + b"\n"
+
+
+@router.get(
+    "/audit-log",
+    response_model=AuditLogPageOut,
+    response_model_exclude_unset=True,
+)
 async def get_audit_log(
+    request: Request,
+    response: Response,
     _: Annotated[User, Depends(get_admin_user)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-    page: int = Query(default=1, ge=1),
+    sessions: Annotated[
+        async_sessionmaker[AsyncSession], Depends(get_analytics_session_factory)
+    ],
+    page: int = Query(default=1, ge=1, deprecated=True),
     per_page: int = Query(default=50, ge=1, le=100),
+    cursor: str | None = Query(default=None, max_length=200),
+    stream: bool = Query(default=False),
 ):
-    """Return a paginated list of admin audit log entries."""
-    return await audit_service.get_audit_log(db, page, per_page)
+    """Return a paginated list of admin audit log entries.
+
+    Pass the previous response's `next_cursor` as `cursor` for keyset
+    pagination; the numeric `page` parameter is kept for existing clients.
+    With `stream=true` the entries after `cursor` are sent as NDJSON rows.
+    """
+    decoded = None
+    if cursor is not None:
+        try:
+            decoded = audit_service.decode_audit_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    if stream:
+        return StreamingResponse(
+            _ndjson_audit_entries(sessions, decoded, per_page),
+            media_type="application/x-ndjson",
+        )
+    async with sessions() as db:
+        not_modified = not_modified_response(request, response, await _audit_versioned_etag(db))
+        if not_modified is not None:
+            return not_modified
+        if decoded is None:
+            return await audit_service.get_audit_log(db, page, per_page)
+        return await audit_service.get_audit_log_after(db, decoded, per_page)
 
 
 # ── Zone management ─────────────────────────────────────────────────
 
 
+def _zone_out(zone: LearningZone, notebook_count: int) -> ZoneOut:
+    # Rows come straight from the database, so skip input validation.
+    return ZoneOut.model_construct(
+        id=zone.id,
+        title=zone.title,
+        description=zone.description,
+        order=zone.order,
+        created_at=zone.created_at,
+        notebook_count=notebook_count,
+    )
+
+
 @router.get("/zones", response_model=list[ZoneOut])
 async def list_admin_zones(
+    request: Request,
+    response: Response,
     _: Annotated[User, Depends(get_admin_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
+    not_modified = not_modified_response(request, response, await _audit_versioned_etag(db))
+    if not_modified is not None:
+        return not_modified
     zones_with_counts = await list_zones_with_notebook_counts(db)
-    return [
-        ZoneOut(
-            id=zone.id,
-            title=zone.title,
-            description=zone.description,
-            order=zone.order,
-            created_at=zone.created_at,
-            notebook_count=count,
-        )
-        for zone, count in zones_with_counts
-    ]
+    return [_zone_out(zone, count) for zone, count in zones_with_counts]
 
 
 @router.post("/zones", response_model=ZoneOut, status_code=status.HTTP_201_CREATED)
@@ -552,15 +899,7 @@ async def create_admin_zone(
         resource_id=zone.id, resource_title=zone.title,
     )
     await db.commit()
-    await db.refresh(zone)
-    return ZoneOut(
-        id=zone.id,
-        title=zone.title,
-        description=zone.description,
-        order=zone.order,
-        created_at=zone.created_at,
-        notebook_count=0,
-    )
+    return _zone_out(zone, 0)
 
 
 @router.put("/zones/{zone_id}", response_model=ZoneOut)
@@ -569,8 +908,14 @@ async def update_admin_zone(
     payload: ZoneUpdate,
     admin: Annotated[User, Depends(get_admin_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
+    sessions: Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)],
 ):
-    existing_zone = await get_zone(db, zone_id)
+    # The notebook count does not depend on the zone edit, so read it on a
+    # separate connection while the zone loads.
+    existing_zone, notebook_count = await asyncio.gather(
+        get_zone(db, zone_id),
+        _run_in_own_session(sessions, count_zone_notebooks, zone_id),
+    )
     if existing_zone is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zone not found")
     old_title = existing_zone.title
@@ -581,7 +926,6 @@ async def update_admin_zone(
     if zone is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zone not found")
 
-    notebook_count = len(await list_zone_notebooks(db, zone_id))
     detail_parts: list[str] = []
     if old_title != zone.title:
         detail_parts.append(f"title: '{old_title}' -> '{zone.title}'")
@@ -593,15 +937,7 @@ async def update_admin_zone(
         details="; ".join(detail_parts) if detail_parts else None,
     )
     await db.commit()
-    await db.refresh(zone)
-    return ZoneOut(
-        id=zone.id,
-        title=zone.title,
-        description=zone.description,
-        order=zone.order,
-        created_at=zone.created_at,
-        notebook_count=notebook_count,
-    )
+    return _zone_out(zone, notebook_count)
 
 
 @router.delete("/zones/{zone_id}")
@@ -645,7 +981,6 @@ async def add_zone_notebook(
         resource_id=notebook.id, resource_title=notebook.title,
     )
     await db.commit()
-    await db.refresh(notebook)
     return notebook
 
 
@@ -688,9 +1023,14 @@ async def import_zone_assets_bundle(
 @router.get("/zones/{zone_id}/notebooks", response_model=list[ZoneNotebookOut])
 async def get_zone_notebooks_for_admin(
     zone_id: uuid.UUID,
+    request: Request,
+    response: Response,
     _: Annotated[User, Depends(get_admin_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
+    not_modified = not_modified_response(request, response, await _audit_versioned_etag(db))
+    if not_modified is not None:
+        return not_modified
     notebooks = await list_zone_notebooks(db, zone_id)
     return notebooks
 
@@ -698,13 +1038,22 @@ async def get_zone_notebooks_for_admin(
 @router.get("/zones/{zone_id}/shared-files", response_model=list[ZoneSharedFileOut])
 async def get_zone_shared_files_for_admin(
     zone_id: uuid.UUID,
+    request: Request,
+    response: Response,
     _: Annotated[User, Depends(get_admin_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
+    sessions: Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)],
 ):
-    zone = await get_zone(db, zone_id)
+    not_modified = not_modified_response(request, response, await _audit_versioned_etag(db))
+    if not_modified is not None:
+        return not_modified
+    zone, shared_files = await asyncio.gather(
+        get_zone(db, zone_id),
+        _run_in_own_session(sessions, list_zone_shared_files, zone_id),
+    )
     if zone is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zone not found")
-    return await list_zone_shared_files(db, zone_id)
+    return shared_files
 
 
 @router.patch("/notebooks/{notebook_id}/metadata", response_model=ZoneNotebookOut)
@@ -756,7 +1105,6 @@ async def update_zone_notebook_metadata_for_admin(
         details="; ".join(detail_parts) if detail_parts else None,
     )
     await db.commit()
-    await db.refresh(notebook)
     return notebook
 
 
@@ -780,7 +1128,6 @@ async def replace_zone_notebook(
         resource_id=notebook.id, resource_title=notebook.title,
     )
     await db.commit()
-    await db.refresh(notebook)
     return notebook
 
 
@@ -824,7 +1171,7 @@ async def remove_zone_notebook(
 async def reorder_admin_zone_notebooks(
     zone_id: uuid.UUID,
     payload: ZoneReorder,
-    _: Annotated[User, Depends(get_admin_user)],
+    admin: Annotated[User, Depends(get_admin_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     try:
@@ -832,6 +1179,10 @@ async def reorder_admin_zone_notebooks(
     except ZoneValidationError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
+    await audit_service.log_action(
+        db, admin.email, "update", "zone", resource_id=zone_id,
+        details="notebook order updated",
+    )
     await db.commit()
     return {"message": "Notebook order updated"}
 
@@ -1,18 +1,29 @@
 """Authentication endpoints: register, login, refresh, profile."""
 
+import asyncio
 import uuid
+import zlib
+from functools import lru_cache
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, bindparam, exists, lambda_stmt, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.dependencies import get_current_user, get_db
+from app.dependencies import (
+    build_user_profile,
+    get_current_user,
+    get_current_user_profile,
+    get_db,
+    invalidate_user_profile_cache,
+)
 from app.models.user import User
+from app.routers._http_cache import not_modified_response
 from app.schemas.user import (
     ChangePassword,
+    MessageResponse,
     PasswordResetConfirmRequest,
     RegisterSendCodeRequest,
     RegisterWithCode,
@@ -23,10 +34,11 @@ from app.schemas.user import (
     UserProfileUpdate,
 )
 from app.services.auth_service import (
-    create_access_token,
-    create_refresh_token,
+    create_token_pair,
     decode_token,
+    dummy_password_hash,
     hash_password,
+    password_needs_rehash,
     verify_password,
 )
 from app.services.email_service import EmailDeliveryError
@@ -39,19 +51,32 @@ from app.services.email_verification_service import (
 )
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
+_USER_BY_EMAIL = lambda_stmt(lambda: select(User).where(User.email == bindparam("email")))
+
+
+@lru_cache(maxsize=8)
+def _refresh_cookie_attributes(
+    expire_days: int, secure: bool, samesite: str
+) -> bytes:
+    """Build the fixed Set-Cookie attributes for the refresh token once."""
+    attributes = f"; HttpOnly; Max-Age={expire_days * 24 * 60 * 60}; Path=/api/auth"
+    attributes += f"; SameSite={samesite}"
+    if secure:
+        attributes += "; Secure"
+    return attributes.encode("latin-1")
 
 
 def set_refresh_cookie(response: Response, refresh_token: str) -> None:
     """Set the refresh token as an httpOnly cookie."""
-    max_age_seconds = settings.jwt_refresh_token_expire_days * 24 * 60 * 60
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        httponly=True,
-        secure=settings.auth_cookie_secure,
-        samesite=settings.auth_cookie_samesite,
-        path="/api/auth",
-        max_age=max_age_seconds,
+    # JWTs are base64url segments joined by dots, so they need no cookie
+    # quoting; append the header directly instead of going via SimpleCookie.
+    attributes = _refresh_cookie_attributes(
+        settings.jwt_refresh_token_expire_days,
+        settings.auth_cookie_secure,
+        settings.auth_cookie_samesite,
+    )
+    response.raw_headers.append(
+        (b"set-cookie", b"refresh_token=" + refresh_token.encode("latin-1") + attributes)
     )
 
 
@@ -69,25 +94,37 @@ def _integrity_error_detail(exc: IntegrityError) -> str | None:
     return None
 
 
-@router.post("/register/send-code")
+def _profile_etag(profile: UserProfile) -> str:
+    """Weak ETag over the profile fields a user or admin can change."""
+    fields = (
+        profile.email,
+        profile.username,
+        profile.programming_level,
+        profile.maths_level,
+        profile.is_admin,
+    )
+    version = zlib.crc32(repr(fields).encode("utf-8"))
+    return f'W/"{profile.id.hex}-{version:08x}"'
+
+
+async def _user_exists(db: AsyncSession, condition: ColumnElement[bool]) -> bool:
+    """Check for a matching user without loading the row."""
+    return bool(await db.scalar(select(exists().where(condition))))
+
+
+@router.post("/register/send-code", response_model=MessageResponse)
 async def send_register_code(
     payload: RegisterSendCodeRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     """Send a registration verification code by email."""
     normalised_email = payload.email.lower()
-    email_result = await db.execute(
-        select(User).where(User.email == normalised_email)
-    )
-    if email_result.scalar_one_or_none():
+    if await _user_exists(db, User.email == normalised_email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
-    username_result = await db.execute(
-        select(User).where(User.username == payload.username)
-    )
-    if username_result.scalar_one_or_none():
+    if await _user_exists(db, User.username == payload.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken",
@@ -123,16 +160,12 @@ async def register(
 ):
     """Register a new user after verifying the email code."""
     normalised_email = user_data.email.lower()
-    result = await db.execute(select(User).where(User.email == normalised_email))
-    if result.scalar_one_or_none():
+    if await _user_exists(db, User.email == normalised_email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
-    username_result = await db.execute(
-        select(User).where(User.username == user_data.username)
-    )
-    if username_result.scalar_one_or_none():
+    if await _user_exists(db, User.username == user_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken",
@@ -153,7 +186,7 @@ async def register(
     user = User(
         email=normalised_email,
         username=user_data.username,
-        password_hash=hash_password(user_data.password),
+        password_hash=await asyncio.to_thread(hash_password, user_data.password),
         programming_level=user_data.programming_level,
         maths_level=user_data.maths_level,
         is_admin=normalised_email in settings.admin_email_set,
@@ -170,10 +203,8 @@ async def register(
                 detail=detail,
             ) from exc
         raise
-    await db.refresh(user)
 
-    access_token = create_access_token(str(user.id))
-    refresh_token = create_refresh_token(str(user.id))
+    access_token, refresh_token = create_token_pair(str(user.id))
     set_refresh_cookie(response, refresh_token)
     return TokenResponse(access_token=access_token)
 
@@ -185,18 +216,29 @@ async def login(
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     """Authenticate user and return tokens."""
-    result = await db.execute(
-        select(User).where(User.email == credentials.email.lower())
-    )
+    result = await db.execute(_USER_BY_EMAIL, {"email": credentials.email.lower()})
     user = result.scalar_one_or_none()
-    if not user or not verify_password(credentials.password, user.password_hash):
+    # Return the connection to the pool before the slow bcrypt check; the
+    # rehash commit below acquires one again only when it has to write.
+    await db.commit()
+    stored_hash = user.password_hash if user else dummy_password_hash()
+    password_ok = await asyncio.to_thread(
+        verify_password, credentials.password, stored_hash
+    )
+    if user is None or not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
+    if password_needs_rehash(user.password_hash):
+        # Upgrade hashes made under an older work factor while the plain
+        # password is at hand, so cost can rise without forced resets.
+        user.password_hash = await asyncio.to_thread(
+            hash_password, credentials.password
+        )
+        await db.commit()
 
-    access_token = create_access_token(str(user.id))
-    refresh_token = create_refresh_token(str(user.id))
+    access_token, refresh_token = create_token_pair(str(user.id))
     set_refresh_cookie(response, refresh_token)
 
     return TokenResponse(access_token=access_token)
@@ -231,38 +273,35 @@ async def refresh(
             detail="Invalid or expired refresh token",
         )
 
-    result = await db.execute(select(User).where(User.id == user_uuid))
-    user = result.scalar_one_or_none()
-    if not user:
+    # An EXISTS probe is enough to stop deleted accounts renewing their
+    # tokens; the row itself is not needed to mint the pair.
+    if not await _user_exists(db, User.id == user_uuid):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
 
-    access_token = create_access_token(str(user.id))
-    new_refresh_token = create_refresh_token(str(user.id))
+    access_token, new_refresh_token = create_token_pair(user_id)
     set_refresh_cookie(response, new_refresh_token)
 
     return TokenResponse(access_token=access_token)
 
 
-@router.post("/logout")
+@router.post("/logout", response_model=MessageResponse)
 async def logout(response: Response):
     """Clear the refresh token cookie."""
     response.delete_cookie(key="refresh_token", path="/api/auth")
     return {"message": "Logged out successfully"}
 
 
-@router.post("/password-reset/send-code")
+@router.post("/password-reset/send-code", response_model=MessageResponse)
 async def send_password_reset_code(
     payload: SendCodeRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     """Send a password reset verification code for a registered email."""
     normalised_email = payload.email.lower()
-    result = await db.execute(select(User).where(User.email == normalised_email))
-    user = result.scalar_one_or_none()
-    if user is None:
+    if not await _user_exists(db, User.email == normalised_email):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Email is not registered.",
@@ -289,14 +328,14 @@ async def send_password_reset_code(
     return {"message": "Verification code sent."}
 
 
-@router.post("/password-reset/confirm")
+@router.post("/password-reset/confirm", response_model=MessageResponse)
 async def confirm_password_reset(
     payload: PasswordResetConfirmRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     """Reset a password using a verified email code."""
     normalised_email = payload.email.lower()
-    result = await db.execute(select(User).where(User.email == normalised_email))
+    result = await db.execute(_USER_BY_EMAIL, {"email": normalised_email})
     user = result.scalar_one_or_none()
     if user is None:
         raise HTTPException(
@@ -316,15 +355,22 @@ async def confirm_password_reset(
             detail="Invalid or expired verification code",
         )
 
-    user.password_hash = hash_password(payload.new_password)
+    user.password_hash = await asyncio.to_thread(hash_password, payload.new_password)
     await db.commit()
     return {"message": "Password reset successfully."}
 
 
 @router.get("/me", response_model=UserProfile)
-async def get_me(current_user: Annotated[User, Depends(get_current_user)]):
+async def get_me(
+    request: Request,
+    response: Response,
+    profile: Annotated[UserProfile, Depends(get_current_user_profile)],
+):
     """Get the current user's profile."""
-    return current_user
+    not_modified = not_modified_response(request, response, _profile_etag(profile))
+    if not_modified is not None:
+        return not_modified
+    return profile
 
 
 @router.put("/me", response_model=UserProfile)
@@ -356,23 +402,29 @@ async def update_me(
                 detail=detail,
             ) from exc
         raise
-    await db.refresh(current_user)
-    return current_user
+    # Sessions keep attributes after commit and no column changes server-side
+    # on update, so the in-memory user already matches the row.
+    invalidate_user_profile_cache(current_user.id)
+    return build_user_profile(current_user)
 
 
-@router.put("/me/password")
+@router.put("/me/password", response_model=MessageResponse)
 async def change_password(
     payload: ChangePassword,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     """Reset password for the signed-in user after checking current password."""
-    if not verify_password(payload.current_password, current_user.password_hash):
+    if not await asyncio.to_thread(
+        verify_password, payload.current_password, current_user.password_hash
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect.",
         )
 
-    current_user.password_hash = hash_password(payload.new_password)
+    current_user.password_hash = await asyncio.to_thread(
+        hash_password, payload.new_password
+    )
     await db.commit()
     return {"message": "Password reset successfully."}
@@ -4,12 +4,16 @@ import asyncio
 import base64
 import json
 import logging
+import mmap
+import os
+import re
 import uuid as uuid_mod
 from collections import deque
+from contextlib import aclosing, asynccontextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from pathlib import Path
-from typing import Annotated, Literal
+from functools import lru_cache
+from typing import Annotated, AsyncIterator, Literal
 
 from fastapi import (
     APIRouter,
@@ -29,7 +33,7 @@ from app.ai.context_builder import (
     build_system_prompt,
     build_single_pass_system_prompt,
 )
-from app.ai.llm_base import LLMError
+from app.ai.llm_base import LLMError, LLMProvider
 from app.ai.llm_factory import (
     LLMTarget,
     build_llm_provider_for_target,
@@ -37,13 +41,19 @@ from app.ai.llm_factory import (
     list_llm_fallback_targets,
 )
 from app.ai.message_sanitizer import sanitise_history_messages
+from app.ai.pedagogy_engine import PedagogyEngine, StudentState
 from app.ai.pricing import estimate_llm_cost_usd
 from app.config import settings
 from app.db.session import AsyncSessionLocal
 from app.dependencies import get_current_user, get_db
 from app.models.chat import UploadedFile
 from app.models.user import User
-from app.schemas.chat import ChatMessageIn, TokenUsageOut
+from app.schemas.chat import (
+    ChatHistoryMessageOut,
+    ChatMessageIn,
+    ChatSessionListItem,
+    TokenUsageOut,
+)
 from app.services import chat_service
 from app.services.ai_services import get_ai_services
 from app.services.auth_service import decode_token
@@ -67,13 +77,19 @@ GENERIC_LLM_RETRY_EXHAUSTED_ERROR = (
 SAME_MODEL_RETRY_LIMIT = 5
 TWO_STEP_RECOVERY_ROUND_LIMIT = 4
 TWO_STEP_RECOVERY_RECONNECT_STATUS_STAGE = "two_step_recovery_round_reconnect"
+_VALID_SESSION_TYPES = frozenset(("general", "notebook", "zone"))
+_SCOPED_SESSION_TYPES = frozenset(("notebook", "zone"))
 CONTEXT_MODE_SEQUENCE: tuple[str, ...] = (
     "full_context",
     "sanitised_context",
     "fresh_turn_only",
 )
+# Base64 image payloads are rebuilt for every context-mode retry; keep a few
+# messages' worth (up to 5 MB each) so retries skip the read and encode.
+IMAGE_B64_CACHE_SIZE = 9
 
 # In-memory ring buffer for recent LLM errors, read by the admin endpoint.
+# Entries are kept newest first so reads need no reversal.
 _LLM_ERROR_RING_MAX = 50
 _llm_error_ring: deque[dict] = deque(maxlen=_LLM_ERROR_RING_MAX)
 _resolved_llm_error_ids: set[str] = set()
@@ -95,7 +111,7 @@ def _context_mode_at(index: int) -> Literal[
 class _SessionRuntimeState:
     """Per-session hidden pedagogy runtime state for a single WebSocket connection."""
 
-    student_state: "StudentState"
+    student_state: StudentState
     single_pass_header_failure_streak: int = 0
     auto_degraded_to_two_step_recovery: bool = False
     two_step_recovery_turns_since_degrade: int = 0
@@ -149,7 +165,7 @@ class _StageExecutionError(Exception):
 # ── REST endpoints ──────────────────────────────────────────────────
 
 
-@router.get("/api/chat/sessions")
+@router.get("/api/chat/sessions", response_model=list[ChatSessionListItem])
 async def list_sessions(
     current_user: Annotated[User, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
@@ -158,12 +174,12 @@ async def list_sessions(
 ):
     """Return chat sessions for one scope, newest first."""
     requested_type = (session_type or "general").strip().lower()
-    if requested_type not in {"general", "notebook", "zone"}:
+    if requested_type not in _VALID_SESSION_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid session type.",
         )
-    if requested_type in {"notebook", "zone"} and module_id is None:
+    if requested_type in _SCOPED_SESSION_TYPES and module_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="module_id is required for notebook and zone sessions.",
@@ -189,7 +205,7 @@ async def find_session_by_scope(
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     """Return an existing scoped session for a notebook or zone module."""
-    if session_type not in {"notebook", "zone"}:
+    if session_type not in _SCOPED_SESSION_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid session type.",
@@ -223,7 +239,10 @@ async def delete_session(
     return {"message": "Session deleted"}
 
 
-@router.get("/api/chat/sessions/{session_id}/messages")
+@router.get(
+    "/api/chat/sessions/{session_id}/messages",
+    response_model=list[ChatHistoryMessageOut],
+)
 async def get_session_messages(
     session_id: uuid_mod.UUID,
     current_user: Annotated[User, Depends(get_current_user)],
@@ -286,6 +305,27 @@ async def _authenticate_ws(token: str) -> User | None:
         return result.scalar_one_or_none()
 
 
+async def _load_chat_history(session_id: uuid_mod.UUID) -> list[dict]:
+    """Load chat history on its own session so it can overlap the turn's queries."""
+    async with AsyncSessionLocal() as history_db:
+        return await chat_service.get_chat_history(history_db, session_id)
+
+
+@asynccontextmanager
+async def _chat_turn_session(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Scope one chat turn on the connection's long-lived session.
+
+    Anything the turn did not commit is rolled back, which also returns the
+    pooled connection while the socket idles, and the identity map is
+    cleared so the next turn starts from fresh rows.
+    """
+    try:
+        yield db
+    finally:
+        await db.rollback()
+        db.expunge_all()
+
+
 async def _resolve_ws_token(websocket: WebSocket, query_token: str | None) -> str | None:
     """Resolve token from query string or initial auth frame."""
     if query_token:
@@ -309,6 +349,12 @@ async def _resolve_ws_token(websocket: WebSocket, query_token: str | None) -> st
     return stripped or None
 
 
+def _is_auth_frame(raw: str) -> bool:
+    """Return True for a late auth frame, which chat turns ignore."""
+    data = json.loads(raw)
+    return isinstance(data, dict) and data.get("type") == "auth"
+
+
 def _split_uploads(
     uploads: list[UploadedFile],
 ) -> tuple[list[UploadedFile], list[UploadedFile]]:
@@ -323,17 +369,23 @@ def _split_uploads(
     return images, documents
 
 
+@lru_cache(maxsize=8)
+def _too_many_files_message(max_images: int, max_documents: int) -> str:
+    return (
+        f"Too many files. You can upload up to {max_images} photos and "
+        f"{max_documents} files per message."
+    )
+
+
 def _validate_upload_mix(
     image_uploads: list[UploadedFile],
     document_uploads: list[UploadedFile],
+    slot_limits: tuple[int, int] | None = None,
 ) -> str | None:
     """Return an error message if upload limits are exceeded, else None."""
-    max_images, max_documents = get_upload_slot_limits()
+    max_images, max_documents = slot_limits or get_upload_slot_limits()
     if len(image_uploads) > max_images or len(document_uploads) > max_documents:
-        return (
-            f"Too many files. You can upload up to {max_images} photos and "
-            f"{max_documents} files per message."
-        )
+        return _too_many_files_message(max_images, max_documents)
     return None
 
 
@@ -343,17 +395,37 @@ def _build_enriched_message(
 ) -> str:
     """Merge user text with extracted document content."""
     clean_text = user_message.strip()
-    parts: list[str] = []
-    if clean_text:
-        parts.append(clean_text)
-    for document in document_uploads:
-        if document.extracted_text:
-            parts.append(f"[Attached document: {document.original_filename}]\n{document.extracted_text}")
+    if not document_uploads:
+        # Most turns carry no documents; skip building and joining a list.
+        return clean_text or "Please analyse the attached files."
+    parts = [clean_text] if clean_text else []
+    parts += (
+        f"[Attached document: {document.original_filename}]\n{document.extracted_text}"
+        for document in document_uploads
+        if document.extracted_text
+    )
     if not parts:
         return "Please analyse the attached files."
     return "\n\n".join(parts)
 
 
+@lru_cache(maxsize=IMAGE_B64_CACHE_SIZE)
+def _encode_image_b64(storage_path: str, mtime_ns: int) -> str:
+    """Read and base64-encode an image; keyed by mtime so rewrites re-encode.
+
+    The file is memory-mapped so the raw bytes are never copied onto the
+    heap; only the encoded payload is allocated.
+    """
+    with open(storage_path, "rb") as handle:
+        try:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Zero-byte files cannot be mapped.
+            return ""
+        with mapped:
+            return base64.b64encode(mapped).decode("ascii")
+
+
 def _build_multimodal_user_parts(
     enriched_message: str,
     image_uploads: list[UploadedFile],
@@ -361,10 +433,14 @@ def _build_multimodal_user_parts(
     """Construct multimodal message parts with base64 images."""
     parts: list[dict[str, str]] = [{"type": "text", "text": enriched_message}]
     for image in image_uploads:
-        image_path = Path(image.storage_path)
-        if not image_path.exists():
+        # One stat per image: its mtime keys the encode cache, and a missing
+        # file surfaces here rather than through a separate exists() check.
+        try:
+            mtime_ns = os.stat(image.storage_path).st_mtime_ns
+            b64_data = _encode_image_b64(image.storage_path, mtime_ns)
+        except OSError as exc:
+            logger.warning("Skipping unreadable image upload %s: %s", image.storage_path, exc)
             continue
-        b64_data = base64.b64encode(image_path.read_bytes()).decode("ascii")
         parts.append({
             "type": "image",
             "media_type": image.content_type,
@@ -382,13 +458,36 @@ def _truncate_text_by_tokens(llm, text: str, max_tokens: int) -> str:
     words = text.split()
     if not words:
         return ""
-    kept: list[str] = []
-    for word in words:
-        candidate = " ".join(kept + [word])
-        if llm.count_tokens(candidate) > max_tokens:
-            break
-        kept.append(word)
-    return " ".join(kept)
+    # Token counts grow with the word prefix, so bisect for the longest
+    # prefix that fits: O(log n) count calls instead of one per word.
+    low, high = 0, len(words)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if llm.count_tokens(" ".join(words[:mid])) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return " ".join(words[:low])
+
+
+def _truncate_text_pair_by_tokens(
+    llm,
+    first: str,
+    first_max_tokens: int,
+    second: str,
+    second_max_tokens: int,
+) -> tuple[str, str]:
+    """Truncate two texts that share one budget.
+
+    The first text is counted once; tokens it leaves unused are handed to
+    the second, so a short question leaves more room for a long answer.
+    """
+    first_tokens = llm.count_tokens(first) if first else 0
+    if first_tokens > first_max_tokens:
+        first = _truncate_text_by_tokens(llm, first, first_max_tokens)
+        first_tokens = first_max_tokens
+    second_budget = second_max_tokens + (first_max_tokens - first_tokens)
+    return first, _truncate_text_by_tokens(llm, second, second_budget)
 
 
 def _build_notebook_context_block(
@@ -406,9 +505,9 @@ def _build_notebook_context_block(
 
     parts = ["--- Student's Notebook ---", notebook_text, "--- End of Notebook ---"]
     if cell_code:
-        parts.extend(["", "--- Current Cell ---", cell_code, "--- End of Current Cell ---"])
+        parts += ("", "--- Current Cell ---", cell_code, "--- End of Current Cell ---")
     if error_output:
-        parts.extend(["", "--- Error Output ---", error_output, "--- End of Error Output ---"])
+        parts += ("", "--- Error Output ---", error_output, "--- End of Error Output ---")
     return "\n".join(parts)
 
 
@@ -418,11 +517,6 @@ def _build_single_pass_pedagogy_context(
     fast_signals,
 ) -> str:
     """Build a hidden pedagogy context block for single-pass metadata + reply generation."""
-    prev_question = (fast_signals.previous_question_text or "").strip()
-    prev_answer = (fast_signals.previous_answer_text or "").strip()
-    prev_question = _truncate_text_by_tokens(llm, prev_question, 500)
-    prev_answer = _truncate_text_by_tokens(llm, prev_answer, 700)
-
     eff_prog = student_state.effective_programming_level
     eff_maths = student_state.effective_maths_level
     cur_prog_hint = student_state.current_programming_hint_level
@@ -446,19 +540,84 @@ def _build_single_pass_pedagogy_context(
         "Your answer MUST obey both computed hint levels.",
     ]
     if fast_signals.has_previous_exchange:
-        parts.extend(
-            [
-                "",
-                "--- Previous Question ---",
-                prev_question or "(empty)",
-                "--- Previous Answer ---",
-                prev_answer or "(empty)",
-            ]
+        # Only pay for token counting when the previous exchange is rendered.
+        prev_question, prev_answer = _truncate_text_pair_by_tokens(
+            llm,
+            (fast_signals.previous_question_text or "").strip(),
+            500,
+            (fast_signals.previous_answer_text or "").strip(),
+            700,
+        )
+        parts += (
+            "",
+            "--- Previous Question ---",
+            prev_question or "(empty)",
+            "--- Previous Answer ---",
+            prev_answer or "(empty)",
         )
     parts.append("--- End Hidden Pedagogy Context ---")
     return "\n".join(parts)
 
 
+def _token_frame_prefix(session_id: str) -> str:
+    """Return the constant head of a turn's token frames.
+
+    Matches the compact encoding of ``WebSocket.send_json`` so only the
+    content needs encoding per frame.
+    """
+    return f'{{"type":"token","session_id":{json.dumps(session_id)},"content":'
+
+
+def _token_frame(prefix: str, content: str) -> str:
+    return f"{prefix}{json.dumps(content, ensure_ascii=False)}}}"
+
+
+_STREAM_END = object()
+
+
+async def _ready_chunk_batches(stream: AsyncIterator[str]) -> AsyncIterator[list[str]]:
+    """Yield stream chunks grouped by what has already arrived.
+
+    A background task drains the provider stream into a queue. Each batch
+    holds every chunk queued while the previous frame was being sent, so a
+    slow client gets fewer, larger frames and a fast one sees no extra delay.
+    A stream error is raised after the chunks that preceded it are yielded.
+    Callers wrap it in `aclosing` so an early exit stops the pump before the
+    provider streams any further.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def _pump() -> None:
+        try:
+            async for chunk in stream:
+                queue.put_nowait(chunk)
+        except Exception as exc:
+            queue.put_nowait(exc)
+        else:
+            queue.put_nowait(_STREAM_END)
+
+    pump_task = asyncio.create_task(_pump())
+    try:
+        while True:
+            item = await queue.get()
+            batch: list[str] = []
+            while True:
+                if item is _STREAM_END or isinstance(item, Exception):
+                    if batch:
+                        yield batch
+                    if item is _STREAM_END:
+                        return
+                    raise item
+                batch.append(item)
+                if queue.empty():
+                    break
+                item = queue.get_nowait()
+            yield batch
+    finally:
+        pump_task.cancel()
+        await asyncio.wait([pump_task])
+
+
 def _meta_event_payload(meta, session_id: str) -> dict[str, object]:
     """Format a `meta` websocket event payload from a pedagogy metadata object."""
     return {
@@ -475,26 +634,75 @@ def _meta_event_payload(meta, session_id: str) -> dict[str, object]:
 
 
 def _current_llm_runtime_signature() -> tuple[str, str, str]:
-    """Return the active runtime LLM selection as a comparable tuple."""
+    """Return the active runtime LLM selection as a comparable tuple.
+
+    Admins can switch the model at runtime, so this is read every turn; it
+    only touches the settings for the active provider.
+    """
     provider = settings.llm_provider
-    models = {
-        "anthropic": settings.llm_model_anthropic,
-        "openai": settings.llm_model_openai,
-        "google": settings.llm_model_google,
-    }
-    transport = settings.google_gemini_transport if provider == "google" else ""
-    return provider, models.get(provider, ""), transport
+    if provider == "google":
+        return provider, settings.llm_model_google, settings.google_gemini_transport
+    if provider == "anthropic":
+        return provider, settings.llm_model_anthropic, ""
+    if provider == "openai":
+        return provider, settings.llm_model_openai, ""
+    return provider, "", ""
+
+
+@lru_cache(maxsize=32)
+def _normalised_id(value: str | None) -> str:
+    """Lower-case and strip a provider or transport id.
+
+    Only a handful of distinct ids exist, so caching avoids rebuilding the
+    same strings on every usage segment.
+    """
+    return str(value or "").strip().lower()
+
+
+def _llm_identity(llm) -> tuple[str, str, str | None]:
+    """Return the normalised (provider, model, transport) of a provider instance."""
+    return (
+        _normalised_id(llm.provider_id),
+        str(llm.model_id or "").strip(),
+        _normalised_id(getattr(llm, "runtime_transport", "")) or None,
+    )
 
 
 def _llm_target_from_provider(llm) -> LLMTarget:
     """Build a comparable target tuple from a provider instance."""
-    return LLMTarget(
-        provider=str(llm.provider_id or "").strip().lower(),
-        model_id=str(llm.model_id or "").strip(),
-        google_transport=(
-            str(getattr(llm, "runtime_transport", "") or "").strip().lower() or None
-        ),
-    )
+    provider, model_id, transport = _llm_identity(llm)
+    return LLMTarget(provider=provider, model_id=model_id, google_transport=transport)
+
+
+def _candidate_targets_for(
+    cache: dict[LLMTarget, tuple[LLMTarget, ...]],
+    target: LLMTarget,
+) -> tuple[LLMTarget, ...]:
+    """Return the target followed by its fallbacks, computed once per target."""
+    candidates = cache.get(target)
+    if candidates is None:
+        fallbacks = list_llm_fallback_targets(
+            settings,
+            current_provider=target.provider,
+            current_model=target.model_id,
+            current_google_transport=target.google_transport,
+        )
+        candidates = (target, *fallbacks)
+        cache[target] = candidates
+    return candidates
+
+
+async def _cached_llm_candidate(
+    cache: dict[LLMTarget, tuple[LLMProvider, PedagogyEngine]],
+    target: LLMTarget,
+) -> tuple[LLMProvider, PedagogyEngine]:
+    """Return the provider and pedagogy engine for a target, building them once."""
+    cached = cache.get(target)
+    if cached is None:
+        llm = build_llm_provider_for_target(settings, target)
+        cached = (llm, await get_ai_services(llm))
+        cache[target] = cached
+    return cached
 
 
 def _runtime_usage_provider_id(
@@ -502,10 +710,10 @@ def _runtime_usage_provider_id(
     transport: str | None = None,
 ) -> str:
     """Return the provider id persisted to chat usage records."""
-    canonical = str(provider_id or "").strip().lower()
+    canonical = _normalised_id(provider_id)
     if canonical != "google":
         return canonical
-    effective_transport = str(transport or "").strip().lower()
+    effective_transport = _normalised_id(transport)
     if effective_transport == "aistudio":
         return GOOGLE_AI_STUDIO_PROVIDER
     if effective_transport == "vertex":
@@ -522,9 +730,9 @@ def _record_llm_error(
     detail: str,
     stage: str = "",
 ) -> None:
-    """Append an LLM error entry to the in-memory ring buffer."""
+    """Prepend an LLM error entry to the in-memory ring buffer."""
     error_id = uuid_mod.uuid4().hex
-    _llm_error_ring.append({
+    _llm_error_ring.appendleft({
         "id": error_id,
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "provider": provider,
@@ -546,7 +754,7 @@ def _record_llm_error(
 
 def get_recent_llm_errors(*, include_resolved: bool = False) -> list[dict]:
     """Return recent LLM errors, newest first. Used by the admin endpoint."""
-    recent = list(reversed(_llm_error_ring))
+    recent = list(_llm_error_ring)
     for error in recent:
         if not str(error.get("id", "")).strip():
             error["id"] = uuid_mod.uuid4().hex
@@ -570,6 +778,36 @@ def mark_llm_error_resolved(error_id: str) -> bool:
     return True
 
 
+def _marker_pattern(*markers: str) -> re.Pattern[str]:
+    """Compile substring markers into one case-insensitive alternation."""
+    return re.compile("|".join(re.escape(marker) for marker in markers), re.IGNORECASE)
+
+
+# Each class is matched with one regex scan instead of one `in` per marker.
+_PAYLOAD_INVALID_ERROR_RE = _marker_pattern(
+    "invalid_request_error",
+    "bad request",
+    "messages: text content",
+    "payload is empty after message sanitisation",
+    "payload is empty after sanitization",
+    "payload is empty",
+)
+_AUTH_ERROR_RE = _marker_pattern(
+    "401",
+    "403",
+    "unauthoriz",
+    "forbidden",
+    "api key",
+    "api_key",
+    "credential",
+    "authentication",
+    "permission",
+)
+_QUOTA_ERROR_RE = _marker_pattern("quota", "billing", "insufficient credit", "rate limit")
+_TIMEOUT_ERROR_RE = _marker_pattern("timeout", "timed out")
+_UPSTREAM_ERROR_RE = _marker_pattern("429", "500", "502", "503", "504")
+
+
 def _classify_llm_error(
     exc: Exception,
     llm_provider_id: str,
@@ -579,7 +817,6 @@ def _classify_llm_error(
 ) -> _ClassifiedLLMError:
     """Classify provider errors into a deterministic retry strategy."""
     raw_detail = str(exc).strip()
-    detail = raw_detail.lower()
 
     provider_label = llm_provider_id or "unknown"
     model_label = llm_model_id or ""
@@ -620,15 +857,7 @@ def _classify_llm_error(
             suggest_refresh_session=suggest_refresh_session,
         )
 
-    payload_invalid_markers = (
-        "invalid_request_error",
-        "bad request",
-        "messages: text content",
-        "payload is empty after message sanitisation",
-        "payload is empty after sanitization",
-        "payload is empty",
-    )
-    if any(marker in detail for marker in payload_invalid_markers):
+    if _PAYLOAD_INVALID_ERROR_RE.search(raw_detail):
         return _emit(
             error_code="payload_invalid",
             error_type="fatal",
@@ -638,18 +867,7 @@ def _classify_llm_error(
             suggest_refresh_session=True,
         )
 
-    auth_markers = (
-        "401",
-        "403",
-        "unauthoriz",
-        "forbidden",
-        "api key",
-        "api_key",
-        "credential",
-        "authentication",
-        "permission",
-    )
-    if any(marker in detail for marker in auth_markers):
+    if _AUTH_ERROR_RE.search(raw_detail):
         return _emit(
             error_code="auth_failed",
             error_type="fatal",
@@ -659,8 +877,7 @@ def _classify_llm_error(
             suggest_refresh_session=False,
         )
 
-    quota_markers = ("quota", "billing", "insufficient credit", "rate limit")
-    if any(marker in detail for marker in quota_markers):
+    if _QUOTA_ERROR_RE.search(raw_detail):
         return _emit(
             error_code="quota_or_rate_limit",
             error_type="transient",
@@ -670,7 +887,7 @@ def _classify_llm_error(
             suggest_refresh_session=False,
         )
 
-    if "timeout" in detail or "timed out" in detail:
+    if _TIMEOUT_ERROR_RE.search(raw_detail):
         return _emit(
             error_code="timeout",
             error_type="transient",
@@ -680,7 +897,7 @@ def _classify_llm_error(
             suggest_refresh_session=False,
         )
 
-    if "429" in detail or "500" in detail or "502" in detail or "503" in detail or "504" in detail:
+    if _UPSTREAM_ERROR_RE.search(raw_detail):
         return _emit(
             error_code="upstream_unavailable",
             error_type="transient",
@@ -744,11 +961,12 @@ def _status_event_payload(
 
 def _build_usage_segment(label: str, llm) -> _UsageSegment:
     """Capture one usage segment from the active provider."""
+    provider, model, transport = _llm_identity(llm)
     return _UsageSegment(
         label=label,
-        provider=str(llm.provider_id or "").strip().lower(),
-        model=str(llm.model_id or "").strip(),
-        transport=(str(getattr(llm, "runtime_transport", "") or "").strip().lower() or None),
+        provider=provider,
+        model=model,
+        transport=transport,
         input_tokens=int(getattr(llm.last_usage, "input_tokens", 0) or 0),
         output_tokens=int(getattr(llm.last_usage, "output_tokens", 0) or 0),
         usage_details=dict(getattr(llm.last_usage, "usage_details", {}) or {}),
@@ -777,11 +995,10 @@ async def websocket_chat(
     conn_id = uuid_mod.uuid4().hex
 
     # Enforce concurrent connection limit.
-    if not connection_tracker.can_connect(user_id_str):
+    if not connection_tracker.try_add(user_id_str, conn_id):
         await websocket.send_json({"type": "error", "message": "Too many connections"})
         await websocket.close(code=4002, reason="Too many connections")
         return
-    connection_tracker.add(user_id_str, conn_id)
 
     try:
         initial_llm = get_llm_provider(settings)
@@ -794,8 +1011,6 @@ async def websocket_chat(
         await websocket.close()
         return
 
-    from app.ai.pedagogy_engine import StudentState
-
     def _new_session_runtime_state(db_user: User) -> _SessionRuntimeState:
         return _SessionRuntimeState(
             student_state=StudentState(
@@ -824,6 +1039,20 @@ async def websocket_chat(
         1, int(settings.chat_two_step_recovery_turns_before_single_pass_retry or 1)
     )
     session_runtime_states: dict[str, _SessionRuntimeState] = {}
+    # Providers keep per-call state (last_usage), so they are cached per
+    # connection, where turns run one at a time, rather than process-wide.
+    llm_candidate_cache: dict[LLMTarget, tuple[LLMProvider, PedagogyEngine]] = {}
+    candidate_targets_cache: dict[LLMTarget, tuple[LLMTarget, ...]] = {}
+    # Follow-up questions on one notebook resend the same text; keep the last
+    # truncated context block so it is not rebuilt every turn.
+    cached_notebook_block: tuple[tuple, str] | None = None
+    # Upload limits come from startup settings, so read them once per connection.
+    upload_slot_limits = get_upload_slot_limits()
+    max_uploads_per_message = sum(upload_slot_limits)
+
+    # One session object serves every turn on this connection; each turn is
+    # scoped by _chat_turn_session so no transaction outlives it.
+    connection_db = AsyncSessionLocal()
 
     try:
         while True:
@@ -831,10 +1060,9 @@ async def websocket_chat(
 
             # Parse and validate the incoming message.
             try:
-                data = json.loads(raw)
-                if isinstance(data, dict) and data.get("type") == "auth":
+                if '"auth"' in raw and _is_auth_frame(raw):
                     continue
-                payload = ChatMessageIn.model_validate(data)
+                payload = ChatMessageIn.model_validate_json(raw)
             except (json.JSONDecodeError, ValidationError):
                 await websocket.send_json({"type": "error", "message": "Invalid message format"})
                 continue
@@ -849,6 +1077,8 @@ async def websocket_chat(
                     switched_llm = get_llm_provider(settings)
                     default_llm_target = _llm_target_from_provider(switched_llm)
                     llm_runtime_signature = current_signature
+                    llm_candidate_cache.clear()
+                    candidate_targets_cache.clear()
                     logger.info(
                         "Applied runtime LLM switch to provider=%s model=%s transport=%s",
                         default_llm_target.provider,
@@ -863,16 +1093,15 @@ async def websocket_chat(
                     })
                     continue
 
-            # Enforce per user rate limit.
-            if not rate_limiter.check_user(user_id_str):
+            # Enforce per user and global rate limits.
+            rate_limit_denial = rate_limiter.check_all(user_id_str)
+            if rate_limit_denial == "user":
                 await websocket.send_json({
                     "type": "error",
                     "message": "Rate limit reached. Please wait before sending another message.",
                 })
                 continue
-
-            # Enforce global rate limit.
-            if not rate_limiter.check_global():
+            if rate_limit_denial == "global":
                 await websocket.send_json({
                     "type": "error",
                     "message": "The service is busy. Please try again in a moment.",
@@ -885,12 +1114,10 @@ async def websocket_chat(
             cell_code = payload.cell_code.strip() if payload.cell_code else None
             error_output = payload.error_output.strip() if payload.error_output else None
 
-            max_items = settings.upload_max_images_per_message + settings.upload_max_documents_per_message
-            if len(upload_ids) > max_items:
-                max_images, max_documents = get_upload_slot_limits()
+            if len(upload_ids) > max_uploads_per_message:
                 await websocket.send_json({
                     "type": "error",
-                    "message": f"Too many files. You can upload up to {max_images} photos and {max_documents} files per message.",
+                    "message": _too_many_files_message(*upload_slot_limits),
                 })
                 continue
 
@@ -901,9 +1128,8 @@ async def websocket_chat(
                 })
                 continue
 
-            async with AsyncSessionLocal() as db:
-                db_user_result = await db.execute(select(User).where(User.id == user.id))
-                db_user = db_user_result.scalar_one_or_none()
+            async with _chat_turn_session(connection_db) as db:
+                db_user = await db.get(User, user.id)
                 if db_user is None:
                     await websocket.send_json({"type": "error", "message": "Authentication failed"})
                     await websocket.close(code=4001, reason="Authentication failed")
@@ -936,20 +1162,24 @@ async def websocket_chat(
                     session_type = "zone"
                     module_id = zone_notebook_id
 
-                # Resolve and validate uploads.
-                uploads = await get_user_uploads_by_ids(db, user.id, upload_ids)
-                if len(uploads) != len(upload_ids):
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "One or more attachments are invalid, expired, or inaccessible.",
-                    })
-                    continue
+                # Resolve and validate uploads; text-only turns skip this entirely.
+                uploads: list[UploadedFile] = []
+                image_uploads: list[UploadedFile] = []
+                document_uploads: list[UploadedFile] = []
+                if upload_ids:
+                    uploads = await get_user_uploads_by_ids(db, user.id, upload_ids)
+                    if len(uploads) != len(upload_ids):
+                        await websocket.send_json({
+                            "type": "error",
+                            "message": "One or more attachments are invalid, expired, or inaccessible.",
+                        })
+                        continue
 
-                image_uploads, document_uploads = _split_uploads(uploads)
-                mix_error = _validate_upload_mix(image_uploads, document_uploads)
-                if mix_error:
-                    await websocket.send_json({"type": "error", "message": mix_error})
-                    continue
+                    image_uploads, document_uploads = _split_uploads(uploads)
+                    mix_error = _validate_upload_mix(image_uploads, document_uploads, upload_slot_limits)
+                    if mix_error:
+                        await websocket.send_json({"type": "error", "message": mix_error})
+                        continue
 
                 enriched_user_message = _build_enriched_message(user_message, document_uploads)
 
@@ -988,6 +1218,9 @@ async def websocket_chat(
                         active_llm = get_llm_provider(settings)
                         active_pedagogy_engine = await get_ai_services(active_llm)
                         active_target = _llm_target_from_provider(active_llm)
+                        llm_candidate_cache.setdefault(
+                            active_target, (active_llm, active_pedagogy_engine)
+                        )
                     except Exception as exc:
                         logger.error("Failed to resolve initial LLM for session: %s", exc)
                         await websocket.send_json(
@@ -999,21 +1232,15 @@ async def websocket_chat(
                 if active_target is None:
                     active_target = default_llm_target
 
-                candidate_targets = [active_target] + list_llm_fallback_targets(
-                    settings,
-                    current_provider=active_target.provider,
-                    current_model=active_target.model_id,
-                    current_google_transport=active_target.google_transport,
-                )
+                candidate_targets = _candidate_targets_for(candidate_targets_cache, active_target)
                 resolved_initial_target = active_target
 
                 if active_llm is None or active_pedagogy_engine is None:
                     for idx, candidate_target in enumerate(candidate_targets):
                         try:
-                            active_llm = build_llm_provider_for_target(
-                                settings, candidate_target
+                            active_llm, active_pedagogy_engine = await _cached_llm_candidate(
+                                llm_candidate_cache, candidate_target
                             )
-                            active_pedagogy_engine = await get_ai_services(active_llm)
                             resolved_initial_target = candidate_target
                             if idx > 0:
                                 await websocket.send_json(
@@ -1037,21 +1264,30 @@ async def websocket_chat(
                     )
                     await db.commit()
                     continue
-                active_target = resolved_initial_target
-                candidate_targets = [active_target] + list_llm_fallback_targets(
-                    settings,
-                    current_provider=active_target.provider,
-                    current_model=active_target.model_id,
-                    current_google_transport=active_target.google_transport,
-                )
+                if resolved_initial_target != active_target:
+                    active_target = resolved_initial_target
+                    candidate_targets = _candidate_targets_for(
+                        candidate_targets_cache, active_target
+                    )
 
                 if notebook_extracted_text is not None:
-                    notebook_context = _build_notebook_context_block(
-                        active_llm,
+                    notebook_block_key = (
+                        type(active_llm),
+                        settings.notebook_max_context_tokens,
                         notebook_extracted_text,
                         cell_code,
                         error_output,
                     )
+                    if cached_notebook_block is not None and cached_notebook_block[0] == notebook_block_key:
+                        notebook_context = cached_notebook_block[1]
+                    else:
+                        notebook_context = _build_notebook_context_block(
+                            active_llm,
+                            notebook_extracted_text,
+                            cell_code,
+                            error_output,
+                        )
+                        cached_notebook_block = (notebook_block_key, notebook_context)
 
                 # Pre-call estimate for input guard (reject obviously oversized messages).
                 estimated_input = active_llm.count_tokens(enriched_user_message) + (
@@ -1064,8 +1300,20 @@ async def websocket_chat(
                     })
                     continue
 
-                # Pre-call weekly budget check (precise recording happens after API call).
-                if not await chat_service.check_weekly_limit(db, user.id):
+                # Pre-call weekly budget check (precise recording happens after API call),
+                # overlapped with loading the prior history on a second connection.
+                # The history is read before this turn's message is saved, so it
+                # already excludes it. The task group cancels and awaits the weekly
+                # check if the history load fails, so the turn's session is idle
+                # again before _chat_turn_session rolls it back.
+                async with asyncio.TaskGroup() as turn_reads:
+                    weekly_limit_task = turn_reads.create_task(
+                        chat_service.check_weekly_limit(db, user.id)
+                    )
+                    history_task = turn_reads.create_task(_load_chat_history(session.id))
+                within_weekly_limit = weekly_limit_task.result()
+                chat_history = history_task.result()
+                if not within_weekly_limit:
                     await websocket.send_json({
                         "type": "error",
                         "message": "Weekly token allowance reached. Please try again next week.",
@@ -1080,6 +1328,7 @@ async def websocket_chat(
                 await db.commit()
 
                 await websocket.send_json({"type": "session", "session_id": str(session.id)})
+                token_frame_prefix = _token_frame_prefix(str(session.id))
 
                 # Run pedagogy pipeline.
                 fast_signals = await active_pedagogy_engine.prepare_fast_signals(
@@ -1091,10 +1340,6 @@ async def websocket_chat(
                 # Record the request for rate limiting (counted when LLM is called).
                 rate_limiter.record(user_id_str)
 
-                chat_history = await chat_service.get_chat_history(db, session.id)
-                if chat_history:
-                    chat_history = chat_history[:-1]
-
                 summary_cache = chat_service.get_summary_cache_snapshot(session)
                 use_two_step_recovery_route = bool(
                     metadata_route_mode == "two_step_recovery_route"
@@ -1176,8 +1421,9 @@ async def websocket_chat(
                             primary_candidate_target,
                         )
                     target = candidate_targets[index]
-                    llm_candidate = build_llm_provider_for_target(settings, target)
-                    pedagogy_candidate = await get_ai_services(llm_candidate)
+                    llm_candidate, pedagogy_candidate = await _cached_llm_candidate(
+                        llm_candidate_cache, target
+                    )
                     current_candidate_index = index
                     current_llm = llm_candidate
                     current_pedagogy_engine = pedagogy_candidate
@@ -1280,15 +1526,22 @@ async def websocket_chat(
                     visible_state: dict[str, bool],
                 ) -> list[str]:
                     parts: list[str] = []
-                    async for chunk in llm_for_stage.generate_stream(
-                        system_prompt=system_prompt,
-                        messages=messages,
-                    ):
-                        if not chunk:
-                            continue
-                        visible_state["sent"] = True
-                        parts.append(chunk)
-                        await websocket.send_json({"type": "token", "session_id": str(session.id), "content": chunk})
+                    # aclosing stops the provider pump at once if a send fails.
+                    async with aclosing(
+                        _ready_chunk_batches(
+                            llm_for_stage.generate_stream(
+                                system_prompt=system_prompt,
+                                messages=messages,
+                            )
+                        )
+                    ) as batches:
+                        async for batch in batches:
+                            batch = [chunk for chunk in batch if chunk]
+                            if not batch:
+                                continue
+                            visible_state["sent"] = True
+                            parts += batch
+                            await websocket.send_text(_token_frame(token_frame_prefix, "".join(batch)))
                     return parts
 
                 pipeline_succeeded = False
@@ -1346,6 +1599,8 @@ async def websocket_chat(
                             ):
                                 parser = StreamMetaParser()
                                 single_pass_visible_chunks: list[str] = []
+                                # Body text accepted in the current stream batch, sent as one frame.
+                                pending_token_chunks: list[str] = []
                                 meta_sent = False
                                 attempt_stream_meta = None
                                 attempt_meta_source: str | None = None
@@ -1424,15 +1679,18 @@ async def websocket_chat(
                                             meta_sent = True
                                         visible_state["sent"] = True
                                         single_pass_visible_chunks.append(body_chunk)
-                                        await websocket.send_json(
-                                            {
-                                                "type": "token",
-                                                "session_id": str(session.id),
-                                                "content": body_chunk,
-                                            }
-                                        )
+                                        pending_token_chunks.append(body_chunk)
+
+                                async def _flush_pending_tokens() -> None:
+                                    if not pending_token_chunks:
+                                        return
+                                    content = "".join(pending_token_chunks)
+                                    pending_token_chunks.clear()
+                                    await websocket.send_text(
+                                        _token_frame(token_frame_prefix, content)
+                                    )
 
-                                async for chunk in llm_for_stage.generate_stream(
+                                stream = llm_for_stage.generate_stream(
                                     system_prompt=build_single_pass_system_prompt(
                                         programming_level=round(
                                             student_state.effective_programming_level
@@ -1446,9 +1704,14 @@ async def websocket_chat(
                                         notebook_context=notebook_context,
                                     ),
                                     messages=messages,
-                                ):
-                                    await _handle_parser_output(parser.feed(chunk))
+                                )
+                                async with aclosing(_ready_chunk_batches(stream)) as batches:
+                                    async for batch in batches:
+                                        for chunk in batch:
+                                            await _handle_parser_output(parser.feed(chunk))
+                                        await _flush_pending_tokens()
                                 await _handle_parser_output(parser.finalize())
+                                await _flush_pending_tokens()
 
                                 return {
                                     "meta": attempt_stream_meta,
@@ -1770,6 +2033,11 @@ async def websocket_chat(
                     student_state, enriched_user_message, assistant_text
                 )
 
+                usage_provider_id = _runtime_usage_provider_id(
+                    final_reply_target.provider,
+                    final_reply_target.google_transport,
+                )
+
                 # Update the user message with precise input tokens.
                 await chat_service.save_message(
                     db, session.id, "assistant", assistant_text,
@@ -1779,17 +2047,21 @@ async def websocket_chat(
                     maths_hint_level_used=result.maths_hint_level,
                     input_tokens=input_tokens,
                     output_tokens=output_tokens,
-                    llm_provider=_runtime_usage_provider_id(
-                        final_reply_target.provider,
-                        final_reply_target.google_transport,
-                    ),
+                    llm_provider=usage_provider_id,
                     llm_model=final_reply_target.model_id,
                     estimated_cost_usd=estimated_cost_usd,
                     llm_usage=usage_details,
                 )
 
                 # Record precise usage to daily totals.
-                await chat_service.record_token_usage(db, user.id, input_tokens, output_tokens)
+                await chat_service.record_token_usage(
+                    db,
+                    user.id,
+                    input_tokens,
+                    output_tokens,
+                    llm_provider=usage_provider_id,
+                    llm_model=final_reply_target.model_id,
+                )
 
                 db_user.effective_programming_level = student_state.effective_programming_level
                 db_user.effective_maths_level = student_state.effective_maths_level
@@ -1818,4 +2090,5 @@ async def websocket_chat(
         except Exception:
             pass
     finally:
+        await connection_db.close()
         connection_tracker.remove(user_id_str, conn_id)
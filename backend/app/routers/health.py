@@ -15,6 +15,8 @@ _last_ai_health_at: datetime | None = None
 AI_MODEL_HEALTH_CACHE_TTL = timedelta(seconds=60)
 _last_ai_models_result: dict | None = None
 _last_ai_models_at: datetime | None = None
+# Internal catalog key; stripped from the public `/ai/models` response.
+AVAILABLE_MODEL_INDEX_KEY = "_available_model_index"
 
 
 def _utc_now_naive() -> datetime:
@@ -29,6 +31,17 @@ def invalidate_ai_model_catalog_cache() -> None:
     _last_ai_models_at = None
 
 
+def build_available_model_index(smoke_results: dict) -> dict[str, frozenset[str]]:
+    """Map each smoke-tested provider to the set of its available model IDs."""
+    index: dict[str, frozenset[str]] = {}
+    for provider_id, details in smoke_results.get("llm", {}).items():
+        available = details.get("available_models", []) if isinstance(details, dict) else []
+        if not isinstance(available, list):
+            available = []
+        index[str(provider_id)] = frozenset(str(item) for item in available)
+    return index
+
+
 def _active_google_provider() -> str:
     transport = str(settings.google_gemini_transport).strip().lower()
     return "google-aistudio" if transport == "aistudio" else "google-vertex"
@@ -81,6 +94,7 @@ async def ai_model_catalog_health_check(force: bool = False) -> dict:
     payload = {
         "current": _current_runtime_llm(),
         "smoke_tested_models": smoke_results,
+        AVAILABLE_MODEL_INDEX_KEY: build_available_model_index(smoke_results),
     }
     _last_ai_models_result = payload
     _last_ai_models_at = now
@@ -133,4 +147,5 @@ async def ai_health_check(force: bool = False):
 @router.get("/ai/models")
 async def ai_models_health_api(force: bool = False):
     """Return smoke-tested available LLM models."""
-    return await ai_model_catalog_health_check(force=force)
+    catalog = await ai_model_catalog_health_check(force=force)
+    return {key: value for key, value in catalog.items() if key != AVAILABLE_MODEL_INDEX_KEY}
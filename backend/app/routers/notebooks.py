@@ -43,7 +43,6 @@ async def upload_notebook(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
     await db.commit()
-    await db.refresh(notebook)
     return notebook
 
 
@@ -84,7 +83,6 @@ async def save_notebook_state(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notebook not found")
 
     await db.commit()
-    await db.refresh(notebook)
     return notebook
 
 
@@ -117,5 +115,4 @@ async def rename_notebook_entry(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notebook not found")
 
     await db.commit()
-    await db.refresh(notebook)
     return notebook
@@ -9,6 +9,7 @@ from app.schemas.user import (
     UserProfileUpdate,
     ChangePassword,
     TokenResponse,
+    MessageResponse,
 )
 from app.schemas.chat import (
     ChatMessageIn,
@@ -45,6 +46,7 @@ __all__ = [
     "UserProfileUpdate",
     "ChangePassword",
     "TokenResponse",
+    "MessageResponse",
     "ChatMessageIn",
     "ChatMessageOut",
     "ChatSessionOut",
@@ -45,6 +45,18 @@ class ChatSessionListItem(BaseModel):
     created_at: datetime
 
 
+class ChatHistoryMessageOut(BaseModel):
+    id: UUID
+    role: str
+    content: str
+    programming_difficulty: int | None = None
+    maths_difficulty: int | None = None
+    programming_hint_level_used: int | None = None
+    maths_hint_level_used: int | None = None
+    attachments: list[AttachmentOut] = Field(default_factory=list)
+    created_at: datetime | None = None
+
+
 class TokenUsageOut(BaseModel):
     week_start: date
     week_end: date
@@ -3,6 +3,7 @@ from app.services.auth_service import (
     verify_password,
     create_access_token,
     create_refresh_token,
+    create_token_pair,
     decode_token,
 )
 from app.services.email_service import send_transactional_email, EmailDeliveryError
@@ -16,6 +17,7 @@ __all__ = [
     "verify_password",
     "create_access_token",
     "create_refresh_token",
+    "create_token_pair",
     "decode_token",
     "send_transactional_email",
     "EmailDeliveryError",
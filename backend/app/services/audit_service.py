@@ -1,12 +1,16 @@
 """Record and retrieve admin audit log entries."""
 
+import base64
+import binascii
 import uuid
+from datetime import datetime
 from math import ceil
+from typing import AsyncIterator
 
-from sqlalchemy import func, select
+from sqlalchemy import func, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.audit import AdminAuditLog
+from app.models.audit import AdminAuditLog, AdminAuditLogVersion
 
 
 async def log_action(
@@ -18,7 +22,13 @@ async def log_action(
     resource_title: str | None = None,
     details: str | None = None,
 ) -> AdminAuditLog:
-    """Create an audit log entry for an admin action."""
+    """Stage an audit log entry for an admin action.
+
+    The entry is only added to the session; it is written by the caller's
+    commit together with the change it records. The audit version row is
+    bumped in the same transaction, so its lock orders concurrent admin
+    commits and every one of them moves the listing ETags.
+    """
     entry = AdminAuditLog(
         admin_email=admin_email,
         action=action,
@@ -28,44 +38,132 @@ async def log_action(
         details=details,
     )
     db.add(entry)
-    await db.flush()
+    bumped = await db.execute(
+        update(AdminAuditLogVersion)
+        .where(AdminAuditLogVersion.id == 1)
+        .values(version=AdminAuditLogVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if bumped.rowcount == 0:
+        # Migration 015 seeds the row; schemas built from metadata start empty.
+        db.add(AdminAuditLogVersion(id=1, version=1))
     return entry
 
 
+async def get_audit_log_version(db: AsyncSession) -> str:
+    """Return a token that changes whenever an audit entry is committed.
+
+    Admin mutations stage their entry in the same commit, so the token
+    also versions everything those mutations touch.
+    """
+    version = await db.scalar(
+        select(AdminAuditLogVersion.version).where(AdminAuditLogVersion.id == 1)
+    )
+    return str(version or 0)
+
+
+def encode_audit_cursor(entry: AdminAuditLog) -> str:
+    """Encode an entry's `(created_at, id)` sort key as an opaque cursor."""
+    raw = f"{entry.created_at.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_audit_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Decode a cursor from `encode_audit_cursor`; raise ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, entry_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(entry_id)
+    except (UnicodeError, binascii.Error, ValueError) as exc:
+        raise ValueError("Invalid audit log cursor.") from exc
+
+
+def _serialise_entry(entry: AdminAuditLog) -> dict:
+    return {
+        "id": str(entry.id),
+        "admin_email": entry.admin_email,
+        "action": entry.action,
+        "resource_type": entry.resource_type,
+        "resource_id": str(entry.resource_id) if entry.resource_id else None,
+        "resource_title": entry.resource_title,
+        "details": entry.details,
+        "created_at": entry.created_at.isoformat() if entry.created_at else None,
+    }
+
+
+def _page_of_entries(rows: list[AdminAuditLog], per_page: int) -> dict:
+    """Trim the look-ahead row and derive the cursor for the following page."""
+    entries = rows[:per_page]
+    has_more = len(rows) > per_page
+    return {
+        "entries": [_serialise_entry(entry) for entry in entries],
+        "next_cursor": encode_audit_cursor(entries[-1]) if has_more else None,
+    }
+
+
+_NEWEST_FIRST = (AdminAuditLog.created_at.desc(), AdminAuditLog.id.desc())
+
+
 async def get_audit_log(
     db: AsyncSession,
     page: int = 1,
     per_page: int = 50,
 ) -> dict:
-    """Return a paginated list of audit entries in reverse chronological order."""
+    """Return a paginated list of audit entries in reverse chronological order.
+
+    Offset pagination scans every skipped row; prefer `get_audit_log_after`
+    for deep pages.
+    """
     count_result = await db.execute(select(func.count(AdminAuditLog.id)))
     total = count_result.scalar() or 0
 
     offset = (page - 1) * per_page
     result = await db.execute(
         select(AdminAuditLog)
-        .order_by(AdminAuditLog.created_at.desc())
+        .order_by(*_NEWEST_FIRST)
         .offset(offset)
-        .limit(per_page)
+        .limit(per_page + 1)
     )
-    entries = result.scalars().all()
+    rows = list(result.scalars().all())
 
     return {
-        "entries": [
-            {
-                "id": str(entry.id),
-                "admin_email": entry.admin_email,
-                "action": entry.action,
-                "resource_type": entry.resource_type,
-                "resource_id": str(entry.resource_id) if entry.resource_id else None,
-                "resource_title": entry.resource_title,
-                "details": entry.details,
-                "created_at": entry.created_at.isoformat() if entry.created_at else None,
-            }
-            for entry in entries
-        ],
+        **_page_of_entries(rows, per_page),
         "total": total,
         "page": page,
         "per_page": per_page,
         "total_pages": ceil(total / per_page) if per_page > 0 else 0,
     }
+
+
+def _entries_after_statement(cursor: tuple[datetime, uuid.UUID] | None):
+    statement = select(AdminAuditLog)
+    if cursor is not None:
+        created_at, entry_id = cursor
+        # A row-value comparison lets the planner seek straight into the
+        # `(created_at, id)` index instead of evaluating an OR per row.
+        statement = statement.where(
+            tuple_(AdminAuditLog.created_at, AdminAuditLog.id) < (created_at, entry_id)
+        )
+    return statement.order_by(*_NEWEST_FIRST)
+
+
+async def get_audit_log_after(
+    db: AsyncSession,
+    cursor: tuple[datetime, uuid.UUID] | None,
+    per_page: int = 50,
+) -> dict:
+    """Return the entries that follow `cursor` using keyset pagination."""
+    result = await db.execute(_entries_after_statement(cursor).limit(per_page + 1))
+    rows = list(result.scalars().all())
+    return {**_page_of_entries(rows, per_page), "per_page": per_page}
+
+
+async def iter_audit_log_after(
+    db: AsyncSession,
+    cursor: tuple[datetime, uuid.UUID] | None,
+    limit: int,
+) -> AsyncIterator[dict]:
+    """Yield serialised entries after `cursor` one row at a time."""
+    result = await db.stream_scalars(_entries_after_statement(cursor).limit(limit))
+    async for entry in result:
+        yield _serialise_entry(entry)
@@ -1,18 +1,27 @@
 """Password hashing, JWT token creation, and verification."""
 
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
 import bcrypt
-from jose import jwt, JWTError
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
 
 from app.config import settings
 
 ALGORITHM = "HS256"
 
 
+@lru_cache(maxsize=4)
+def _jwt_key(secret: str) -> Key:
+    """Build the HMAC key once; jose re-parses plain string secrets per call."""
+    return jwk.construct(secret, ALGORITHM)
+
+
 def hash_password(plain: str) -> str:
-    """Hash a plaintext password using bcrypt."""
-    return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    """Hash a plaintext password using bcrypt at the configured cost."""
+    salt = bcrypt.gensalt(rounds=settings.password_bcrypt_rounds)
+    return bcrypt.hashpw(plain.encode("utf-8"), salt).decode("utf-8")
 
 
 def verify_password(plain: str, hashed: str) -> bool:
@@ -24,17 +33,45 @@ def verify_password(plain: str, hashed: str) -> bool:
         return False
 
 
+@lru_cache(maxsize=4)
+def _dummy_password_hash(rounds: int) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(b"not-a-real-password-placeholder", salt).decode("utf-8")
+
+
+def dummy_password_hash() -> str:
+    """Return a throwaway hash at the configured cost.
+
+    Login verifies against it when no user matches, so unknown emails take
+    as long to reject as wrong passwords.
+    """
+    return _dummy_password_hash(settings.password_bcrypt_rounds)
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """Return True when a stored hash uses a lower cost than configured."""
+    # bcrypt hashes look like "$2b$12$<salt+digest>"; the cost sits third.
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return False
+    return int(parts[2]) < settings.password_bcrypt_rounds
+
+
+def _encode_token(user_id: str, token_type: str, expire: datetime) -> str:
+    payload = {
+        "sub": user_id,
+        "exp": expire,
+        "token_type": token_type,
+    }
+    return jwt.encode(payload, _jwt_key(settings.jwt_secret_key), algorithm=ALGORITHM)
+
+
 def create_access_token(user_id: str) -> str:
     """Create a short-lived access token."""
     expire = datetime.now(timezone.utc) + timedelta(
         minutes=settings.jwt_access_token_expire_minutes
     )
-    payload = {
-        "sub": user_id,
-        "exp": expire,
-        "token_type": "access",
-    }
-    return jwt.encode(payload, settings.jwt_secret_key, algorithm=ALGORITHM)
+    return _encode_token(user_id, "access", expire)
 
 
 def create_refresh_token(user_id: str) -> str:
@@ -42,18 +79,26 @@ def create_refresh_token(user_id: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(
         days=settings.jwt_refresh_token_expire_days
     )
-    payload = {
-        "sub": user_id,
-        "exp": expire,
-        "token_type": "refresh",
-    }
-    return jwt.encode(payload, settings.jwt_secret_key, algorithm=ALGORITHM)
+    return _encode_token(user_id, "refresh", expire)
+
+
+def create_token_pair(user_id: str) -> tuple[str, str]:
+    """Create an access and refresh token from one clock reading."""
+    now = datetime.now(timezone.utc)
+    access_expire = now + timedelta(minutes=settings.jwt_access_token_expire_minutes)
+    refresh_expire = now + timedelta(days=settings.jwt_refresh_token_expire_days)
+    return (
+        _encode_token(user_id, "access", access_expire),
+        _encode_token(user_id, "refresh", refresh_expire),
+    )
 
 
 def decode_token(token: str) -> dict:
     """Decode and validate a JWT token."""
     try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[ALGORITHM])
+        payload = jwt.decode(
+            token, _jwt_key(settings.jwt_secret_key), algorithms=[ALGORITHM]
+        )
         return payload
     except JWTError as e:
         raise ValueError(f"Invalid token: {e}")
@@ -406,18 +406,31 @@ async def delete_sessions_for_modules(
     return len(session_ids)
 
 
-async def get_daily_usage(db: AsyncSession, user_id: uuid.UUID) -> DailyTokenUsage:
-    """Get or create today's token usage record."""
+async def get_daily_usage(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    llm_provider: str = "",
+    llm_model: str = "",
+) -> DailyTokenUsage:
+    """Get or create today's token usage record for one provider/model."""
     today = date.today()
     result = await db.execute(
         select(DailyTokenUsage).where(
-            DailyTokenUsage.user_id == user_id, DailyTokenUsage.date == today
+            DailyTokenUsage.user_id == user_id,
+            DailyTokenUsage.date == today,
+            DailyTokenUsage.llm_provider == llm_provider,
+            DailyTokenUsage.llm_model == llm_model,
         )
     )
     usage = result.scalar_one_or_none()
     if not usage:
         usage = DailyTokenUsage(
-            user_id=user_id, date=today, input_tokens_used=0, output_tokens_used=0
+            user_id=user_id,
+            date=today,
+            llm_provider=llm_provider,
+            llm_model=llm_model,
+            input_tokens_used=0,
+            output_tokens_used=0,
         )
         db.add(usage)
         await db.flush()
@@ -473,11 +486,14 @@ async def record_token_usage(
     user_id: uuid.UUID,
     input_tokens: int,
     output_tokens: int,
+    llm_provider: str = "",
+    llm_model: str = "",
 ) -> None:
     """Atomically record precise input and output tokens to today's usage.
 
     Called after the LLM API returns, using the exact token counts
-    reported by the provider.
+    reported by the provider. Rows are keyed per provider/model so admin
+    usage can be served from these daily totals.
     """
     today = date.today()
     stmt = (
@@ -485,11 +501,18 @@ async def record_token_usage(
         .values(
             user_id=user_id,
             date=today,
+            llm_provider=llm_provider,
+            llm_model=llm_model,
             input_tokens_used=input_tokens,
             output_tokens_used=output_tokens,
         )
         .on_conflict_do_update(
-            index_elements=[DailyTokenUsage.user_id, DailyTokenUsage.date],
+            index_elements=[
+                DailyTokenUsage.user_id,
+                DailyTokenUsage.date,
+                DailyTokenUsage.llm_provider,
+                DailyTokenUsage.llm_model,
+            ],
             set_={
                 "input_tokens_used": DailyTokenUsage.input_tokens_used + input_tokens,
                 "output_tokens_used": DailyTokenUsage.output_tokens_used + output_tokens,
@@ -9,18 +9,17 @@ class ConnectionTracker:
     def __init__(self) -> None:
         self._connections: dict[str, set[str]] = {}
 
-    def can_connect(self, user_id: str) -> bool:
-        """Return True if the user has fewer than the maximum allowed connections."""
-        active = self._connections.get(user_id)
-        if active is None:
-            return True
-        return len(active) < settings.max_ws_connections_per_user
-
-    def add(self, user_id: str, connection_id: str) -> None:
-        """Register a new connection."""
-        if user_id not in self._connections:
-            self._connections[user_id] = set()
-        self._connections[user_id].add(connection_id)
+    def try_add(self, user_id: str, connection_id: str) -> bool:
+        """Register a connection if the user is under the limit.
+
+        Check and insert happen without an await in between, so concurrent
+        accepts on the event loop cannot both take the last slot.
+        """
+        active = self._connections.setdefault(user_id, set())
+        if len(active) >= settings.max_ws_connections_per_user:
+            return False
+        active.add(connection_id)
+        return True
 
     def remove(self, user_id: str, connection_id: str) -> None:
         """Unregister a connection on disconnect."""
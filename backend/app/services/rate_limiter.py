@@ -19,20 +19,22 @@ class RateLimiter:
         while window and window[0] < cutoff:
             window.popleft()
 
-    def check_user(self, user_id: str) -> bool:
-        """Return True if the user is within their per minute limit."""
-        now = time.monotonic()
-        window = self._user_windows.get(user_id)
-        if window is None:
-            return True
-        self._prune(window, now)
-        return len(window) < settings.rate_limit_user_per_minute
+    def check_all(self, user_id: str) -> str | None:
+        """Check both limits with one clock read.
 
-    def check_global(self) -> bool:
-        """Return True if the global per minute limit is not exceeded."""
+        Return None when the request may proceed, otherwise "user" or
+        "global" for the limit that was hit first.
+        """
         now = time.monotonic()
+        window = self._user_windows.get(user_id)
+        if window is not None:
+            self._prune(window, now)
+            if len(window) >= settings.rate_limit_user_per_minute:
+                return "user"
         self._prune(self._global_window, now)
-        return len(self._global_window) < settings.rate_limit_global_per_minute
+        if len(self._global_window) >= settings.rate_limit_global_per_minute:
+            return "global"
+        return None
 
     def record(self, user_id: str) -> None:
         """Record a request for both user and global counters."""
@@ -1,12 +1,15 @@
+import asyncio
 import base64
+import os
 import shutil
 import uuid
 from pathlib import Path
-from typing import Sequence
+from typing import BinaryIO, Sequence
 
 from fastapi import UploadFile
-from sqlalchemy import func, select
+from sqlalchemy import case, delete, exists, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
 from app.config import settings
 from app.models.zone import (
@@ -30,6 +33,10 @@ from app.services.upload_service import extract_ipynb_text
 
 ZONE_NOTEBOOKS_SUBDIR = "notebooks"
 ZONE_SHARED_SUBDIR = "shared"
+ZONE_INCOMING_SUBDIR = "incoming"
+UPLOAD_COPY_CHUNK_BYTES = 1024 * 1024
+# Uploads read together per batch; also bounds how many are held in memory.
+ZONE_IMPORT_READ_CONCURRENCY = 8
 
 
 class ZoneValidationError(ValueError):
@@ -148,20 +155,46 @@ def _safe_delete_zone_storage(zone_id: uuid.UUID) -> None:
         pass
 
 
-def _validate_asset_content(filename: str, content: bytes) -> None:
-    if not content:
+def _validate_asset_size(filename: str, size_bytes: int) -> None:
+    if size_bytes == 0:
         raise ZoneValidationError(f"File '{filename}' is empty.")
-    if len(content) > notebook_size_limit_bytes():
+    if size_bytes > notebook_size_limit_bytes():
         raise ZoneValidationError(
             f"File '{filename}' exceeds {settings.notebook_max_size_mb} MB size limit."
         )
 
 
-async def _next_notebook_order(db: AsyncSession, zone_id: uuid.UUID) -> int:
+def _validate_asset_content(filename: str, content: bytes) -> None:
+    _validate_asset_size(filename, len(content))
+
+
+def _copy_upload_to_path(source: BinaryIO, destination: Path) -> int:
+    """Copy an upload in fixed-size chunks, stopping once it exceeds the size limit."""
+    limit = notebook_size_limit_bytes()
+    size_bytes = 0
+    with destination.open("wb") as target:
+        while chunk := source.read(UPLOAD_COPY_CHUNK_BYTES):
+            target.write(chunk)
+            size_bytes += len(chunk)
+            if size_bytes > limit:
+                break
+    return size_bytes
+
+
+async def count_zone_notebooks(db: AsyncSession, zone_id: uuid.UUID) -> int:
     count_result = await db.execute(
         select(func.count(ZoneNotebook.id)).where(ZoneNotebook.zone_id == zone_id)
     )
-    return int(count_result.scalar_one()) + 1
+    return int(count_result.scalar_one())
+
+
+async def _next_notebook_order(db: AsyncSession, zone_id: uuid.UUID) -> int:
+    return await count_zone_notebooks(db, zone_id) + 1
+
+
+def _parse_zone_notebook(content: bytes) -> tuple[str, str]:
+    """Validate notebook JSON and extract its text; CPU-bound, so run off the event loop."""
+    return parse_ipynb_bytes(content, ZoneValidationError), extract_ipynb_text(content)
 
 
 async def _create_notebook_from_content(
@@ -173,13 +206,12 @@ async def _create_notebook_from_content(
     content: bytes,
     display_order: int,
 ) -> ZoneNotebook:
-    notebook_json = parse_ipynb_bytes(content, ZoneValidationError)
-    extracted_text = extract_ipynb_text(content)
+    notebook_json, extracted_text = await asyncio.to_thread(_parse_zone_notebook, content)
 
     storage_dir = _zone_notebooks_dir(zone_id)
     stored_filename = f"zone_{uuid.uuid4().hex}.ipynb"
     storage_path = storage_dir / stored_filename
-    storage_path.write_bytes(content)
+    await asyncio.to_thread(storage_path.write_bytes, content)
 
     zone_notebook = ZoneNotebook(
         zone_id=zone_id,
@@ -203,7 +235,8 @@ async def _upsert_shared_file(
     zone_id: uuid.UUID,
     relative_path: str,
     filename: str,
-    content: bytes,
+    spooled_path: Path,
+    size_bytes: int,
     content_type: str | None,
 ) -> tuple[ZoneSharedFile, bool]:
     existing_result = await db.execute(
@@ -215,7 +248,7 @@ async def _upsert_shared_file(
     existing = existing_result.scalar_one_or_none()
 
     storage_path = _resolve_shared_storage_path(zone_id, relative_path)
-    storage_path.write_bytes(content)
+    os.replace(spooled_path, storage_path)
     if existing is None:
         shared = ZoneSharedFile(
             zone_id=zone_id,
@@ -224,7 +257,7 @@ async def _upsert_shared_file(
             stored_filename=f"shared_{uuid.uuid4().hex}{normalise_extension(filename)}",
             storage_path=str(storage_path),
             content_type=(content_type or "").strip() or None,
-            size_bytes=len(content),
+            size_bytes=size_bytes,
         )
         db.add(shared)
         await db.flush()
@@ -233,7 +266,7 @@ async def _upsert_shared_file(
     existing.original_filename = filename
     existing.storage_path = str(storage_path)
     existing.content_type = (content_type or "").strip() or None
-    existing.size_bytes = len(content)
+    existing.size_bytes = size_bytes
     await db.flush()
     return existing, False
 
@@ -283,7 +316,8 @@ async def update_zone(
     zone_id: uuid.UUID,
     **fields,
 ) -> LearningZone | None:
-    zone = await get_zone(db, zone_id)
+    # Reuses the zone from the identity map when the caller already loaded it.
+    zone = await db.get(LearningZone, zone_id)
     if zone is None:
         return None
 
@@ -310,18 +344,29 @@ async def delete_zone(
     if zone is None:
         return False
 
-    notebooks = await list_zone_notebooks(db, zone_id)
+    # Only ids and paths are needed; skip loading notebook JSON and text.
+    notebook_rows = (
+        await db.execute(
+            select(ZoneNotebook.id, ZoneNotebook.storage_path).where(
+                ZoneNotebook.zone_id == zone_id
+            )
+        )
+    ).all()
     await chat_service.delete_sessions_for_modules(
         db,
         session_type="zone",
-        module_ids=[item.id for item in notebooks],
+        module_ids=[row.id for row in notebook_rows],
     )
-    for notebook in notebooks:
-        safe_delete_file(notebook.storage_path)
+    for row in notebook_rows:
+        safe_delete_file(row.storage_path)
 
-    shared_files = await list_zone_shared_files(db, zone_id)
-    for shared in shared_files:
-        safe_delete_file(shared.storage_path)
+    shared_paths = (
+        await db.scalars(
+            select(ZoneSharedFile.storage_path).where(ZoneSharedFile.zone_id == zone_id)
+        )
+    ).all()
+    for storage_path in shared_paths:
+        safe_delete_file(storage_path)
 
     _safe_delete_zone_storage(zone_id)
     await db.delete(zone)
@@ -360,6 +405,30 @@ async def add_notebook(
     )
 
 
+async def _receive_asset(
+    zone_id: uuid.UUID,
+    upload: UploadFile,
+    is_notebook: bool,
+) -> bytes | tuple[Path, int]:
+    """Read a notebook into memory, or spool any other file to zone storage in chunks.
+
+    Notebooks are parsed and stored in the database, so they need their
+    bytes; shared files only need to land on disk.
+    """
+    try:
+        if is_notebook:
+            return await upload.read()
+        spooled_path = _ensure_zone_subdir(zone_id, ZONE_INCOMING_SUBDIR) / uuid.uuid4().hex
+        try:
+            size_bytes = await asyncio.to_thread(_copy_upload_to_path, upload.file, spooled_path)
+        except BaseException:
+            safe_delete_file(str(spooled_path))
+            raise
+        return spooled_path, size_bytes
+    finally:
+        await upload.close()
+
+
 async def import_zone_assets(
     db: AsyncSession,
     zone_id: uuid.UUID,
@@ -389,41 +458,73 @@ async def import_zone_assets(
     shared_files_created = 0
     shared_files_updated = 0
 
+    assets: list[tuple[UploadFile, str, str, bool]] = []
     for upload, raw_filename, normalised_path in prepared:
         relative_path = _strip_leading_folder(normalised_path, leading_folder)
         leaf_filename = Path(relative_path).name or raw_filename
+        is_notebook = normalise_extension(leaf_filename) == ".ipynb"
+        assets.append((upload, relative_path, leaf_filename, is_notebook))
 
-        content = await upload.read()
-        await upload.close()
-        _validate_asset_content(leaf_filename, content)
-
-        extension = normalise_extension(leaf_filename)
-        if extension == ".ipynb":
-            await _create_notebook_from_content(
-                db,
-                zone_id=zone_id,
-                filename=leaf_filename,
-                title=_derive_title_from_filename(leaf_filename),
-                description=None,
-                content=content,
-                display_order=next_order,
+    received_count = 0
+    try:
+        for batch_start in range(0, len(assets), ZONE_IMPORT_READ_CONCURRENCY):
+            batch = assets[batch_start : batch_start + ZONE_IMPORT_READ_CONCURRENCY]
+            # Let every read in the batch settle so a failed one cannot strand
+            # files its siblings already spooled.
+            received = await asyncio.gather(
+                *(
+                    _receive_asset(zone_id, upload, is_notebook)
+                    for upload, _, _, is_notebook in batch
+                ),
+                return_exceptions=True,
             )
-            notebooks_created += 1
-            next_order += 1
-            continue
-
-        _, created = await _upsert_shared_file(
-            db,
-            zone_id=zone_id,
-            relative_path=relative_path,
-            filename=leaf_filename,
-            content=content,
-            content_type=upload.content_type,
-        )
-        if created:
-            shared_files_created += 1
-        else:
-            shared_files_updated += 1
+            received_count = batch_start + len(batch)
+            try:
+                for asset in received:
+                    if isinstance(asset, BaseException):
+                        raise asset
+                for (upload, relative_path, leaf_filename, is_notebook), asset in zip(
+                    batch, received
+                ):
+                    if is_notebook:
+                        _validate_asset_content(leaf_filename, asset)
+                        await _create_notebook_from_content(
+                            db,
+                            zone_id=zone_id,
+                            filename=leaf_filename,
+                            title=_derive_title_from_filename(leaf_filename),
+                            description=None,
+                            content=asset,
+                            display_order=next_order,
+                        )
+                        notebooks_created += 1
+                        next_order += 1
+                        continue
+
+                    spooled_path, size_bytes = asset
+                    _validate_asset_size(leaf_filename, size_bytes)
+                    _, created = await _upsert_shared_file(
+                        db,
+                        zone_id=zone_id,
+                        relative_path=relative_path,
+                        filename=leaf_filename,
+                        spooled_path=spooled_path,
+                        size_bytes=size_bytes,
+                        content_type=upload.content_type,
+                    )
+                    if created:
+                        shared_files_created += 1
+                    else:
+                        shared_files_updated += 1
+            finally:
+                # Spooled files are moved into place once stored; drop any left over.
+                for asset in received:
+                    if isinstance(asset, tuple):
+                        safe_delete_file(str(asset[0]))
+    finally:
+        # A failed batch stops the import; close the uploads it never reached.
+        for upload, _, _, _ in assets[received_count:]:
+            await upload.close()
 
     return {
         "notebooks_created": notebooks_created,
@@ -452,14 +553,13 @@ async def replace_notebook_content(
     await file.close()
     _validate_asset_content(filename, content)
 
-    notebook_json = parse_ipynb_bytes(content, ZoneValidationError)
-    extracted_text = extract_ipynb_text(content)
+    notebook_json, extracted_text = await asyncio.to_thread(_parse_zone_notebook, content)
 
     old_path = notebook.storage_path
     storage_dir = _zone_notebooks_dir(notebook.zone_id)
     stored_filename = f"zone_{uuid.uuid4().hex}.ipynb"
     storage_path = storage_dir / stored_filename
-    storage_path.write_bytes(content)
+    await asyncio.to_thread(storage_path.write_bytes, content)
 
     notebook.original_filename = filename
     notebook.stored_filename = stored_filename
@@ -496,14 +596,32 @@ async def update_zone_notebook_metadata(
     return notebook
 
 
+def _zone_notebook_listing(*columns):
+    """Select a zone's notebooks in display order, loading only the list-view columns."""
+    return (
+        select(ZoneNotebook, *columns)
+        .options(
+            load_only(
+                ZoneNotebook.zone_id,
+                ZoneNotebook.title,
+                ZoneNotebook.description,
+                ZoneNotebook.original_filename,
+                ZoneNotebook.size_bytes,
+                ZoneNotebook.order,
+                ZoneNotebook.created_at,
+                raiseload=True,
+            )
+        )
+        .order_by(ZoneNotebook.order.asc(), ZoneNotebook.created_at.asc())
+    )
+
+
 async def list_zone_notebooks(
     db: AsyncSession,
     zone_id: uuid.UUID,
 ) -> list[ZoneNotebook]:
     result = await db.execute(
-        select(ZoneNotebook)
-        .where(ZoneNotebook.zone_id == zone_id)
-        .order_by(ZoneNotebook.order.asc(), ZoneNotebook.created_at.asc())
+        _zone_notebook_listing().where(ZoneNotebook.zone_id == zone_id)
     )
     return list(result.scalars().all())
 
@@ -513,19 +631,16 @@ async def list_zone_notebooks_with_progress(
     zone_id: uuid.UUID,
     user_id: uuid.UUID,
 ) -> list[tuple[ZoneNotebook, bool]]:
-    notebooks = await list_zone_notebooks(db, zone_id)
-    if not notebooks:
-        return []
-
-    notebook_ids = [item.id for item in notebooks]
-    progress_result = await db.execute(
-        select(ZoneNotebookProgress.zone_notebook_id).where(
-            ZoneNotebookProgress.user_id == user_id,
-            ZoneNotebookProgress.zone_notebook_id.in_(notebook_ids),
+    has_progress = exists().where(
+        ZoneNotebookProgress.user_id == user_id,
+        ZoneNotebookProgress.zone_notebook_id == ZoneNotebook.id,
+    )
+    result = await db.execute(
+        _zone_notebook_listing(has_progress.label("has_progress")).where(
+            ZoneNotebook.zone_id == zone_id
         )
     )
-    progress_ids = {row[0] for row in progress_result.all()}
-    return [(item, item.id in progress_ids) for item in notebooks]
+    return [(item, bool(progress)) for item, progress in result.all()]
 
 
 async def get_zone_notebook(
@@ -648,19 +763,30 @@ async def reorder_zone_notebooks(
     if zone is None:
         raise ZoneValidationError("Zone not found.")
 
-    notebooks = await list_zone_notebooks(db, zone_id)
-    if len(notebooks) != len(notebook_ids):
+    current_ids = set(
+        (
+            await db.scalars(select(ZoneNotebook.id).where(ZoneNotebook.zone_id == zone_id))
+        ).all()
+    )
+    if len(current_ids) != len(notebook_ids):
         raise ZoneValidationError("Notebook order payload is incomplete.")
 
-    current_ids = {item.id for item in notebooks}
     requested_ids = set(notebook_ids)
     if current_ids != requested_ids:
         raise ZoneValidationError("Notebook order payload is invalid.")
-
-    notebook_map = {item.id: item for item in notebooks}
-    for index, notebook_id in enumerate(notebook_ids, start=1):
-        notebook_map[notebook_id].order = index
-    await db.flush()
+    if not notebook_ids:
+        return
+
+    # One UPDATE maps every id to its new position instead of one per row.
+    # It is limited to the listed ids so a notebook added since the check
+    # above keeps its order instead of being set to NULL.
+    new_order = {notebook_id: index for index, notebook_id in enumerate(notebook_ids, start=1)}
+    await db.execute(
+        update(ZoneNotebook)
+        .where(ZoneNotebook.zone_id == zone_id, ZoneNotebook.id.in_(notebook_ids))
+        .values(order=case(new_order, value=ZoneNotebook.id))
+        .execution_options(synchronize_session=False)
+    )
 
 
 async def list_zone_shared_files(
@@ -679,16 +805,17 @@ async def delete_zone_shared_file(
     db: AsyncSession,
     shared_file_id: uuid.UUID,
 ) -> bool:
-    result = await db.execute(
-        select(ZoneSharedFile).where(ZoneSharedFile.id == shared_file_id)
+    # Delete and read back the path in one statement; the caller's audit
+    # entry is flushed with the commit.
+    storage_path = await db.scalar(
+        delete(ZoneSharedFile)
+        .where(ZoneSharedFile.id == shared_file_id)
+        .returning(ZoneSharedFile.storage_path)
     )
-    shared_file = result.scalar_one_or_none()
-    if shared_file is None:
+    if storage_path is None:
         return False
 
-    safe_delete_file(shared_file.storage_path)
-    await db.delete(shared_file)
-    await db.flush()
+    safe_delete_file(storage_path)
     return True
 
 
@@ -2,6 +2,7 @@
 
 from datetime import datetime, timezone
 import uuid
+from types import SimpleNamespace
 
 import pytest
 
@@ -44,8 +45,13 @@ class _FakeReadSession:
 class _FakeWriteSession:
     def __init__(self) -> None:
         self.added: list[AdminAuditLog] = []
+        self.executed: list[object] = []
         self.flushed = False
 
+    async def execute(self, statement):
+        self.executed.append(statement)
+        return SimpleNamespace(rowcount=1)
+
     def add(self, entry: AdminAuditLog) -> None:
         self.added.append(entry)
 
@@ -96,8 +102,8 @@ def test_audit_log_action_values() -> None:
 
 
 @pytest.mark.asyncio
-async def test_log_action_adds_entry_and_flushes() -> None:
-    """log_action should stage the entry and flush once."""
+async def test_log_action_stages_entry_without_flushing() -> None:
+    """log_action should only stage the entry for the caller's commit."""
     db = _FakeWriteSession()
 
     entry = await audit_service.log_action(
@@ -108,8 +114,9 @@ async def test_log_action_adds_entry_and_flushes() -> None:
         resource_title="Week 1",
     )
 
-    assert db.flushed is True
+    assert db.flushed is False
     assert db.added == [entry]
+    assert len(db.executed) == 1
     assert entry.admin_email == "admin@example.com"
     assert entry.resource_title == "Week 1"
 
@@ -138,3 +145,137 @@ async def test_get_audit_log_returns_paginated_shape() -> None:
     assert len(payload["entries"]) == 1
     assert payload["entries"][0]["admin_email"] == "admin@example.com"
     assert payload["entries"][0]["resource_title"] == "Week 2"
+    assert payload["next_cursor"] is None
+
+
+def _entry_at(created_at: datetime) -> AdminAuditLog:
+    entry = AdminAuditLog(
+        id=uuid.uuid4(),
+        admin_email="admin@example.com",
+        action="update",
+        resource_type="zone",
+    )
+    entry.created_at = created_at
+    return entry
+
+
+class _FakeKeysetSession:
+    def __init__(self, entries: list[AdminAuditLog]) -> None:
+        self._entries = entries
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return _FakeEntriesResult(self._entries)
+
+
+def test_audit_cursor_round_trips() -> None:
+    entry = _entry_at(datetime(2026, 2, 1, 10, 0))
+
+    cursor = audit_service.encode_audit_cursor(entry)
+
+    assert audit_service.decode_audit_cursor(cursor) == (entry.created_at, entry.id)
+
+
+def test_audit_cursor_rejects_garbage() -> None:
+    with pytest.raises(ValueError):
+        audit_service.decode_audit_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_get_audit_log_after_returns_next_cursor_when_more_rows() -> None:
+    """Keyset pages should fetch one look-ahead row and expose the next cursor."""
+    entries = [_entry_at(datetime(2026, 2, 1, 10, minute)) for minute in (3, 2, 1)]
+    db = _FakeKeysetSession(entries)
+    cursor = (datetime(2026, 2, 1, 10, 4), uuid.uuid4())
+
+    payload = await audit_service.get_audit_log_after(db, cursor, per_page=2)
+
+    assert len(db.statements) == 1
+    assert [item["id"] for item in payload["entries"]] == [
+        str(entries[0].id),
+        str(entries[1].id),
+    ]
+    assert audit_service.decode_audit_cursor(payload["next_cursor"]) == (
+        entries[1].created_at,
+        entries[1].id,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_audit_log_after_last_page_has_no_cursor() -> None:
+    db = _FakeKeysetSession([_entry_at(datetime(2026, 2, 1, 10, 0))])
+
+    payload = await audit_service.get_audit_log_after(db, None, per_page=2)
+
+    assert len(payload["entries"]) == 1
+    assert payload["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_get_audit_log_after_breaks_created_at_ties_by_id() -> None:
+    """Entries sharing a timestamp should page by id without skips or repeats."""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.models.user import Base
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    created_at = datetime(2026, 2, 1, 10, 0)
+    try:
+        async with session_factory() as db:
+            entries = [_entry_at(created_at) for _ in range(3)]
+            entries.append(_entry_at(datetime(2026, 2, 1, 9, 0)))
+            db.add_all(entries)
+            await db.commit()
+
+            seen: list[str] = []
+            cursor = None
+            while True:
+                payload = await audit_service.get_audit_log_after(db, cursor, per_page=2)
+                seen.extend(item["id"] for item in payload["entries"])
+                if payload["next_cursor"] is None:
+                    break
+                cursor = audit_service.decode_audit_cursor(payload["next_cursor"])
+    finally:
+        await engine.dispose()
+
+    tied = sorted((entry.id for entry in entries[:3]), reverse=True)
+    assert seen == [str(entry_id) for entry_id in tied] + [str(entries[3].id)]
+
+
+@pytest.mark.asyncio
+async def test_get_audit_log_version_moves_on_every_commit_in_commit_order() -> None:
+    """An entry stamped earlier but committed later must still change the version."""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.models.user import Base
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def commit_entry_at(db, created_at: datetime) -> None:
+        entry = await audit_service.log_action(
+            db, admin_email="admin@example.com", action="update", resource_type="zone"
+        )
+        entry.created_at = created_at
+        await db.commit()
+
+    try:
+        async with session_factory() as db:
+            versions = [await audit_service.get_audit_log_version(db)]
+            await commit_entry_at(db, datetime(2026, 2, 1, 10, 0))
+            versions.append(await audit_service.get_audit_log_version(db))
+            # A slow transaction that started earlier commits after the quick one.
+            await commit_entry_at(db, datetime(2026, 2, 1, 9, 0))
+            versions.append(await audit_service.get_audit_log_version(db))
+            await commit_entry_at(db, datetime(2026, 2, 1, 9, 0))
+            versions.append(await audit_service.get_audit_log_version(db))
+    finally:
+        await engine.dispose()
+
+    assert versions == ["0", "1", "2", "3"]
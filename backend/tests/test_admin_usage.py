@@ -1,17 +1,31 @@
 """Admin usage unit tests."""
 
-from datetime import date
+import uuid
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
 
 import pytest
 from fastapi import HTTPException
 
 from app.ai.pricing import estimate_llm_cost_usd
+from app.routers import admin as admin_router
 from app.routers.admin import (
-    _aggregate_usage,
-    _aggregate_usage_for_model,
+    LLMModelSwitchIn,
+    _aggregate_usage_for_model_windows,
+    _aggregate_usage_windows,
+    _current_llm,
     _estimate_cost,
+    _llm_settings_transaction,
+    _model_available_in_catalog,
+    _normalise_admin_provider,
+    _usage_window_starts,
+    get_admin_llm_models,
+    get_admin_usage,
     get_llm_errors,
+    invalidate_admin_usage_cache,
+    invalidate_llm_catalog_response_cache,
     resolve_llm_error,
+    switch_admin_llm_model,
 )
 
 
@@ -23,15 +37,28 @@ class _FakeAggregateResult:
         return self._row
 
 
-class _FakeAsyncSession:
-    def __init__(self, rows: list[tuple]) -> None:
-        self.rows = rows
+class _FakeSessionFactory:
+    """Hand out one session per call, answering by the queried table."""
+
+    def __init__(self, rows_by_table: dict[str, tuple]) -> None:
+        self.rows_by_table = rows_by_table
+        self.opened = 0
         self.executed = []
 
+    def __call__(self) -> "_FakeSessionFactory":
+        self.opened += 1
+        return self
+
+    async def __aenter__(self) -> "_FakeSessionFactory":
+        return self
+
+    async def __aexit__(self, *_exc) -> None:
+        return None
+
     async def execute(self, statement):
         self.executed.append(statement)
-        row = self.rows.pop(0)
-        return _FakeAggregateResult(row)
+        table = statement.get_final_froms()[0].name
+        return _FakeAggregateResult(self.rows_by_table[table])
 
 
 def test_cost_calculation(monkeypatch) -> None:
@@ -52,6 +79,14 @@ def test_cost_calculation(monkeypatch) -> None:
     assert cost == expected
 
 
+def test_estimate_llm_cost_usd_matches_per_mtok_rates() -> None:
+    """Cached per-token rates should give the same cost as the per-million table."""
+    cost = estimate_llm_cost_usd("openai", "GPT-5.2", 123_457, 9_876)
+
+    assert cost == round(123_457 / 1_000_000 * 1.25 + 9_876 / 1_000_000 * 10.00, 4)
+    assert estimate_llm_cost_usd("openai", "GPT-5.2", 123_457, 9_876) == cost
+
+
 def test_cost_zero_tokens(monkeypatch) -> None:
     """Zero tokens should produce zero cost."""
     monkeypatch.setattr("app.routers.admin.settings.llm_provider", "anthropic")
@@ -59,44 +94,198 @@ def test_cost_zero_tokens(monkeypatch) -> None:
     assert cost == 0.0
 
 
+def test_normalise_admin_provider_tracks_google_transport(monkeypatch) -> None:
+    """Cached alias lookups must still resolve generic Google per runtime transport."""
+    monkeypatch.setattr("app.routers.admin.settings.google_gemini_transport", "aistudio")
+    assert _normalise_admin_provider("Gemini") == "google-aistudio"
+    assert _normalise_admin_provider("vertex_ai") == "google-vertex"
+
+    monkeypatch.setattr("app.routers.admin.settings.google_gemini_transport", "vertex")
+    assert _normalise_admin_provider("Gemini") == "google-vertex"
+    assert _normalise_admin_provider(" Claude ") == "anthropic"
+
+
+def test_model_available_in_catalog_uses_index_with_google_fallback() -> None:
+    catalog = {
+        "smoke_tested_models": {"llm": {}},
+        "_available_model_index": {
+            "openai": frozenset({"gpt-5-mini"}),
+            "google": frozenset({"gemini-3-flash-preview"}),
+        },
+    }
+
+    assert _model_available_in_catalog(catalog, "openai", "gpt-5-mini") is True
+    assert _model_available_in_catalog(catalog, "openai", "gpt-5.2") is False
+    assert _model_available_in_catalog(catalog, "google-vertex", "gemini-3-flash-preview") is True
+    assert _model_available_in_catalog(catalog, "anthropic", "claude-haiku-4-5") is False
+
+
+def test_model_available_in_catalog_builds_index_when_missing() -> None:
+    catalog = {
+        "smoke_tested_models": {
+            "llm": {"anthropic": {"available_models": ["claude-haiku-4-5"]}},
+        },
+    }
+
+    assert _model_available_in_catalog(catalog, "anthropic", "claude-haiku-4-5") is True
+
+
+def test_usage_window_starts_cover_today_week_and_month() -> None:
+    starts = _usage_window_starts(date(2026, 3, 5))
+
+    assert {window: start.start_date for window, start in starts.items()} == {
+        "today": date(2026, 3, 5),
+        "this_week": date(2026, 3, 2),
+        "this_month": date(2026, 3, 1),
+    }
+    assert starts["this_week"].start_dt == datetime(2026, 3, 2, 0, 0)
+
+
 @pytest.mark.asyncio
-async def test_aggregate_usage_returns_totals_and_cost(monkeypatch) -> None:
-    """Usage aggregation should include summed tokens and estimated cost."""
+async def test_aggregate_usage_windows_returns_totals_and_cost(monkeypatch) -> None:
+    """Usage aggregation should return every window from two concurrent queries."""
     monkeypatch.setattr("app.routers.admin.settings.llm_provider", "anthropic")
-    db = _FakeAsyncSession([
-        (1234, 5678),        # daily_token_usage totals
-        (0.1234, 10, 8),     # cost sum, assistant count, cost count
-    ])
+    sessions = _FakeSessionFactory({
+        # token totals per window: today, week, month
+        "daily_token_usage": (100, 200, 1234, 5678, 2000, 9000),
+        # cost sum, assistant count, cost count per window
+        "chat_messages": (0.01, 0, 0, 0.1234, 10, 8, 0.5, 20, 20),
+    })
+
+    usage = await _aggregate_usage_windows(sessions, _usage_window_starts(date(2026, 1, 7)))
+
+    # Each concurrent aggregate must use its own session.
+    assert sessions.opened == 2
+    assert usage["today"] == {
+        "input_tokens": 100,
+        "output_tokens": 200,
+        "estimated_cost_usd": 0.01,
+        "estimated_cost_coverage": 1.0,
+    }
+    assert usage["this_week"]["input_tokens"] == 1234
+    assert usage["this_week"]["output_tokens"] == 5678
+    assert usage["this_week"]["estimated_cost_usd"] == 0.1234
+    assert usage["this_week"]["estimated_cost_coverage"] == 0.8
+    assert usage["this_month"]["input_tokens"] == 2000
+    assert usage["this_month"]["estimated_cost_coverage"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_admin_usage_is_cached_within_ttl(monkeypatch) -> None:
+    """Repeated dashboard polls should reuse the aggregated usage."""
+    invalidate_admin_usage_cache()
+    sessions = _FakeSessionFactory({
+        "daily_token_usage": (1, 2, 3, 4, 5, 6),
+        "chat_messages": (0.1, 1, 1, 0.2, 2, 2, 0.3, 3, 3),
+    })
+
+    monkeypatch.setattr(admin_router, "_usage_recorded", True)
+
+    first = await get_admin_usage(None, sessions)
+    second = await get_admin_usage(None, sessions)
+    assert second == first
+    assert sessions.opened == 2
+
+    later = datetime.now() + admin_router.ADMIN_USAGE_CACHE_TTL + timedelta(seconds=1)
+    monkeypatch.setattr("app.routers.admin._utc_now_naive", lambda: later)
+    await get_admin_usage(None, sessions)
+    assert sessions.opened == 4
+    invalidate_admin_usage_cache()
 
-    usage = await _aggregate_usage(db, start_date=date(2026, 1, 1))
 
-    assert len(db.executed) == 2
-    assert usage["input_tokens"] == 1234
-    assert usage["output_tokens"] == 5678
-    assert usage["estimated_cost_usd"] == 0.1234
-    assert usage["estimated_cost_coverage"] == 0.8
+class _FakeEmptyUsageSessions(_FakeSessionFactory):
+    """Answer only the recorded-usage probe, as for a fresh deployment."""
+
+    async def execute(self, statement):
+        self.executed.append(statement)
+        return _FakeAggregateResult((False, False))
 
 
 @pytest.mark.asyncio
-async def test_aggregate_usage_for_model_filters_and_returns_cost() -> None:
-    """Model-scoped aggregation should return token totals, cost, and coverage."""
-    db = _FakeAsyncSession([
-        (321, 654, 0.4321, 12, 9),
-    ])
-
-    usage = await _aggregate_usage_for_model(
-        db,
-        start_date=date(2026, 1, 1),
+async def test_admin_usage_skips_aggregates_before_any_usage() -> None:
+    """An empty deployment should report zeros from one cheap existence probe."""
+    invalidate_admin_usage_cache()
+    sessions = _FakeEmptyUsageSessions({})
+
+    usage = await get_admin_usage(None, sessions)
+
+    assert len(sessions.executed) == 1
+    assert set(usage) == {"today", "this_week", "this_month"}
+    assert usage["this_month"] == {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "estimated_cost_usd": 0.0,
+        "estimated_cost_coverage": 1.0,
+    }
+    invalidate_admin_usage_cache()
+
+
+@pytest.mark.asyncio
+async def test_aggregate_usage_for_model_windows_reads_daily_totals() -> None:
+    """Model-scoped tokens should come from daily totals, cost from messages."""
+    sessions = _FakeSessionFactory({
+        "daily_token_usage": (1, 2, 321, 654, 400, 700),
+        "chat_messages": (0.001, 1, 1, 0.4321, 12, 9, 0.5, 16, 12),
+    })
+    usage = await _aggregate_usage_for_model_windows(
+        sessions,
+        _usage_window_starts(date(2026, 1, 7)),
         selected_provider_id="openai",
         canonical_provider_id="openai",
         model_id="gpt-5-mini",
     )
 
-    assert len(db.executed) == 1
-    assert usage["input_tokens"] == 321
-    assert usage["output_tokens"] == 654
-    assert usage["estimated_cost_usd"] == 0.4321
-    assert usage["estimated_cost_coverage"] == 0.75
+    assert sessions.opened == 2
+    for statement in sessions.executed:
+        compiled = statement.compile(compile_kwargs={"literal_binds": True})
+        table = statement.get_final_froms()[0].name
+        assert f"{table}.llm_provider = 'openai'" in str(compiled)
+        assert f"{table}.llm_model = 'gpt-5-mini'" in str(compiled)
+    assert usage["today"]["input_tokens"] == 1
+    assert usage["this_week"]["input_tokens"] == 321
+    assert usage["this_week"]["output_tokens"] == 654
+    assert usage["this_week"]["estimated_cost_usd"] == 0.4321
+    assert usage["this_week"]["estimated_cost_coverage"] == 0.75
+    assert usage["this_month"]["output_tokens"] == 700
+
+
+@pytest.mark.asyncio
+async def test_llm_models_response_is_cached_until_inputs_change(monkeypatch) -> None:
+    """Repeat catalog reads should reuse the assembled response for the same inputs."""
+    invalidate_llm_catalog_response_cache()
+    build_calls = {"count": 0}
+
+    async def _fake_catalog(force: bool = False) -> dict:
+        return {
+            "smoke_tested_models": {
+                "llm": {"openai": {"available_models": ["gpt-5-mini"]}},
+            },
+            "checked_at": "2026-02-27T00:00:00Z",
+            "cached": False,
+        }
+
+    def _counting_validate(provider: str, model: str) -> str:
+        build_calls["count"] += 1
+        return model
+
+    monkeypatch.setattr("app.routers.admin.ai_model_catalog_health_check", _fake_catalog)
+    monkeypatch.setattr("app.routers.admin.validate_supported_llm_model", _counting_validate)
+    monkeypatch.setattr("app.routers.admin.settings.llm_provider", "openai")
+    monkeypatch.setattr("app.routers.admin.settings.llm_model_openai", "gpt-5-mini")
+
+    first = await get_admin_llm_models(_=None)
+    second = await get_admin_llm_models(_=None)
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["available_models"] == first["available_models"]
+    assert build_calls["count"] == 1
+
+    monkeypatch.setattr("app.routers.admin.settings.llm_provider", "anthropic")
+    third = await get_admin_llm_models(_=None)
+    assert third["cached"] is False
+    assert build_calls["count"] == 2
+    invalidate_llm_catalog_response_cache()
 
 
 @pytest.mark.asyncio
@@ -140,3 +329,71 @@ async def test_resolve_llm_error_returns_404_when_missing(monkeypatch) -> None:
         await resolve_llm_error(error_id="missing", _=None)
 
     assert getattr(exc_info.value, "status_code", None) == 404
+
+
+@pytest.mark.asyncio
+async def test_llm_switch_stops_verifying_after_repeated_wrong_passwords(monkeypatch) -> None:
+    """Repeated wrong passwords should be refused before bcrypt runs again."""
+    checks = {"count": 0}
+
+    def _wrong_password(_plain: str, _hashed: str) -> bool:
+        checks["count"] += 1
+        return False
+
+    monkeypatch.setattr("app.routers.admin.verify_password", _wrong_password)
+    monkeypatch.setattr(admin_router, "_admin_password_failures", {})
+    admin = SimpleNamespace(id=uuid.uuid4(), password_hash="hash")
+    payload = LLMModelSwitchIn(provider="openai", model="gpt-5-mini", admin_password="nope")
+
+    for _ in range(admin_router.ADMIN_PASSWORD_FAILURE_LIMIT):
+        with pytest.raises(HTTPException) as exc_info:
+            await switch_admin_llm_model(payload, admin=admin, db=None)
+        assert exc_info.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc_info:
+        await switch_admin_llm_model(payload, admin=admin, db=None)
+
+    assert exc_info.value.status_code == 429
+    assert checks["count"] == admin_router.ADMIN_PASSWORD_FAILURE_LIMIT
+
+
+def test_llm_settings_transaction_restores_selection_on_error(monkeypatch) -> None:
+    monkeypatch.setattr("app.routers.admin.settings.llm_provider", "anthropic")
+    monkeypatch.setattr("app.routers.admin.settings.llm_model_openai", "gpt-5.2")
+    monkeypatch.setattr("app.routers.admin.settings.google_gemini_transport", "vertex")
+
+    with pytest.raises(RuntimeError):
+        with _llm_settings_transaction():
+            admin_router.settings.llm_provider = "openai"
+            admin_router.settings.llm_model_openai = "gpt-5-mini"
+            admin_router.settings.google_gemini_transport = "aistudio"
+            raise RuntimeError("fell back")
+
+    assert admin_router.settings.llm_provider == "anthropic"
+    assert admin_router.settings.llm_model_openai == "gpt-5.2"
+    assert admin_router.settings.google_gemini_transport == "vertex"
+
+    with _llm_settings_transaction():
+        admin_router.settings.llm_provider = "openai"
+    assert admin_router.settings.llm_provider == "openai"
+
+
+def test_current_llm_block_follows_selection_and_is_not_shared(monkeypatch) -> None:
+    monkeypatch.setattr("app.routers.admin.settings.llm_provider", "openai")
+    monkeypatch.setattr("app.routers.admin.settings.llm_model_openai", "gpt-5-mini")
+
+    first = _current_llm()
+    assert first == {"provider": "openai", "model": "gpt-5-mini", "google_gemini_transport": None}
+    first["model"] = "tampered"
+    assert _current_llm()["model"] == "gpt-5-mini"
+
+    monkeypatch.setattr("app.routers.admin.settings.llm_provider", "google")
+    monkeypatch.setattr("app.routers.admin.settings.llm_model_google", "gemini-3-flash-preview")
+    monkeypatch.setattr("app.routers.admin.settings.google_gemini_transport", "aistudio")
+
+    switched = _current_llm()
+    assert switched == {
+        "provider": "google-aistudio",
+        "model": "gemini-3-flash-preview",
+        "google_gemini_transport": "aistudio",
+    }
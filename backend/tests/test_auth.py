@@ -1,14 +1,23 @@
 """Auth helper and token tests."""
 
+import inspect
+import uuid
+from datetime import datetime
+
 import pytest
 from fastapi import Response
 
-from app.routers.auth import set_refresh_cookie
+from app import dependencies
+from app.models.user import User
+from app.schemas.user import UserProfile
+from app.routers.auth import router as auth_router, set_refresh_cookie
 from app.services.auth_service import (
     create_access_token,
     create_refresh_token,
+    create_token_pair,
     decode_token,
     hash_password,
+    password_needs_rehash,
     verify_password,
 )
 
@@ -23,6 +32,18 @@ def test_password_hash_round_trip() -> None:
     assert not verify_password("CorrectHorseBatteryStaple", "invalid-hash")
 
 
+def test_password_hash_uses_configured_cost(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Hashes below the configured bcrypt cost should be flagged for rehash."""
+    monkeypatch.setattr("app.services.auth_service.settings.password_bcrypt_rounds", 4)
+    weak_hash = hash_password("CorrectHorseBatteryStaple")
+    assert weak_hash.startswith("$2b$04$")
+    assert not password_needs_rehash(weak_hash)
+
+    monkeypatch.setattr("app.services.auth_service.settings.password_bcrypt_rounds", 5)
+    assert password_needs_rehash(weak_hash)
+    assert not password_needs_rehash("invalid-hash")
+
+
 def test_access_token_contains_expected_claims() -> None:
     """Access tokens should encode subject and token type."""
     token = create_access_token("user-123")
@@ -32,6 +53,25 @@ def test_access_token_contains_expected_claims() -> None:
     assert "exp" in payload
 
 
+def test_token_pair_shares_subject_and_clock() -> None:
+    """A token pair should carry one subject with access and refresh types."""
+    access_token, refresh_token = create_token_pair("user-321")
+    access = decode_token(access_token)
+    refresh = decode_token(refresh_token)
+    assert (access["sub"], access["token_type"]) == ("user-321", "access")
+    assert (refresh["sub"], refresh["token_type"]) == ("user-321", "refresh")
+    assert refresh["exp"] > access["exp"]
+
+
+def test_tokens_follow_secret_changes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The cached signing key should be keyed by the configured secret."""
+    token = create_access_token("user-789")
+    monkeypatch.setattr("app.services.auth_service.settings.jwt_secret_key", "rotated-secret")
+    with pytest.raises(ValueError, match="Invalid token"):
+        decode_token(token)
+    assert decode_token(create_access_token("user-789"))["sub"] == "user-789"
+
+
 def test_refresh_token_contains_expected_claims() -> None:
     """Refresh tokens should encode subject and token type."""
     token = create_refresh_token("user-456")
@@ -65,3 +105,42 @@ def test_set_refresh_cookie_uses_http_only_scoped_cookie(monkeypatch) -> None:
     assert "path=/api/auth" in cookie_header_lower
     assert "samesite=strict" in cookie_header_lower
     assert "max-age=604800" in cookie_header_lower
+
+
+def test_auth_routes_serialise_through_response_models() -> None:
+    """Declared response models let FastAPI dump JSON in pydantic-core."""
+    for route in auth_router.routes:
+        assert route.response_model is not None, route.path
+
+
+def test_build_user_profile_matches_validated_profile() -> None:
+    """The unvalidated profile fast path should carry every profile field."""
+    user = User(
+        id=uuid.uuid4(),
+        email="profile@example.com",
+        username="profile_user",
+        password_hash="x",
+        programming_level=2,
+        maths_level=4,
+        is_admin=False,
+        created_at=datetime(2026, 1, 1, 12, 0, 0),
+    )
+    built = dependencies.build_user_profile(user)
+    assert built.model_dump() == UserProfile.model_validate(user).model_dump()
+    assert built.model_fields_set == set(UserProfile.model_fields)
+
+
+@pytest.mark.parametrize(
+    "dependency",
+    [
+        dependencies.get_db,
+        dependencies.get_session_factory,
+        dependencies.get_current_user,
+        dependencies.get_current_user_profile,
+        dependencies.get_admin_user,
+    ],
+)
+def test_request_dependencies_are_async(dependency) -> None:
+    """Sync dependencies are dispatched to the threadpool on every request."""
+    assert inspect.iscoroutinefunction(dependency) or inspect.isasyncgenfunction(dependency)
+
@@ -6,7 +6,7 @@ import pytest
 import pytest_asyncio
 from fastapi import FastAPI
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 import app.models  # noqa: F401
@@ -122,6 +122,42 @@ async def test_register_send_code_success_and_duplicate_email_rejected(auth_emai
     assert duplicate.json()["detail"] == "Email already registered"
 
 
+@pytest.mark.asyncio
+async def test_register_inserts_user_without_reselecting_it(auth_email_client) -> None:
+    client, session_factory, _ = auth_email_client
+    send_code = await client.post(
+        "/api/auth/register/send-code",
+        json={"email": "oneshot@example.com", "username": "oneshot"},
+    )
+    assert send_code.status_code == 200
+
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()[:3]).upper())
+
+    sync_engine = session_factory.kw["bind"].sync_engine
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        register = await client.post(
+            "/api/auth/register",
+            json={
+                "email": "oneshot@example.com",
+                "username": "oneshot",
+                "password": "StrongPass123",
+                "verification_code": "123456",
+                "programming_level": 3,
+                "maths_level": 3,
+            },
+        )
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+
+    assert register.status_code == 200
+    # The id is generated client-side and created_at comes back via RETURNING.
+    assert statements[-1] == "INSERT INTO USERS"
+
+
 @pytest.mark.asyncio
 async def test_register_send_code_rejects_duplicate_username(
     auth_email_client,
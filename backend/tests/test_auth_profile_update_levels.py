@@ -6,7 +6,7 @@ import pytest
 import pytest_asyncio
 from fastapi import FastAPI
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 import app.models  # noqa: F401
@@ -215,3 +215,27 @@ async def test_profile_update_rejects_duplicate_username(auth_profile_client) ->
     )
     assert response.status_code == 400
     assert response.json()["detail"] == "Username already taken"
+
+
+@pytest.mark.asyncio
+async def test_profile_update_skips_refresh_after_commit(auth_profile_client) -> None:
+    """A profile update should load the user and update it, with no re-select."""
+    client, session_factory = auth_profile_client
+    register = await _register_user(client, email="norefresh@example.com", username="norefresh")
+    headers = _auth_headers(register["access_token"])
+
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    sync_engine = session_factory.kw["bind"].sync_engine
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        response = await client.put("/api/auth/me", headers=headers, json={"maths_level": 2})
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert response.json()["maths_level"] == 2
+    assert statements == ["SELECT", "UPDATE"]
@@ -1,6 +1,11 @@
 """Chat router helper tests."""
 
 import asyncio
+import base64
+import json
+import mmap
+import os
+from contextlib import aclosing
 from types import SimpleNamespace
 
 import pytest
@@ -16,13 +21,20 @@ from app.routers.chat import (
     _build_enriched_message,
     _build_multimodal_user_parts,
     _build_notebook_context_block,
+    _build_single_pass_pedagogy_context,
     _classify_llm_error,
+    _llm_target_from_provider,
+    _ready_chunk_batches,
+    _current_llm_runtime_signature,
     get_recent_llm_errors,
     mark_llm_error_resolved,
     _resolve_ws_token,
     _runtime_usage_provider_id,
     _split_uploads,
+    _token_frame,
+    _token_frame_prefix,
     _truncate_text_by_tokens,
+    _truncate_text_pair_by_tokens,
     _validate_upload_mix,
 )
 
@@ -95,6 +107,18 @@ def test_validate_upload_mix_accepts_payload_within_limits(monkeypatch) -> None:
     assert _validate_upload_mix(image_uploads, document_uploads) is None
 
 
+def test_validate_upload_mix_uses_connection_slot_limits(monkeypatch) -> None:
+    """Limits read once per connection take precedence over live settings."""
+    monkeypatch.setattr("app.routers.chat.settings.upload_max_images_per_message", 5)
+    monkeypatch.setattr("app.routers.chat.settings.upload_max_documents_per_message", 5)
+    image_uploads = [_make_upload("image"), _make_upload("image")]
+
+    message = _validate_upload_mix(image_uploads, [], (1, 3))
+
+    assert message is not None
+    assert "up to 1 photos and 3 files" in message
+
+
 def test_build_enriched_message_includes_document_text() -> None:
     """Document extracts should be appended to the user message."""
     document_uploads = [
@@ -119,6 +143,11 @@ def test_build_enriched_message_uses_attachment_only_fallback() -> None:
     assert enriched == "Please analyse the attached files."
 
 
+def test_build_enriched_message_without_documents_returns_text() -> None:
+    assert _build_enriched_message("  Just a question  ", []) == "Just a question"
+    assert _build_enriched_message("", []) == "Please analyse the attached files."
+
+
 def test_build_multimodal_user_parts_skips_missing_files(tmp_path) -> None:
     """Missing image files should be ignored from multimodal parts."""
     existing_image_path = tmp_path / "image.png"
@@ -148,6 +177,47 @@ def test_build_multimodal_user_parts_skips_missing_files(tmp_path) -> None:
     assert parts[1]["data"]
 
 
+def test_build_multimodal_user_parts_reuses_encoded_images(tmp_path, monkeypatch) -> None:
+    """Repeated turns should reuse the encoded image until the file changes."""
+    image_path = tmp_path / "cached.png"
+    image_path.write_bytes(b"first")
+    upload = _make_upload(
+        "image", filename="cached.png", storage_path=str(image_path), content_type="image/png"
+    )
+    maps: list[int] = []
+    original_mmap = mmap.mmap
+
+    def counting_mmap(fileno, length, **kwargs):
+        maps.append(fileno)
+        return original_mmap(fileno, length, **kwargs)
+
+    monkeypatch.setattr("app.routers.chat.mmap.mmap", counting_mmap)
+
+    first = _build_multimodal_user_parts("Look", [upload])
+    again = _build_multimodal_user_parts("Look again", [upload])
+    assert first[1]["data"] == again[1]["data"] == base64.b64encode(b"first").decode("ascii")
+    assert len(maps) == 1
+
+    image_path.write_bytes(b"second")
+    os.utime(image_path, ns=(0, image_path.stat().st_mtime_ns + 1_000_000))
+    changed = _build_multimodal_user_parts("Look now", [upload])
+    assert changed[1]["data"] == base64.b64encode(b"second").decode("ascii")
+    assert len(maps) == 2
+
+
+def test_build_multimodal_user_parts_encodes_empty_image_as_empty_data(tmp_path) -> None:
+    """Zero-byte files cannot be memory-mapped, so they encode to an empty payload."""
+    image_path = tmp_path / "empty.png"
+    image_path.write_bytes(b"")
+    upload = _make_upload(
+        "image", filename="empty.png", storage_path=str(image_path), content_type="image/png"
+    )
+
+    parts = _build_multimodal_user_parts("Look", [upload])
+
+    assert parts[1]["data"] == ""
+
+
 def test_truncate_text_by_tokens_respects_budget() -> None:
     """Text should be shortened when token budget is exceeded."""
     llm = FakeLLM()
@@ -156,6 +226,38 @@ def test_truncate_text_by_tokens_respects_budget() -> None:
     assert truncated == "one two three"
 
 
+def test_truncate_text_by_tokens_counts_logarithmically() -> None:
+    """Long texts should be bisected rather than re-counted word by word."""
+
+    class CountingLLM(FakeLLM):
+        calls = 0
+
+        def count_tokens(self, text: str) -> int:
+            CountingLLM.calls += 1
+            return super().count_tokens(text)
+
+    llm = CountingLLM()
+    words = [f"w{i}" for i in range(2000)]
+    truncated = _truncate_text_by_tokens(llm, " ".join(words), max_tokens=777)
+    assert truncated == " ".join(words[:777])
+    assert CountingLLM.calls <= 15
+
+
+def test_truncate_text_pair_gives_unused_first_budget_to_second() -> None:
+    """A short first text should leave its spare tokens to the second."""
+    llm = FakeLLM()
+    answer = " ".join(f"a{i}" for i in range(20))
+
+    question, truncated_answer = _truncate_text_pair_by_tokens(llm, "q1 q2", 5, answer, 10)
+    assert question == "q1 q2"
+    assert truncated_answer == " ".join(f"a{i}" for i in range(13))
+
+    long_question = " ".join(f"q{i}" for i in range(8))
+    question, truncated_answer = _truncate_text_pair_by_tokens(llm, long_question, 5, answer, 10)
+    assert question == "q0 q1 q2 q3 q4"
+    assert truncated_answer == " ".join(f"a{i}" for i in range(10))
+
+
 def test_build_notebook_context_block_includes_cell_and_error() -> None:
     """Notebook context block should include notebook, cell, and error sections."""
     llm = FakeLLM()
@@ -173,6 +275,140 @@ def test_build_notebook_context_block_includes_cell_and_error() -> None:
     assert "Traceback line" in block
 
 
+def test_single_pass_pedagogy_context_skips_counting_without_previous_exchange() -> None:
+    """The previous exchange is only truncated when it is actually rendered."""
+
+    class CountingLLM(FakeLLM):
+        calls = 0
+
+        def count_tokens(self, text: str) -> int:
+            CountingLLM.calls += 1
+            return super().count_tokens(text)
+
+    student_state = SimpleNamespace(
+        effective_programming_level=2.4,
+        effective_maths_level=3.0,
+        current_programming_hint_level=2,
+        current_maths_hint_level=3,
+    )
+    fast_signals = SimpleNamespace(
+        has_previous_exchange=False,
+        previous_question_text="old question",
+        previous_answer_text="old answer",
+    )
+    llm = CountingLLM()
+
+    block = _build_single_pass_pedagogy_context(llm, student_state, fast_signals)
+
+    assert CountingLLM.calls == 0
+    assert "--- Previous Question ---" not in block
+    assert block.endswith("--- End Hidden Pedagogy Context ---")
+
+    fast_signals.has_previous_exchange = True
+    block = _build_single_pass_pedagogy_context(llm, student_state, fast_signals)
+
+    assert "--- Previous Question ---\nold question\n--- Previous Answer ---\nold answer" in block
+
+
+def test_current_llm_runtime_signature_reads_active_provider_only(monkeypatch) -> None:
+    monkeypatch.setattr("app.routers.chat.settings.llm_provider", "google")
+    monkeypatch.setattr("app.routers.chat.settings.llm_model_google", "gemini-x")
+    monkeypatch.setattr("app.routers.chat.settings.google_gemini_transport", "vertex")
+    assert _current_llm_runtime_signature() == ("google", "gemini-x", "vertex")
+
+    monkeypatch.setattr("app.routers.chat.settings.llm_provider", "openai")
+    monkeypatch.setattr("app.routers.chat.settings.llm_model_openai", "gpt-x")
+    assert _current_llm_runtime_signature() == ("openai", "gpt-x", "")
+
+
+def test_llm_target_from_provider_normalises_ids() -> None:
+    llm = SimpleNamespace(provider_id=" Google ", model_id=" gemini-x ", runtime_transport="VERTEX")
+    target = _llm_target_from_provider(llm)
+    assert (target.provider, target.model_id, target.google_transport) == (
+        "google",
+        "gemini-x",
+        "vertex",
+    )
+
+    llm = SimpleNamespace(provider_id="openai", model_id="gpt-x")
+    assert _llm_target_from_provider(llm).google_transport is None
+
+
+@pytest.mark.asyncio
+async def test_ready_chunk_batches_groups_chunks_queued_during_a_send() -> None:
+    """Chunks that pile up while the consumer is busy arrive as one batch."""
+    release = asyncio.Event()
+
+    async def stream():
+        yield "a"
+        await release.wait()
+        for chunk in ("b", "c", "d"):
+            yield chunk
+
+    batches: list[list[str]] = []
+    async for batch in _ready_chunk_batches(stream()):
+        batches.append(batch)
+        if batch == ["a"]:
+            release.set()
+            # Simulate a slow frame send while the provider keeps streaming.
+            for _ in range(5):
+                await asyncio.sleep(0)
+
+    assert batches == [["a"], ["b", "c", "d"]]
+
+
+@pytest.mark.asyncio
+async def test_ready_chunk_batches_stops_the_stream_when_the_consumer_fails() -> None:
+    """A failed send inside aclosing should stop reading the provider at once."""
+    pulled: list[str] = []
+    closed = asyncio.Event()
+
+    async def stream():
+        try:
+            while True:
+                pulled.append("chunk")
+                yield "chunk"
+                await asyncio.sleep(0)
+        finally:
+            closed.set()
+
+    with pytest.raises(ConnectionError):
+        async with aclosing(_ready_chunk_batches(stream())) as batches:
+            async for _batch in batches:
+                raise ConnectionError("client went away")
+
+    assert closed.is_set()
+    pulled_at_close = len(pulled)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert len(pulled) == pulled_at_close
+
+
+@pytest.mark.asyncio
+async def test_ready_chunk_batches_raises_after_earlier_chunks() -> None:
+    async def stream():
+        yield "partial"
+        raise RuntimeError("stream dropped")
+
+    batches: list[list[str]] = []
+    with pytest.raises(RuntimeError, match="stream dropped"):
+        async for batch in _ready_chunk_batches(stream()):
+            batches.append(batch)
+
+    assert batches == [["partial"]]
+
+
+@pytest.mark.parametrize("content", ["Hello", 'quote " and \\ slash', "line\nbreak", "café ✓", ""])
+def test_token_frame_matches_send_json_encoding(content) -> None:
+    session_id = "3f2c9a1e-0000-4000-8000-000000000000"
+    expected = json.dumps(
+        {"type": "token", "session_id": session_id, "content": content},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    assert _token_frame(_token_frame_prefix(session_id), content) == expected
+
+
 def test_runtime_usage_provider_id_maps_google_by_transport() -> None:
     assert _runtime_usage_provider_id("google", "aistudio") == GOOGLE_AI_STUDIO_PROVIDER
     assert _runtime_usage_provider_id("google", "vertex") == GOOGLE_VERTEX_PROVIDER
@@ -215,6 +451,20 @@ def test_classify_llm_error_marks_timeout_as_retryable() -> None:
     assert GENERIC_LLM_RETRY_EXHAUSTED_ERROR.endswith("moment.")
 
 
+@pytest.mark.parametrize(
+    ("message", "error_code"),
+    [
+        ("Request Timed Out after 30s", "timeout"),
+        ("You exceeded your current QUOTA", "quota_or_rate_limit"),
+        ("Upstream returned 503 Service Unavailable", "upstream_unavailable"),
+        ("Invalid API Key provided", "auth_failed"),
+        ("something else entirely", "unknown"),
+    ],
+)
+def test_classify_llm_error_matches_markers_case_insensitively(message, error_code) -> None:
+    assert _classify_llm_error(Exception(message), "openai").error_code == error_code
+
+
 def test_mark_llm_error_resolved_hides_alert_from_default_listing() -> None:
     _llm_error_ring.clear()
     _resolved_llm_error_ids.clear()
@@ -236,6 +486,26 @@ def test_mark_llm_error_resolved_hides_alert_from_default_listing() -> None:
     assert len(get_recent_llm_errors(include_resolved=True)) == 1
 
 
+def test_get_recent_llm_errors_returns_newest_first_and_drops_oldest() -> None:
+    _llm_error_ring.clear()
+    _resolved_llm_error_ids.clear()
+    for index in range(_llm_error_ring.maxlen + 2):
+        _record_llm_error(
+            provider="openai",
+            model="gpt-5-mini",
+            error_type="fatal",
+            error_code="unknown",
+            detail=f"failure {index}",
+        )
+
+    recent = get_recent_llm_errors()
+
+    assert len(recent) == _llm_error_ring.maxlen
+    assert recent[0]["detail"] == f"failure {_llm_error_ring.maxlen + 1}"
+    assert recent[-1]["detail"] == "failure 2"
+    _llm_error_ring.clear()
+
+
 def test_mark_llm_error_resolved_returns_false_for_unknown_id() -> None:
     _llm_error_ring.clear()
     _resolved_llm_error_ids.clear()
@@ -23,6 +23,7 @@ from app.models.user import Base, User
 from app.routers.chat import (
     GENERIC_LLM_RETRY_EXHAUSTED_ERROR,
     GENERIC_LLM_UNAVAILABLE_ERROR,
+    _build_notebook_context_block,
     router as chat_router,
 )
 
@@ -42,6 +43,7 @@ class _FakeStreamLLM(LLMProvider):
             self._calls = [list(chunks)]  # type: ignore[arg-type]
         self.call_count = 0
         self.system_prompts: list[str] = []
+        self.messages: list[list[dict]] = []
         # Keep these aligned with supported ids so factory-derived fallback logic
         # still treats the fake provider as a valid active target.
         self.provider_id = "openai"
@@ -50,6 +52,7 @@ class _FakeStreamLLM(LLMProvider):
     async def generate_stream(self, system_prompt, messages, max_tokens=2048):
         self.call_count += 1
         self.system_prompts.append(system_prompt)
+        self.messages.append(list(messages))
         self.last_usage = LLMUsage(input_tokens=17, output_tokens=11)
         call_index = min(self.call_count - 1, len(self._calls) - 1)
         for chunk in self._calls[call_index]:
@@ -325,11 +328,9 @@ def _setup_ws_test_env(
         "app.routers.chat.chat_summary_cache_service.schedule_refresh",
         lambda session_id: scheduled.append(str(session_id)),
     )
-    monkeypatch.setattr("app.routers.chat.rate_limiter.check_user", lambda user_id: True)
-    monkeypatch.setattr("app.routers.chat.rate_limiter.check_global", lambda: True)
+    monkeypatch.setattr("app.routers.chat.rate_limiter.check_all", lambda user_id: None)
     monkeypatch.setattr("app.routers.chat.rate_limiter.record", lambda user_id: None)
-    monkeypatch.setattr("app.routers.chat.connection_tracker.can_connect", lambda user_id: True)
-    monkeypatch.setattr("app.routers.chat.connection_tracker.add", lambda user_id, conn_id: None)
+    monkeypatch.setattr("app.routers.chat.connection_tracker.try_add", lambda user_id, conn_id: True)
     monkeypatch.setattr("app.routers.chat.connection_tracker.remove", lambda user_id, conn_id: None)
 
     client = TestClient(_make_ws_app())
@@ -444,7 +445,9 @@ def test_ws_single_pass_missing_header_discards_output_and_regenerates(tmp_path,
         assert meta_event["source"] == "two_step_recovery_route"
 
         token_events = [e for e in events if e["type"] == "token"]
-        assert [e["content"] for e in token_events] == ["Recovered", " ", "reply"]
+        # The fake provider yields without awaiting, so all three chunks are
+        # queued before the first send and go out as one frame.
+        assert [e["content"] for e in token_events] == ["Recovered reply"]
 
         status_events = [e for e in events if e["type"] == "status"]
         assert status_events == []
@@ -995,3 +998,322 @@ def test_ws_unavailable_without_fallback_errors_after_retries_and_allows_new_tur
     finally:
         client.close()
         _run(engine.dispose())
+
+
+def test_ws_each_turn_reads_the_current_user_row(tmp_path, monkeypatch) -> None:
+    """A level change saved elsewhere between turns must not be overwritten."""
+
+    chunks = [["First reply"], ["Second reply"]]
+    client, session_factory, engine, _scheduled, _llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, chunks
+    )
+    user_id = _run(_single_user_id(session_factory))
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"content": "first"}))
+            first_events = _collect_until_done(ws)
+            session_id = next(e for e in first_events if e["type"] == "session")["session_id"]
+
+            _run(_set_effective_programming_level(session_factory, user_id, 4.5))
+            ws.send_text(json.dumps({"content": "second", "session_id": session_id}))
+            _collect_until_done(ws)
+
+        assert _run(_effective_programming_level(session_factory, user_id)) == 4.5
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+def test_ws_turn_after_early_exit_reloads_user_and_replies(tmp_path, monkeypatch) -> None:
+    """A turn that bails out before committing must not break the next turn."""
+
+    chunks = [["First reply"], ["Second reply"]]
+    client, _session_factory, engine, _scheduled, _llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, chunks
+    )
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"content": "first"}))
+            _collect_until_done(ws)
+
+            ws.send_text(json.dumps({"content": "zone", "zone_notebook_id": str(uuid.uuid4())}))
+            assert ws.receive_json() == {"type": "error", "message": "Zone notebook not found."}
+
+            ws.send_text(json.dumps({"content": "plain"}))
+            events = _collect_until_done(ws)
+
+        token_text = "".join(e["content"] for e in events if e["type"] == "token")
+        assert token_text == "Second reply"
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+def test_ws_text_only_turn_skips_upload_lookup(tmp_path, monkeypatch) -> None:
+    """Messages without attachments should not resolve uploads at all."""
+
+    client, _session_factory, engine, _scheduled, _llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, ["Plain reply"]
+    )
+    lookups: list[object] = []
+
+    async def _fake_get_user_uploads_by_ids(db, user_id, upload_ids):
+        lookups.append(upload_ids)
+        return []
+
+    monkeypatch.setattr("app.routers.chat.get_user_uploads_by_ids", _fake_get_user_uploads_by_ids)
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"content": "no attachments"}))
+            events = _collect_until_done(ws)
+
+        assert events[-1]["type"] == "done"
+        assert lookups == []
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+def test_ws_ignores_late_auth_frames_and_rejects_malformed_frames(tmp_path, monkeypatch) -> None:
+    """Auth frames are skipped, and bad JSON or bad fields get one error each."""
+
+    client, _session_factory, engine, _scheduled, _llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, ["Plain reply"]
+    )
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"type": "auth", "token": "late", "content": "ignored"}))
+            ws.send_text("{not json")
+            assert ws.receive_json() == {"type": "error", "message": "Invalid message format"}
+            ws.send_text(json.dumps({"content": "hi", "upload_ids": ["not-a-uuid"]}))
+            assert ws.receive_json() == {"type": "error", "message": "Invalid message format"}
+            ws.send_text(json.dumps({"content": "real question"}))
+            events = _collect_until_done(ws)
+
+        assert events[-1]["type"] == "done"
+        token_text = "".join(e["content"] for e in events if e["type"] == "token")
+        assert token_text == "Plain reply"
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+def test_ws_reuses_one_session_and_releases_connection_between_turns(tmp_path, monkeypatch) -> None:
+    """Turns share the connection's session but never hold a pooled connection while idle."""
+
+    chunks = [["First reply"], ["Second reply"]]
+    client, session_factory, engine, _scheduled, _llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, chunks
+    )
+    opened: list[AsyncSession] = []
+
+    def counting_factory():
+        db = session_factory()
+        opened.append(db)
+        return db
+
+    monkeypatch.setattr("app.routers.chat.AsyncSessionLocal", counting_factory)
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"content": "first"}))
+            first_events = _collect_until_done(ws)
+            assert engine.pool.checkedout() == 0
+            session_id = next(e for e in first_events if e["type"] == "session")["session_id"]
+            ws.send_text(json.dumps({"content": "second", "session_id": session_id}))
+            _collect_until_done(ws)
+            assert engine.pool.checkedout() == 0
+
+        # One connection-wide session, plus a short-lived history read per turn.
+        assert len(opened) == 3
+        stored_messages = _run(_list_messages(session_factory, session_id))
+        assert [m.role for m in stored_messages] == ["user", "assistant", "user", "assistant"]
+        assert [m.content for m in stored_messages if m.role == "user"] == ["first", "second"]
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+def test_ws_reuses_built_provider_for_the_same_target(tmp_path, monkeypatch) -> None:
+    """Later turns on a session should not rebuild the provider for its target."""
+
+    chunks = [["First reply"], ["Second reply"], ["Third reply"]]
+    client, _session_factory, engine, _scheduled, llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, chunks
+    )
+    builds: list[object] = []
+
+    def counting_build(_settings, target):
+        builds.append(target)
+        return llm
+
+    monkeypatch.setattr("app.routers.chat.build_llm_provider_for_target", counting_build)
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"content": "first"}))
+            first_events = _collect_until_done(ws)
+            session_id = next(e for e in first_events if e["type"] == "session")["session_id"]
+            for content in ("second", "third"):
+                ws.send_text(json.dumps({"content": content, "session_id": session_id}))
+                _collect_until_done(ws)
+
+        assert builds == []
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+def test_ws_lists_fallback_targets_once_per_target(tmp_path, monkeypatch) -> None:
+    """Fallback candidates should be computed once, not twice on every turn."""
+
+    chunks = [["First reply"], ["Second reply"]]
+    client, _session_factory, engine, _scheduled, _llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, chunks
+    )
+    listed: list[str] = []
+
+    def counting_fallbacks(_settings, *, current_provider, current_model, current_google_transport=None):
+        listed.append(current_model)
+        return []
+
+    monkeypatch.setattr("app.routers.chat.list_llm_fallback_targets", counting_fallbacks)
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"content": "first"}))
+            first_events = _collect_until_done(ws)
+            session_id = next(e for e in first_events if e["type"] == "session")["session_id"]
+            ws.send_text(json.dumps({"content": "second", "session_id": session_id}))
+            _collect_until_done(ws)
+
+        assert len(listed) == 1
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+def test_ws_history_excludes_the_current_turn_exactly_once(tmp_path, monkeypatch) -> None:
+    """History loaded alongside the weekly check should hold only earlier turns."""
+
+    header = (
+        '{"same_problem":false,"is_elaboration":false,'
+        '"programming_difficulty":2,"maths_difficulty":2}'
+    )
+    chunks = [
+        ["<<GC_META_V1>>", header, "<<END_GC_META>>", "First answer"],
+        ["<<GC_META_V1>>", header, "<<END_GC_META>>", "Second answer"],
+    ]
+    client, _session_factory, engine, _scheduled, llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, chunks
+    )
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"content": "first question"}))
+            first_events = _collect_until_done(ws)
+            session_id = next(e for e in first_events if e["type"] == "session")["session_id"]
+            ws.send_text(json.dumps({"content": "second question", "session_id": session_id}))
+            _collect_until_done(ws)
+
+        first_call, second_call = llm.messages
+        assert [m["content"] for m in first_call] == ["first question"]
+        contents = [m["content"] for m in second_call]
+        assert contents[-1] == "second question"
+        assert contents.count("second question") == 1
+        assert contents[:-1] == ["first question", "First answer"]
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+def test_ws_history_failure_stops_the_weekly_check_before_rollback(tmp_path, monkeypatch) -> None:
+    """A failed history load must not leave the weekly check running on the turn's session."""
+
+    client, _session_factory, engine, _scheduled, _llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, ["Unused reply"]
+    )
+    weekly_check: list[str] = []
+
+    async def _slow_check_weekly_limit(db, user_id):
+        weekly_check.append("started")
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            weekly_check.append("cancelled")
+            raise
+        weekly_check.append("finished")
+        return True
+
+    async def _failing_load_chat_history(session_id):
+        await asyncio.sleep(0)
+        raise RuntimeError("history unavailable")
+
+    monkeypatch.setattr("app.routers.chat.chat_service.check_weekly_limit", _slow_check_weekly_limit)
+    monkeypatch.setattr("app.routers.chat._load_chat_history", _failing_load_chat_history)
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"content": "question"}))
+            events = _collect_until_terminal(ws)
+            # Checked before the socket closes, since closing cancels strays too.
+            assert weekly_check == ["started", "cancelled"]
+
+        assert events[-1] == {"type": "error", "message": "Internal error"}
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+def test_ws_reuses_notebook_context_block_while_notebook_is_unchanged(tmp_path, monkeypatch) -> None:
+    """Follow-ups on an unchanged notebook should not rebuild its context block."""
+
+    chunks = [["First reply"], ["Second reply"], ["Third reply"]]
+    client, _session_factory, engine, _scheduled, _llm, _pedagogy = _setup_ws_test_env(
+        tmp_path, monkeypatch, chunks
+    )
+    notebook_text = {"value": "x = 1\nprint(x)"}
+
+    async def _fake_refresh_extracted_text(db, user_id, notebook_id):
+        return notebook_text["value"]
+
+    builds: list[str] = []
+
+    def counting_build(llm, extracted_text, cell_code, error_output):
+        builds.append(extracted_text)
+        return _build_notebook_context_block(llm, extracted_text, cell_code, error_output)
+
+    monkeypatch.setattr("app.routers.chat.refresh_extracted_text", _fake_refresh_extracted_text)
+    monkeypatch.setattr("app.routers.chat._build_notebook_context_block", counting_build)
+    notebook_id = str(uuid.uuid4())
+    try:
+        with client.websocket_connect("/ws/chat?token=test") as ws:
+            ws.send_text(json.dumps({"content": "first", "notebook_id": notebook_id}))
+            _collect_until_done(ws)
+            ws.send_text(json.dumps({"content": "second", "notebook_id": notebook_id}))
+            _collect_until_done(ws)
+            assert len(builds) == 1
+
+            notebook_text["value"] = "x = 2\nprint(x)"
+            ws.send_text(json.dumps({"content": "third", "notebook_id": notebook_id}))
+            _collect_until_done(ws)
+            assert builds == ["x = 1\nprint(x)", "x = 2\nprint(x)"]
+    finally:
+        client.close()
+        _run(engine.dispose())
+
+
+async def _single_user_id(session_factory: async_sessionmaker[AsyncSession]) -> uuid.UUID:
+    async with session_factory() as db:
+        return (await db.execute(select(User.id))).scalar_one()
+
+
+async def _set_effective_programming_level(
+    session_factory: async_sessionmaker[AsyncSession], user_id: uuid.UUID, level: float
+) -> None:
+    async with session_factory() as db:
+        user = await db.get(User, user_id)
+        user.effective_programming_level = level
+        await db.commit()
+
+
+async def _effective_programming_level(
+    session_factory: async_sessionmaker[AsyncSession], user_id: uuid.UUID
+) -> float | None:
+    async with session_factory() as db:
+        return (await db.get(User, user_id)).effective_programming_level
@@ -19,6 +19,12 @@ def test_parse_admin_email_set_supports_json_list() -> None:
     assert parsed == {"alice@example.com", "bob@example.com"}
 
 
+def test_parse_admin_email_set_is_cached_and_immutable() -> None:
+    parsed = _parse_admin_email_set("admin@example.com")
+    assert isinstance(parsed, frozenset)
+    assert _parse_admin_email_set("admin@example.com") is parsed
+
+
 def test_normalise_website_domain_strips_scheme_and_trailing_slash() -> None:
     assert _normalise_website_domain(" https://example.com/ ") == "example.com"
 
@@ -7,29 +7,39 @@ def test_add_and_remove(monkeypatch) -> None:
     """Adding and removing connections should update counts correctly."""
     monkeypatch.setattr("app.services.connection_tracker.settings.max_ws_connections_per_user", 3)
     tracker = ConnectionTracker()
-    tracker.add("user-1", "conn-a")
-    tracker.add("user-1", "conn-b")
-    assert tracker.can_connect("user-1")
+    assert tracker.try_add("user-1", "conn-a")
+    assert tracker.try_add("user-1", "conn-b")
     tracker.remove("user-1", "conn-a")
     tracker.remove("user-1", "conn-b")
-    assert tracker.can_connect("user-1")
+    assert tracker._connections == {}
+    assert tracker.try_add("user-1", "conn-c")
 
 
 def test_limit_enforcement(monkeypatch) -> None:
     """The 4th connection for the same user should be rejected."""
     monkeypatch.setattr("app.services.connection_tracker.settings.max_ws_connections_per_user", 3)
     tracker = ConnectionTracker()
-    tracker.add("user-1", "conn-a")
-    tracker.add("user-1", "conn-b")
-    tracker.add("user-1", "conn-c")
-    assert not tracker.can_connect("user-1")
+    for conn_id in ("conn-a", "conn-b", "conn-c"):
+        assert tracker.try_add("user-1", conn_id)
+    assert not tracker.try_add("user-1", "conn-d")
 
 
 def test_multi_user_isolation(monkeypatch) -> None:
     """Different users should have independent connection pools."""
     monkeypatch.setattr("app.services.connection_tracker.settings.max_ws_connections_per_user", 2)
     tracker = ConnectionTracker()
-    tracker.add("user-1", "conn-a")
-    tracker.add("user-1", "conn-b")
-    assert not tracker.can_connect("user-1")
-    assert tracker.can_connect("user-2")
+    assert tracker.try_add("user-1", "conn-a")
+    assert tracker.try_add("user-1", "conn-b")
+    assert not tracker.try_add("user-1", "conn-c")
+    assert tracker.try_add("user-2", "conn-a")
+
+
+def test_try_add_registers_until_limit(monkeypatch) -> None:
+    """try_add should claim slots up to the limit and free them on remove."""
+    monkeypatch.setattr("app.services.connection_tracker.settings.max_ws_connections_per_user", 2)
+    tracker = ConnectionTracker()
+    assert tracker.try_add("user-1", "conn-a")
+    assert tracker.try_add("user-1", "conn-b")
+    assert not tracker.try_add("user-1", "conn-c")
+    tracker.remove("user-1", "conn-a")
+    assert tracker.try_add("user-1", "conn-c")
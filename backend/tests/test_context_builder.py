@@ -2,7 +2,8 @@
 
 import pytest
 
-from app.ai.context_builder import build_context_messages
+from app.ai.context_builder import build_context_messages, build_single_pass_system_prompt
+from app.ai.prompts import MATHS_HINT_INSTRUCTIONS, SINGLE_PASS_PEDAGOGY_PROTOCOL_PROMPT
 from tests.conftest import MockLLMProvider
 
 
@@ -112,3 +113,17 @@ async def test_no_cache_and_no_inline_compression_falls_back_to_truncation() ->
     )
     assert messages[-1]["content"] == "Current question"
     assert llm.generate_stream_calls == 0
+
+
+def test_single_pass_system_prompt_appends_turn_context_to_static_rules() -> None:
+    """Per-turn context should follow the cached static rules, notebook last."""
+    prompt = build_single_pass_system_prompt(
+        2, 3, pedagogy_context="PEDAGOGY", notebook_context="NOTEBOOK"
+    )
+    again = build_single_pass_system_prompt(2, 3, pedagogy_context="OTHER")
+
+    assert SINGLE_PASS_PEDAGOGY_PROTOCOL_PROMPT in prompt
+    assert f"- Level 1: {MATHS_HINT_INSTRUCTIONS[1]}" in prompt
+    assert prompt.endswith("\n\nPEDAGOGY\n\nNOTEBOOK")
+    assert again.endswith("\n\nOTHER")
+    assert again[: -len("OTHER")] == prompt[: -len("PEDAGOGY\n\nNOTEBOOK")]
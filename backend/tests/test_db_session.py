@@ -0,0 +1,63 @@
+"""Database engine configuration tests."""
+
+import time
+import uuid
+
+from app.db.session import (
+    ANALYTICS_POOL_MAX_OVERFLOW,
+    ANALYTICS_POOL_SIZE,
+    ASYNCPG_PREPARED_STATEMENT_CACHE_SIZE,
+    ASYNCPG_STATEMENT_CACHE_SIZE,
+    POOL_SIZE,
+    QUERY_CACHE_SIZE,
+    AnalyticsSessionLocal,
+    AsyncSessionLocal,
+    _engine_connect_args,
+    _engine_pool_options,
+    engine,
+)
+from app.models.user import User, uuid7
+
+
+def test_asyncpg_engine_enables_statement_caches() -> None:
+    connect_args = _engine_connect_args("postgresql+asyncpg://u:p@db:5432/tutor")
+    assert connect_args == {
+        "prepared_statement_cache_size": ASYNCPG_PREPARED_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": ASYNCPG_STATEMENT_CACHE_SIZE,
+    }
+
+
+def test_engine_compiled_cache_is_sized_for_all_statement_shapes() -> None:
+    assert engine.sync_engine._compiled_cache.capacity == QUERY_CACHE_SIZE
+
+
+def test_other_drivers_get_no_asyncpg_arguments() -> None:
+    assert _engine_connect_args("sqlite+aiosqlite:///tutor.sqlite3") == {}
+
+
+def test_postgres_engine_gets_sized_pre_pinged_pool() -> None:
+    options = _engine_pool_options("postgresql+asyncpg://u:p@db:5432/tutor")
+    assert options["pool_size"] == POOL_SIZE
+    assert options["pool_pre_ping"] is True
+    assert _engine_pool_options("sqlite+aiosqlite:///tutor.sqlite3") == {}
+
+
+def test_analytics_sessions_use_their_own_small_pool() -> None:
+    assert AnalyticsSessionLocal.kw["bind"] is not AsyncSessionLocal.kw["bind"]
+    options = _engine_pool_options(
+        "postgresql+asyncpg://u:p@replica:5432/tutor",
+        pool_size=ANALYTICS_POOL_SIZE,
+        max_overflow=ANALYTICS_POOL_MAX_OVERFLOW,
+    )
+    assert options["pool_size"] == ANALYTICS_POOL_SIZE
+    assert options["max_overflow"] == ANALYTICS_POOL_MAX_OVERFLOW
+
+
+def test_uuid7_ids_are_version_7_and_time_ordered() -> None:
+    first = uuid7()
+    time.sleep(0.002)
+    second = uuid7()
+    assert first.version == 7
+    assert first.variant == uuid.RFC_4122
+    assert first < second
+    assert User.__table__.c.id.default.arg.__wrapped__ is uuid7
@@ -1,18 +1,25 @@
 """Backend API end-to-end tests."""
 
+import json
+import threading
+import uuid
 from datetime import date, timedelta
 
 import pytest
 import pytest_asyncio
 from fastapi import FastAPI
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 import app.models  # noqa: F401
 from app.config import settings
-from app.dependencies import get_db
-from app.models.user import Base
-from app.routers.admin import router as admin_router
+from app.dependencies import get_analytics_session_factory, get_db, get_session_factory
+from app.models.chat import ChatMessage, ChatSession
+from app.models.user import Base, User
+from app.routers.admin import invalidate_admin_usage_cache, router as admin_router
+from app.routers import auth as auth_router_module
 from app.routers.auth import router as auth_router
 from app.routers.chat import router as chat_router
 from app.routers.upload import router as upload_router
@@ -84,10 +91,17 @@ async def e2e_client(monkeypatch: pytest.MonkeyPatch, tmp_path):
         async with session_factory() as session:
             yield session
 
+    async def override_get_session_factory():
+        return session_factory
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = override_get_session_factory
+    app.dependency_overrides[get_analytics_session_factory] = override_get_session_factory
+    invalidate_admin_usage_cache()
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        client.session_factory = session_factory
         yield client
 
     app.dependency_overrides.clear()
@@ -120,6 +134,193 @@ async def test_e2e_auth_profile_refresh_logout_flow(e2e_client: AsyncClient) ->
     assert refresh_after_logout.status_code == 401
 
 
+@pytest.mark.asyncio
+async def test_e2e_refresh_rejects_deleted_users(e2e_client: AsyncClient) -> None:
+    """A valid refresh cookie must not renew tokens for a deleted account."""
+    await _register_user(e2e_client, email="gone@example.com", username="gone_user")
+    async with e2e_client.session_factory() as db:
+        await db.execute(delete(User).where(User.email == "gone@example.com"))
+        await db.commit()
+
+    refresh_response = await e2e_client.post("/api/auth/refresh")
+    assert refresh_response.status_code == 401
+    assert "set-cookie" not in refresh_response.headers
+
+
+@pytest.mark.asyncio
+async def test_e2e_emails_are_stored_and_matched_lowercase(e2e_client: AsyncClient) -> None:
+    """Mixed-case emails should be stored lowercased and still log in."""
+    register_payload = await _register_user(
+        e2e_client,
+        email="Mixed.Case@Example.com",
+        username="mixed_case",
+    )
+    me_response = await e2e_client.get(
+        "/api/auth/me", headers=_auth_headers(register_payload["access_token"])
+    )
+    assert me_response.json()["email"] == "mixed.case@example.com"
+
+    login_response = await e2e_client.post(
+        "/api/auth/login",
+        json={"email": "MIXED.CASE@example.com", "password": "StrongPass123"},
+    )
+    assert login_response.status_code == 200
+
+    async with e2e_client.session_factory() as db:
+        db.add(User(email="Upper@Example.com", username="upper", password_hash="x"))
+        with pytest.raises(IntegrityError):
+            await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_e2e_login_upgrades_password_hash_cost(
+    e2e_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Logging in should rehash a password stored under an older bcrypt cost."""
+    monkeypatch.setattr(settings, "password_bcrypt_rounds", 4)
+    await _register_user(e2e_client, email="rehash@example.com", username="rehash_user")
+
+    monkeypatch.setattr(settings, "password_bcrypt_rounds", 5)
+    login_response = await e2e_client.post(
+        "/api/auth/login",
+        json={"email": "rehash@example.com", "password": "StrongPass123"},
+    )
+    assert login_response.status_code == 200
+
+    async with e2e_client.session_factory() as db:
+        user = (
+            await db.execute(select(User).where(User.email == "rehash@example.com"))
+        ).scalar_one()
+    assert user.password_hash.startswith("$2b$05$")
+
+
+@pytest.mark.asyncio
+async def test_e2e_password_hashing_runs_off_the_event_loop(
+    e2e_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """bcrypt work should run in worker threads so other requests keep moving."""
+    hashing_threads: list[int] = []
+    original_hash = auth_router_module.hash_password
+    original_verify = auth_router_module.verify_password
+
+    def recording_hash(plain: str) -> str:
+        hashing_threads.append(threading.get_ident())
+        return original_hash(plain)
+
+    def recording_verify(plain: str, hashed: str) -> bool:
+        hashing_threads.append(threading.get_ident())
+        return original_verify(plain, hashed)
+
+    monkeypatch.setattr(auth_router_module, "hash_password", recording_hash)
+    monkeypatch.setattr(auth_router_module, "verify_password", recording_verify)
+
+    await _register_user(e2e_client, email="thread@example.com", username="thread_user")
+    login_response = await e2e_client.post(
+        "/api/auth/login",
+        json={"email": "thread@example.com", "password": "StrongPass123"},
+    )
+    assert login_response.status_code == 200
+    assert len(hashing_threads) == 2
+    assert threading.get_ident() not in hashing_threads
+
+
+@pytest.mark.asyncio
+async def test_e2e_login_releases_connection_before_password_check(
+    e2e_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The bcrypt check should not hold a pooled database connection."""
+    await _register_user(e2e_client, email="pool@example.com", username="pool_user")
+    pool = e2e_client.session_factory.kw["bind"].sync_engine.pool
+    checked_out_during_verify: list[int] = []
+    original_verify = auth_router_module.verify_password
+
+    def recording_verify(plain: str, hashed: str) -> bool:
+        checked_out_during_verify.append(pool.checkedout())
+        return original_verify(plain, hashed)
+
+    monkeypatch.setattr(auth_router_module, "verify_password", recording_verify)
+
+    login_response = await e2e_client.post(
+        "/api/auth/login",
+        json={"email": "pool@example.com", "password": "StrongPass123"},
+    )
+    assert login_response.status_code == 200
+    assert checked_out_during_verify == [0]
+
+
+@pytest.mark.asyncio
+async def test_e2e_login_verifies_dummy_hash_for_unknown_email(
+    e2e_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Unknown emails should pay the same bcrypt cost as wrong passwords."""
+    verified_hashes: list[str] = []
+    original_verify = auth_router_module.verify_password
+
+    def recording_verify(plain: str, hashed: str) -> bool:
+        verified_hashes.append(hashed)
+        return original_verify(plain, hashed)
+
+    monkeypatch.setattr(auth_router_module, "verify_password", recording_verify)
+
+    login_response = await e2e_client.post(
+        "/api/auth/login",
+        json={"email": "nobody@example.com", "password": "StrongPass123"},
+    )
+    assert login_response.status_code == 401
+    assert login_response.json()["detail"] == "Invalid email or password"
+    assert verified_hashes == [auth_router_module.dummy_password_hash()]
+
+
+@pytest.mark.asyncio
+async def test_e2e_me_is_cached_until_profile_update(e2e_client: AsyncClient) -> None:
+    """Repeated `/me` reads should come from memory until the profile changes."""
+    register_payload = await _register_user(
+        e2e_client, email="cached.me@example.com", username="cached_me"
+    )
+    headers = _auth_headers(register_payload["access_token"])
+    first = await e2e_client.get("/api/auth/me", headers=headers)
+    assert first.json()["username"] == "cached_me"
+
+    async with e2e_client.session_factory() as db:
+        await db.execute(
+            update(User)
+            .where(User.email == "cached.me@example.com")
+            .values(username="renamed_in_db")
+        )
+        await db.commit()
+    cached = await e2e_client.get("/api/auth/me", headers=headers)
+    assert cached.json()["username"] == "cached_me"
+
+    update_response = await e2e_client.put(
+        "/api/auth/me", headers=headers, json={"username": "renamed_me"}
+    )
+    assert update_response.status_code == 200
+    refreshed = await e2e_client.get("/api/auth/me", headers=headers)
+    assert refreshed.json()["username"] == "renamed_me"
+
+
+@pytest.mark.asyncio
+async def test_e2e_me_answers_304_until_profile_changes(e2e_client: AsyncClient) -> None:
+    """`/me` should honour If-None-Match and change its ETag on profile edits."""
+    register_payload = await _register_user(
+        e2e_client, email="etag.me@example.com", username="etag_me"
+    )
+    headers = _auth_headers(register_payload["access_token"])
+    first = await e2e_client.get("/api/auth/me", headers=headers)
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    unchanged = await e2e_client.get("/api/auth/me", headers={**headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+
+    await e2e_client.put("/api/auth/me", headers=headers, json={"maths_level": 5})
+    changed = await e2e_client.get("/api/auth/me", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["maths_level"] == 5
+    assert changed.headers["etag"] != etag
+
+
 @pytest.mark.asyncio
 async def test_e2e_usage_and_session_list_for_new_user(e2e_client: AsyncClient) -> None:
     """A newly registered user should have zero usage and no sessions."""
@@ -149,6 +350,42 @@ async def test_e2e_usage_and_session_list_for_new_user(e2e_client: AsyncClient)
     assert sessions_response.json() == []
 
 
+@pytest.mark.asyncio
+async def test_e2e_session_list_and_messages_use_response_models(e2e_client: AsyncClient) -> None:
+    """Session and message lists should serialise through their response models."""
+    register_payload = await _register_user(
+        e2e_client,
+        email="history@example.com",
+        username="history_user",
+    )
+    headers = _auth_headers(register_payload["access_token"])
+    me_response = await e2e_client.get("/api/auth/me", headers=headers)
+    user_id = uuid.UUID(me_response.json()["id"])
+
+    async with e2e_client.session_factory() as db:
+        session = ChatSession(user_id=user_id, session_type="general")
+        db.add(session)
+        await db.flush()
+        db.add(ChatMessage(session_id=session.id, role="user", content="What is a list?"))
+        await db.commit()
+
+    sessions_response = await e2e_client.get("/api/chat/sessions", headers=headers)
+    assert sessions_response.status_code == 200
+    [listed] = sessions_response.json()
+    assert listed["id"] == str(session.id)
+    assert listed["preview"] == "What is a list?"
+
+    messages_response = await e2e_client.get(
+        f"/api/chat/sessions/{session.id}/messages", headers=headers
+    )
+    assert messages_response.status_code == 200
+    [message] = messages_response.json()
+    assert message["role"] == "user"
+    assert message["content"] == "What is a list?"
+    assert message["attachments"] == []
+    assert message["created_at"]
+
+
 @pytest.mark.asyncio
 async def test_e2e_admin_usage_requires_admin_role(e2e_client: AsyncClient) -> None:
     """Non-admin users should be denied admin usage access."""
@@ -299,6 +536,92 @@ async def test_e2e_admin_model_switch_and_model_usage_endpoints(
     assert usage_data["today"]["output_tokens"] == 0
 
 
+@pytest.mark.asyncio
+async def test_e2e_admin_zone_update_and_shared_files(
+    e2e_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Zone updates should report the notebook count and shared files should list."""
+    monkeypatch.setattr(settings, "admin_email", "admin@example.com")
+    register_payload = await _register_user(
+        e2e_client,
+        email="admin@example.com",
+        username="admin_user",
+    )
+    headers = _auth_headers(register_payload["access_token"])
+
+    create_response = await e2e_client.post(
+        "/api/admin/zones",
+        headers=headers,
+        json={"title": "Week 1", "description": "Intro"},
+    )
+    assert create_response.status_code == 201
+    zone_id = create_response.json()["id"]
+
+    update_response = await e2e_client.put(
+        f"/api/admin/zones/{zone_id}",
+        headers=headers,
+        json={"title": "Week 1 (updated)"},
+    )
+    assert update_response.status_code == 200
+    assert update_response.json()["title"] == "Week 1 (updated)"
+    assert update_response.json()["notebook_count"] == 0
+
+    list_response = await e2e_client.get("/api/admin/zones", headers=headers)
+    assert list_response.status_code == 200
+    listed = list_response.json()
+    assert [zone["id"] for zone in listed] == [zone_id]
+    assert listed[0]["title"] == "Week 1 (updated)"
+    assert listed[0]["description"] == "Intro"
+    assert listed[0]["notebook_count"] == 0
+    assert listed[0]["created_at"]
+
+    shared_response = await e2e_client.get(
+        f"/api/admin/zones/{zone_id}/shared-files",
+        headers=headers,
+    )
+    assert shared_response.status_code == 200
+    assert shared_response.json() == []
+
+    missing_response = await e2e_client.get(
+        "/api/admin/zones/00000000-0000-0000-0000-000000000000/shared-files",
+        headers=headers,
+    )
+    assert missing_response.status_code == 404
+
+    stream_response = await e2e_client.get(
+        "/api/admin/audit-log?stream=true&per_page=10",
+        headers=headers,
+    )
+    assert stream_response.status_code == 200
+    assert stream_response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in stream_response.text.splitlines()]
+    assert sorted(row["action"] for row in rows) == ["create", "update"]
+
+    first_page = await e2e_client.get("/api/admin/audit-log?per_page=1", headers=headers)
+    assert first_page.status_code == 200
+    assert first_page.json()["total"] == 2
+    assert first_page.json()["next_cursor"]
+
+    bad_cursor = await e2e_client.get("/api/admin/audit-log?cursor=bogus", headers=headers)
+    assert bad_cursor.status_code == 400
+
+    etag = list_response.headers["etag"]
+    assert etag.startswith('W/"')
+    unchanged = await e2e_client.get(
+        "/api/admin/zones", headers={**headers, "If-None-Match": etag}
+    )
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+
+    await e2e_client.delete(f"/api/admin/zones/{zone_id}", headers=headers)
+    changed = await e2e_client.get(
+        "/api/admin/zones", headers={**headers, "If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+    assert changed.json() == []
+    assert changed.headers["etag"] != etag
+
+
 @pytest.mark.asyncio
 async def test_e2e_upload_access_is_owner_scoped(e2e_client: AsyncClient) -> None:
     """Uploaded files should only be readable by their owner."""
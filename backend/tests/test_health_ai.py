@@ -69,8 +69,15 @@ async def test_ai_model_catalog_health_check_returns_llm_only_and_caches(monkeyp
     assert first["current"]["model"] == "gpt-5-mini"
     assert "smoke_tested_models" in first
     assert "llm" in first["smoke_tested_models"]
+    assert first[health_router.AVAILABLE_MODEL_INDEX_KEY] == {
+        "google-aistudio": frozenset({"gemini-3-flash-preview"}),
+    }
     assert calls["count"] == 1
 
+    public = await health_router.ai_models_health_api(force=False)
+    assert health_router.AVAILABLE_MODEL_INDEX_KEY not in public
+    assert public["cached"] is True
+
 
 @pytest.mark.asyncio
 async def test_root_health_returns_json_liveness_response() -> None:
@@ -10,7 +10,7 @@ def test_user_within_limit(monkeypatch) -> None:
     monkeypatch.setattr("app.services.rate_limiter.settings.rate_limit_user_per_minute", 5)
     limiter = RateLimiter()
     for _ in range(5):
-        assert limiter.check_user("user-1")
+        assert limiter.check_all("user-1") is None
         limiter.record("user-1")
 
 
@@ -21,7 +21,7 @@ def test_user_exceeds_limit(monkeypatch) -> None:
     limiter = RateLimiter()
     for _ in range(5):
         limiter.record("user-1")
-    assert not limiter.check_user("user-1")
+    assert limiter.check_all("user-1") == "user"
 
 
 def test_global_limit(monkeypatch) -> None:
@@ -31,7 +31,7 @@ def test_global_limit(monkeypatch) -> None:
     limiter = RateLimiter()
     for i in range(3):
         limiter.record(f"user-{i}")
-    assert not limiter.check_global()
+    assert limiter.check_all("user-9") == "global"
 
 
 def test_timestamp_expiry(monkeypatch) -> None:
@@ -45,4 +45,20 @@ def test_timestamp_expiry(monkeypatch) -> None:
     limiter._user_windows["user-1"] = deque([old_time])
 
     # The old entry should be pruned, so the user is within limit.
-    assert limiter.check_user("user-1")
+    assert limiter.check_all("user-1") is None
+
+
+def test_check_all_reports_which_limit_was_hit(monkeypatch) -> None:
+    """The combined check should name the user limit before the global one."""
+    monkeypatch.setattr("app.services.rate_limiter.settings.rate_limit_user_per_minute", 2)
+    monkeypatch.setattr("app.services.rate_limiter.settings.rate_limit_global_per_minute", 3)
+    limiter = RateLimiter()
+    assert limiter.check_all("user-1") is None
+
+    limiter.record("user-1")
+    limiter.record("user-1")
+    assert limiter.check_all("user-1") == "user"
+    assert limiter.check_all("user-2") is None
+
+    limiter.record("user-2")
+    assert limiter.check_all("user-2") == "global"
@@ -1,21 +1,37 @@
+import io
+from pathlib import Path
+
 import pytest
 import pytest_asyncio
 import uuid
+from fastapi import UploadFile
 import app.models  # noqa: F401
-from sqlalchemy import select
+from sqlalchemy import event, inspect, select
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.models.chat import ChatMessage, ChatSession
 from app.models.user import Base
-from app.models.zone import LearningZone, ZoneNotebook
+from app.models.zone import LearningZone, ZoneNotebook, ZoneNotebookProgress
 from app.services.zone_service import (
     ZoneValidationError,
     _common_leading_folder,
     _derive_title_from_filename,
     _normalise_relative_path,
     _strip_leading_folder,
+    ZONE_IMPORT_READ_CONCURRENCY,
+    count_zone_notebooks,
+    create_zone,
     delete_zone,
     delete_zone_notebook,
+    delete_zone_shared_file,
+    get_zone,
+    import_zone_assets,
+    list_zone_notebooks_with_progress,
+    list_zone_notebooks,
+    list_zone_shared_files,
+    reorder_zone_notebooks,
+    update_zone,
 )
 
 
@@ -57,6 +73,353 @@ async def zone_db(tmp_path):
         await engine.dispose()
 
 
+@pytest.mark.asyncio
+async def test_create_zone_loads_server_defaults_without_refresh(zone_db) -> None:
+    async with zone_db() as db:
+        zone = await create_zone(db, "Fresh", None)
+        await db.commit()
+
+        assert inspect(zone).unloaded == set()
+        assert zone.created_at is not None
+
+
+@pytest.mark.asyncio
+async def test_update_zone_reuses_loaded_zone(zone_db) -> None:
+    async with zone_db() as db:
+        zone = await create_zone(db, "Before", None)
+        await db.commit()
+        zone_id = zone.id
+
+    statements: list[str] = []
+
+    def record(_conn, _cursor, statement, *_args) -> None:
+        statements.append(statement.split()[0].upper())
+
+    engine = zone_db.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        async with zone_db() as db:
+            loaded = await get_zone(db, zone_id)
+            updated = await update_zone(db, zone_id, title="After")
+            await db.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert updated is loaded
+    assert updated.title == "After"
+    assert statements == ["SELECT", "UPDATE"]
+
+
+@pytest.mark.asyncio
+async def test_count_zone_notebooks_counts_only_that_zone(zone_db) -> None:
+    async with zone_db() as db:
+        zones = [
+            LearningZone(title="Counted", description=None, order=1),
+            LearningZone(title="Other", description=None, order=2),
+        ]
+        db.add_all(zones)
+        await db.flush()
+        for zone, total in zip(zones, (2, 1)):
+            for order in range(1, total + 1):
+                db.add(
+                    ZoneNotebook(
+                        zone_id=zone.id,
+                        title=f"Notebook {order}",
+                        original_filename="nb.ipynb",
+                        stored_filename=f"{uuid.uuid4().hex}.ipynb",
+                        storage_path="unused",
+                        notebook_json="{}",
+                        extracted_text="",
+                        size_bytes=2,
+                        order=order,
+                    )
+                )
+        await db.commit()
+
+        assert await count_zone_notebooks(db, zones[0].id) == 2
+        assert await count_zone_notebooks(db, zones[1].id) == 1
+        assert await count_zone_notebooks(db, uuid.uuid4()) == 0
+
+
+@pytest.mark.asyncio
+async def test_reorder_zone_notebooks_uses_one_update(zone_db) -> None:
+    async with zone_db() as db:
+        zone = LearningZone(title="Reorder", description=None, order=1)
+        db.add(zone)
+        await db.flush()
+        notebooks = [
+            ZoneNotebook(
+                zone_id=zone.id,
+                title=f"Notebook {order}",
+                original_filename="nb.ipynb",
+                stored_filename=f"{uuid.uuid4().hex}.ipynb",
+                storage_path="unused",
+                notebook_json="{}",
+                extracted_text="",
+                size_bytes=2,
+                order=order,
+            )
+            for order in (1, 2, 3)
+        ]
+        db.add_all(notebooks)
+        await db.commit()
+        zone_id = zone.id
+        new_ids = [notebooks[2].id, notebooks[0].id, notebooks[1].id]
+
+    statements: list[str] = []
+
+    def record(_conn, _cursor, statement, *_args) -> None:
+        statements.append(statement.split()[0].upper())
+
+    engine = zone_db.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        async with zone_db() as db:
+            await reorder_zone_notebooks(db, zone_id, new_ids)
+            await db.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert statements.count("UPDATE") == 1
+    async with zone_db() as db:
+        listed = await list_zone_notebooks(db, zone_id)
+        assert [item.id for item in listed] == new_ids
+        assert [item.order for item in listed] == [1, 2, 3]
+
+        with pytest.raises(ZoneValidationError, match="invalid"):
+            await reorder_zone_notebooks(db, zone_id, [new_ids[0], new_ids[0], new_ids[1]])
+
+
+@pytest.mark.asyncio
+async def test_reorder_zone_notebooks_leaves_concurrently_added_notebook_alone(zone_db) -> None:
+    def _notebook(zone_id: uuid.UUID, order: int) -> ZoneNotebook:
+        return ZoneNotebook(
+            zone_id=zone_id,
+            title=f"Notebook {order}",
+            original_filename="nb.ipynb",
+            stored_filename=f"{uuid.uuid4().hex}.ipynb",
+            storage_path="unused",
+            notebook_json="{}",
+            extracted_text="",
+            size_bytes=2,
+            order=order,
+        )
+
+    async with zone_db() as db:
+        zone = LearningZone(title="Race", description=None, order=1)
+        db.add(zone)
+        await db.flush()
+        notebooks = [_notebook(zone.id, order) for order in (1, 2)]
+        db.add_all(notebooks)
+        await db.commit()
+
+        original_scalars = db.scalars
+        late = _notebook(zone.id, 3)
+
+        async def scalars_then_add_late_notebook(*args, **kwargs):
+            result = await original_scalars(*args, **kwargs)
+            # Simulate another admin adding a notebook after the id check.
+            db.add(late)
+            await db.flush()
+            return result
+
+        db.scalars = scalars_then_add_late_notebook
+        await reorder_zone_notebooks(db, zone.id, [notebooks[1].id, notebooks[0].id])
+        await db.commit()
+        zone_id = zone.id
+
+    async with zone_db() as db:
+        listed = await list_zone_notebooks(db, zone_id)
+        assert [(item.id, item.order) for item in listed] == [
+            (notebooks[1].id, 1),
+            (notebooks[0].id, 2),
+            (late.id, 3),
+        ]
+
+
+@pytest.mark.asyncio
+async def test_list_zone_notebooks_with_progress_flags_and_skips_content(zone_db) -> None:
+    from app.models.user import User
+
+    async with zone_db() as db:
+        user = User(
+            email=f"{uuid.uuid4().hex}@example.com",
+            username=f"u_{uuid.uuid4().hex[:6]}",
+            password_hash="x",
+            programming_level=3,
+            maths_level=3,
+        )
+        zone = LearningZone(title="Progress", description=None, order=1)
+        db.add_all([user, zone])
+        await db.flush()
+        notebooks = [
+            ZoneNotebook(
+                zone_id=zone.id,
+                title=f"Notebook {order}",
+                original_filename="nb.ipynb",
+                stored_filename=f"{uuid.uuid4().hex}.ipynb",
+                storage_path="unused",
+                notebook_json="{}",
+                extracted_text="",
+                size_bytes=2,
+                order=order,
+            )
+            for order in (2, 1)
+        ]
+        db.add_all(notebooks)
+        await db.flush()
+        db.add(
+            ZoneNotebookProgress(
+                user_id=user.id,
+                zone_notebook_id=notebooks[0].id,
+                notebook_state="{}",
+            )
+        )
+        await db.commit()
+        user_id, zone_id = user.id, zone.id
+
+    async with zone_db() as db:
+        listed = await list_zone_notebooks_with_progress(db, zone_id, user_id)
+
+        assert [(item.title, progress) for item, progress in listed] == [
+            ("Notebook 1", False),
+            ("Notebook 2", True),
+        ]
+        with pytest.raises(InvalidRequestError):
+            listed[0][0].notebook_json
+        with pytest.raises(InvalidRequestError):
+            listed[0][0].storage_path
+
+
+@pytest.mark.asyncio
+async def test_import_zone_assets_reads_uploads_in_batches(zone_db, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("app.services.notebook_service.settings.notebook_storage_dir", str(tmp_path))
+    total = ZONE_IMPORT_READ_CONCURRENCY + 3
+    uploads = [
+        UploadFile(io.BytesIO(f"row {index}".encode()), filename=f"data_{index:02d}.csv")
+        for index in range(total)
+    ]
+    uploads.append(UploadFile(io.BytesIO(b'{"cells": []}'), filename="intro.ipynb"))
+
+    async with zone_db() as db:
+        zone = LearningZone(title="Import", description=None, order=1)
+        db.add(zone)
+        await db.flush()
+
+        result = await import_zone_assets(db, zone.id, uploads)
+        await db.commit()
+
+        shared = await list_zone_shared_files(db, zone.id)
+        assert await count_zone_notebooks(db, zone.id) == 1
+
+    assert result == {
+        "notebooks_created": 1,
+        "shared_files_created": total,
+        "shared_files_updated": 0,
+    }
+    assert [item.relative_path for item in shared] == [
+        f"data_{index:02d}.csv" for index in range(total)
+    ]
+    assert all(upload.file.closed for upload in uploads)
+    for index, item in enumerate(shared):
+        assert open(item.storage_path, "rb").read() == f"row {index}".encode()
+        assert item.size_bytes == len(f"row {index}")
+    incoming = tmp_path / "learning_zone_notebooks" / str(zone.id) / "incoming"
+    assert list(incoming.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_import_zone_assets_rejects_oversized_shared_file(zone_db, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("app.services.notebook_service.settings.notebook_storage_dir", str(tmp_path))
+    monkeypatch.setattr("app.services.zone_service.notebook_size_limit_bytes", lambda: 4)
+    monkeypatch.setattr("app.services.zone_service.UPLOAD_COPY_CHUNK_BYTES", 2)
+
+    async with zone_db() as db:
+        zone = LearningZone(title="Too big", description=None, order=1)
+        db.add(zone)
+        await db.flush()
+
+        with pytest.raises(ZoneValidationError, match="size limit"):
+            await import_zone_assets(
+                db,
+                zone.id,
+                [UploadFile(io.BytesIO(b"0123456789"), filename="big.csv")],
+            )
+        assert await list_zone_shared_files(db, zone.id) == []
+
+    incoming = tmp_path / "learning_zone_notebooks" / str(zone.id) / "incoming"
+    assert list(incoming.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_import_zone_assets_cleans_up_when_one_upload_fails(zone_db, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("app.services.notebook_service.settings.notebook_storage_dir", str(tmp_path))
+
+    class _FailingReader(io.BytesIO):
+        def read(self, *args):
+            raise OSError("upload stream broke")
+
+    uploads = [
+        UploadFile(io.BytesIO(f"row {index}".encode()), filename=f"data_{index:02d}.csv")
+        for index in range(ZONE_IMPORT_READ_CONCURRENCY + 2)
+    ]
+    uploads[1] = UploadFile(_FailingReader(), filename="broken.csv")
+
+    async with zone_db() as db:
+        zone = LearningZone(title="Partial", description=None, order=1)
+        db.add(zone)
+        await db.flush()
+
+        with pytest.raises(OSError, match="upload stream broke"):
+            await import_zone_assets(db, zone.id, uploads)
+        assert await list_zone_shared_files(db, zone.id) == []
+
+    incoming = tmp_path / "learning_zone_notebooks" / str(zone.id) / "incoming"
+    assert list(incoming.iterdir()) == []
+    assert all(upload.file.closed for upload in uploads)
+
+
+@pytest.mark.asyncio
+async def test_import_zone_assets_rejects_invalid_notebook_json(zone_db, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("app.services.notebook_service.settings.notebook_storage_dir", str(tmp_path))
+
+    async with zone_db() as db:
+        zone = LearningZone(title="Broken", description=None, order=1)
+        db.add(zone)
+        await db.flush()
+
+        with pytest.raises(ZoneValidationError, match="Invalid .ipynb"):
+            await import_zone_assets(
+                db,
+                zone.id,
+                [UploadFile(io.BytesIO(b"{not json"), filename="broken.ipynb")],
+            )
+        assert await count_zone_notebooks(db, zone.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_zone_shared_file_removes_row_and_file(zone_db, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("app.services.notebook_service.settings.notebook_storage_dir", str(tmp_path))
+
+    async with zone_db() as db:
+        zone = LearningZone(title="Shared", description=None, order=1)
+        db.add(zone)
+        await db.flush()
+        await import_zone_assets(
+            db, zone.id, [UploadFile(io.BytesIO(b"a,b"), filename="data.csv")]
+        )
+        await db.commit()
+        [shared] = await list_zone_shared_files(db, zone.id)
+
+        assert await delete_zone_shared_file(db, shared.id) is True
+        await db.commit()
+        assert await delete_zone_shared_file(db, shared.id) is False
+
+    async with zone_db() as db:
+        assert await list_zone_shared_files(db, zone.id) == []
+    assert not Path(shared.storage_path).exists()
+
+
 @pytest.mark.asyncio
 async def test_delete_zone_notebook_removes_zone_chat_sessions(zone_db, tmp_path) -> None:
     notebook_file = tmp_path / "zone.ipynb"
@@ -233,6 +233,7 @@ export interface AuditLogResponse {
   page: number;
   per_page: number;
   total_pages: number;
+  next_cursor: string | null;
 }
 
 export interface AdminLlmError {